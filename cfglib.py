@@ -53,7 +53,20 @@ migrate_opts = [
     cfg.StrOpt('keep_volume_storage', default='no',
                help='yes - keep volume_storage, no - not keep volume_storage'),
     cfg.StrOpt('speed_limit', default='10MB',
-               help='speed limit for glance to glance'),
+               help='speed limit for glance to glance, shared by all '
+                    'image copy streams'),
+    cfg.IntOpt('image_copy_streams', default=4,
+               help='number of images copied from glance to glance at once'),
+    cfg.IntOpt('identity_api_workers', default=8,
+               help='number of concurrent keystone API calls when role '
+                    'assignments are read or created through API'),
+    cfg.FloatOpt('identity_api_rate', default=0,
+                 help='keystone API calls per second made by identity '
+                      'migration workers, 0 - no limit'),
+    cfg.StrOpt('image_staging', default='',
+               help='directory for spooling images copied from glance to '
+                    'glance, interrupted copies are resumed from it; empty '
+                    '- images are streamed directly'),
     cfg.StrOpt('instances', default='key_name-qwerty',
                help='filter instance by parametrs'),
     cfg.StrOpt('file_compression', default='dd',
@@ -66,7 +79,25 @@ migrate_opts = [
     cfg.StrOpt('port', default='9990',
                help='interval ports for ssh tunnel'),
     cfg.BoolOpt('overwrite_user_passwords', default=False,
-                help='Overwrite password for exists users on destination')
+                help='Overwrite password for exists users on destination'),
+    cfg.StrOpt('token_cache', default='',
+               help='file for keeping keystone tokens between runs and '
+                    'workers, empty - keep tokens in memory only'),
+    cfg.StrOpt('checkpoint', default='',
+               help='file for checkpoints of migration plan, migration run '
+                    'with resume=True continues from it; empty - no '
+                    'checkpoints'),
+    cfg.IntOpt('scheduler_pool_size', default=4,
+               help='number of thread tasks of migration plan running at '
+                    'once, 0 - no limit'),
+    cfg.IntOpt('status_timeout', default=4 * 60 * 60,
+               help='seconds of waiting for status of instance, volume or '
+                    'image, 0 - no limit'),
+    cfg.IntOpt('list_cache_ttl', default=0,
+               help='seconds for keeping results of list requests '
+                    '(flavors, images, tenants, etc.), 0 - no caching; '
+                    'objects created outside of CloudFerry are not seen '
+                    'until cached list expires')
 ]
 
 mail = cfg.OptGroup(name='mail',
@@ -155,7 +186,18 @@ src_identity = cfg.OptGroup(name='src_identity',
 
 src_identity_opts = [
     cfg.StrOpt('service', default='keystone',
-               help='name service for keystone')
+               help='name service for keystone'),
+    cfg.StrOpt('db_host', default='',
+               help='host of mysql with keystone database, empty - host '
+                    'of src_mysql'),
+    cfg.StrOpt('db_user', default='',
+               help='user for keystone database, empty - user of '
+                    'src_mysql'),
+    cfg.StrOpt('db_password', default='',
+               help='password for keystone database, empty - password '
+                    'of src_mysql'),
+    cfg.StrOpt('db_name', default='keystone',
+               help='name of keystone database')
 ]
 
 
@@ -228,7 +270,18 @@ dst_identity = cfg.OptGroup(name='dst_identity',
 
 dst_identity_opts = [
     cfg.StrOpt('service', default='keystone',
-               help='name service for keystone')
+               help='name service for keystone'),
+    cfg.StrOpt('db_host', default='',
+               help='host of mysql with keystone database, empty - host '
+                    'of dst_mysql'),
+    cfg.StrOpt('db_user', default='',
+               help='user for keystone database, empty - user of '
+                    'dst_mysql'),
+    cfg.StrOpt('db_password', default='',
+               help='password for keystone database, empty - password '
+                    'of dst_mysql'),
+    cfg.StrOpt('db_name', default='keystone',
+               help='name of keystone database')
 ]
 
 
@@ -12,6 +12,10 @@
 # See the License for the specific language governing permissions and#
 # limitations under the License.
 
+from cloudferrylib.scheduler import checkpoint
+from cloudferrylib.scheduler import cursor
+from cloudferrylib.scheduler import scheduler
+
 
 class CloudFerry(object):
     def __new__(cls, config):
@@ -31,6 +35,23 @@ class CloudFerry(object):
 
     def __init__(self, config):
         self.config = config
+        self.resume = False
+
+    def run_plan(self, plan, namespace=None):
+        """Run plan, checkpointing it when migrate.checkpoint is set."""
+        s = scheduler.Scheduler(namespace=namespace,
+                                cursor=cursor.Cursor(plan))
+        store = None
+        if self.config.migrate.checkpoint:
+            store = checkpoint.CheckpointStore(self.config.migrate.checkpoint,
+                                               self.resume)
+            s.addCheckpoint(store)
+        try:
+            s.start()
+        finally:
+            if store:
+                store.close()
+        return s
 
     def migrate(self):
         pass
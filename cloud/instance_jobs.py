@@ -0,0 +1,73 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import threading
+
+import cfglib
+from cloud import cloud
+from cloudferrylib.base.action import action
+from cloudferrylib.os.actions import transport_instance
+from cloudferrylib.os.compute import nova_compute
+from cloudferrylib.os.identity import keystone
+from cloudferrylib.os.image import glance_image
+from cloudferrylib.os.storage import cinder_storage
+from cloudferrylib.utils import utils as utl
+
+# path of plan for distributed.Coordinator
+PLAN = 'cloud.instance_jobs.instance_plan'
+RESOURCES = {utl.IDENTITY_RESOURCE: keystone.KeystoneIdentity,
+             utl.IMAGE_RESOURCE: glance_image.GlanceImage,
+             utl.STORAGE_RESOURCE: cinder_storage.CinderStorage,
+             utl.COMPUTE_RESOURCE: nova_compute.NovaCompute}
+
+_clouds = []
+_clouds_lock = threading.Lock()
+
+
+def get_clouds():
+    """Source and destination clouds of process, built once from config."""
+    with _clouds_lock:
+        if not _clouds:
+            _clouds.extend([cloud.Cloud(RESOURCES, cloud.SRC, cfglib.CONF),
+                            cloud.Cloud(RESOURCES, cloud.DST, cfglib.CONF)])
+        return _clouds
+
+
+class ReadInstanceInfo(action.Action):
+    requires = ('instance_id',)
+    provides = ('cfg', 'cloud_src', 'cloud_dst', 'info')
+
+    def run(self, instance_id=None, **kwargs):
+        cloud_src, cloud_dst = get_clouds()
+        compute = cloud_src.resources[utl.COMPUTE_RESOURCE]
+        info = compute.read_info(search_opts={'id': instance_id,
+                                              'all_tenants': 1})
+        return {'cfg': cfglib.CONF,
+                'cloud_src': cloud_src,
+                'cloud_dst': cloud_dst,
+                'info': info}
+
+
+def instance_plan(instance_id=None):
+    """Net of job migrating one instance."""
+    return ReadInstanceInfo() >> transport_instance.TransportInstance()
+
+
+def instance_jobs(search_opts=None):
+    """Arguments of jobs for instances of source cloud, listed by pages."""
+    compute = get_clouds()[0].resources[utl.COMPUTE_RESOURCE]
+    search_opts = dict(search_opts or {}, all_tenants=1)
+    for page in compute.get_instances_pages(search_opts):
+        for instance in page:
+            yield {'instance_id': instance.id}
@@ -17,6 +17,12 @@ from cloudferrylib.scheduler import task
 
 
 class Action(task.Task):
+    """Step of migration.
+
+    Actions declare namespace keys they read (`requires`) and return or
+    change in place (`provides`), so SchedulerDag and AsyncScheduler can run
+    independent actions concurrently. Actions without them are barriers.
+    """
 
     def __init__(self):
         super(Action, self).__init__()
@@ -2,6 +2,8 @@ from cloudferrylib.base.action import action
 
 
 class ConvertComputeToImage(action.Action):
+    requires = ('cfg', 'cloud_src', 'cloud_dst', 'info_compute')
+    provides = ('image',)
 
     def run(self, cfg=None, cloud_src=None, cloud_dst=None, info_compute=None, **kwargs):
         image_info = {}
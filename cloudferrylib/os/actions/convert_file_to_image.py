@@ -4,6 +4,8 @@ from fabric.api import run, settings
 
 
 class ConvertFileToImage(action.Action):
+    requires = ('cfg', 'file_path', 'image_format', 'image_name')
+    provides = ()
 
     def run(self, cfg=None, file_path=None, image_format=None, image_name=None):
         with settings(host_string=cfg['host']):
@@ -3,6 +3,8 @@ from cloudferrylib.base.action import action
 
 
 class ConvertImageToCompute(action.Action):
+    requires = ('cfg', 'cloud_src', 'cloud_dst', 'info')
+    provides = ('compute',)
 
     def run(self, cfg=None, cloud_src=None, cloud_dst=None, info=None, **kwargs):
         instance_info = {'compute': {'instances': {}}}
@@ -4,6 +4,9 @@ from cloudferrylib.utils import forward_agent
 
 
 class ConvertImageToFile(action.Action):
+    requires = ('cfg', 'cloud_src', 'cloud_dst', 'image_id',
+                'base_filename')
+    provides = ()
 
     def run(self, cfg=None, cloud_src=None, cloud_dst=None, image_id=None, base_filename=None, **kwargs):
         with settings(host_string=cfg['host']):
@@ -24,6 +24,8 @@ AVAILABLE = 'available'
 
 
 class ConverterImageToVolume(converter.Converter):
+    requires = ('images_info', 'cloud_current')
+    provides = ('volumes_info', 'images_info')
 
     def __init__(self):
         super(ConverterImageToVolume, self).__init__()
@@ -32,6 +32,8 @@ def require_methods(methods, obj):
 
 
 class ConverterVolumeToImage(converter.Converter):
+    requires = ('volumes_info',)
+    provides = ('image_data',)
 
     def __init__(self, disk_format, cloud, container_format=BARE):
         self.cloud = cloud
@@ -19,6 +19,9 @@ from cloudferrylib.utils import utils as utl
 
 
 class CopyFromGlanceToGlance(transporter.Transporter):
+    requires = ('image_info',)
+    provides = (utl.IMAGE_RESOURCE,)
+
     def __init__(self, src_cloud, dst_cloud):
         self.src_cloud = src_cloud
         self.dst_cloud = dst_cloud
@@ -18,6 +18,8 @@ __author__ = 'mirrorcoder'
 
 
 class CreateNewVolumes(action.Action):
+    requires = ('volumes',)
+    provides = ('volumes_new',)
 
     def __init__(self, cloud):
         self.cloud = cloud
@@ -17,6 +17,8 @@ from cloudferrylib.base.action import action
 from cloudferrylib.utils import utils as utl
 
 class DeployVolumes(action.Action):
+    requires = ('volumes_info', 'identity_info')
+    provides = ()
 
     def __init__(self, cloud):
         self.cloud = cloud
@@ -18,6 +18,8 @@ from cloudferrylib.utils import utils as utl
 
 
 class DetachVolumes(action.Action):
+    requires = ('volumes_info',)
+    provides = ()
 
     def __init__(self, cloud):
         self.cloud = cloud
@@ -26,6 +26,9 @@ ISCSI = 'iscsi'
 
 
 class DetectAlgorithmStorageTransfer(action.Action):
+    requires = ('cloud_src', 'cloud_dst')
+    provides = ('__num_algorithm',)
+
     def run(self, cloud_src=None, cloud_dst=None, **kwargs):
         backend_storage_src = cloud_src.resources[utl.STORAGE_RESOURCE].get_backend()
         backend_storage_dst = cloud_dst.resources[utl.STORAGE_RESOURCE].get_backend()
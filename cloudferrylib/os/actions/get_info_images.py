@@ -17,6 +17,9 @@ from cloudferrylib.base.action import action
 from cloudferrylib.utils import utils as utl
 
 class GetInfoImages(action.Action):
+    requires = ('image_id', 'image_name', 'images_list', 'images_list_meta')
+    provides = ('image_data',)
+
     def __init__(self, cloud):
         self.cloud = cloud
         super(GetInfoImages, self).__init__()
@@ -18,6 +18,8 @@ from cloudferrylib.utils import utils as utl
 
 
 class GetInfoVolumes(action.Action):
+    requires = ()
+    provides = ('storage_info',)
 
     def __init__(self, cloud, criteria_search_volumes=dict()):
         self.cloud = cloud
@@ -18,6 +18,8 @@ from cloudferrylib.utils import utils as utl
 
 
 class IdentityTransporter(transporter.Transporter):
+    requires = ('src_cloud', 'dst_cloud')
+    provides = (utl.IDENTITY_RESOURCE,)
 
     def __init__(self):
         super(IdentityTransporter, self).__init__()
@@ -18,6 +18,8 @@ from cloudferrylib.utils.ssh_util import SshUtil
 
 
 class RemoteExecution(action.Action):
+    requires = ()
+    provides = ()
 
     def __init__(self, config_migrate, host, command):
         self.config_migrate = config_migrate
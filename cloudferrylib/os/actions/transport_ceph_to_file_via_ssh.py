@@ -19,6 +19,9 @@ __author__ = 'mirrorcoder'
 
 
 class TransportCephToFileViaSsh(transporter.Transporter):
+    requires = ('cfg', 'cloud_src', 'cloud_dst', 'info', 'resource_type',
+                'resource_name', 'resource_root_name')
+    provides = ()
 
     def run(self, cfg=None,
             cloud_src=None,
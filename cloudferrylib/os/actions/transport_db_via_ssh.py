@@ -18,6 +18,9 @@ from cloudferrylib.utils import utils as utl
 
 
 class TransportDbViaSsh(transporter.Transporter):
+    requires = ('cfg', 'cloud_src', 'cloud_dst', 'info_storage', 'resource_type',
+                'resource_name')
+    provides = ()
 
     def run(self, cfg=None,
             cloud_src=None,
@@ -30,6 +30,8 @@ TRANSPORTER_MAP = {CEPH: {CEPH: transport_ceph_to_ceph_via_ssh.TransportCephToCe
 
 
 class TransportInstance(action.Action):
+    requires = ('cfg', 'cloud_src', 'cloud_dst', 'info')
+    provides = ('info',)
 
     def run(self, cfg=None, cloud_src=None, cloud_dst=None, info=None, **kwargs):
         backend_ephem_drv_src = cloud_src.resources[utl.COMPUTE_RESOURCE].config.compute.backend
@@ -160,4 +162,23 @@ class TransportInstance(action.Action):
 
     def commit_diff_file(self, host, diff_file):
         with settings(host_string='host'):
-            run("qemu-img commit %s" % diff_file)
\ No newline at end of file
+            run("qemu-img commit %s" % diff_file)
+
+
+class TransportInstances(action.Action):
+    """Transports instances of source cloud one by one, while they are
+    read by pages (see NovaCompute.read_info_by_instance).
+    """
+    requires = ('cfg', 'cloud_src', 'cloud_dst')
+    provides = ()
+
+    def __init__(self, **read_kwargs):
+        self.read_kwargs = read_kwargs
+        super(TransportInstances, self).__init__()
+
+    def run(self, cfg=None, cloud_src=None, cloud_dst=None, **kwargs):
+        compute = cloud_src.resources[utl.COMPUTE_RESOURCE]
+        transport = TransportInstance()
+        for info in compute.read_info_by_instance(**self.read_kwargs):
+            transport.run(cfg=cfg, cloud_src=cloud_src, cloud_dst=cloud_dst,
+                          info=info)
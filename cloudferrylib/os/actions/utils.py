@@ -15,11 +15,41 @@
 from cloudferrylib.utils import utils
 from fabric.api import run, settings, env
 import copy
+import re
 
 LOG = utils.get_log(__name__)
 
 __author__ = 'mirrorcoder'
 
+# md5 of data passing through pipeline is printed to stderr by both ends,
+# data is verified while it is copied
+CHECKSUM_SOURCE = "{ %s | tee /dev/fd/3 | md5sum >&2; } 3>&1"
+CHECKSUM_SINK = "{ tee /dev/fd/3 | md5sum >&2; } 3>&1 | %s"
+CHECKSUM_RE = re.compile(r'^([0-9a-f]{32})\s+-\s*$', re.M)
+PIPEFAIL = "set -o pipefail; "
+
+
+def source_cmd(cmd):
+    return CHECKSUM_SOURCE % cmd
+
+
+def sink_cmd(cmd):
+    return CHECKSUM_SINK % cmd
+
+
+def run_verified(cmd, description):
+    """Run pipeline built with source_cmd and sink_cmd and compare
+    checksums of sent and received data.
+    """
+    out = run(PIPEFAIL + cmd)
+    checksums = CHECKSUM_RE.findall('\n'.join([out,
+                                               getattr(out, 'stderr', '')]))
+    if len(checksums) != 2 or checksums[0] != checksums[1]:
+        LOG.error("Checksum mismatch copying %s: %s", description, checksums)
+        source, dest = (checksums + [None, None])[:2]
+        raise utils.ChecksumImageInvalid(source, dest)
+    return out
+
 
 def transfer_file_to_file(cloud_src, cloud_dst, host_src, host_dst, path_src, path_dst, cfg_migrate):
     LOG.debug("| | copy file")
@@ -29,14 +59,19 @@ def transfer_file_to_file(cloud_src, cloud_dst, host_src, host_dst, path_src, pa
         with utils.forward_agent(cfg_migrate.key_filename):
             with utils.up_ssh_tunnel(host_dst, ssh_ip_dst) as port:
                 if cfg_migrate.file_compression == "dd":
-                    run(("ssh -oStrictHostKeyChecking=no %s 'dd bs=1M if=%s' " +
-                         "| ssh -oStrictHostKeyChecking=no -p %s localhost 'dd bs=1M of=%s'") %
-                        (host_src, path_src, port, path_dst))
+                    run_verified(("ssh -oStrictHostKeyChecking=no %s '%s' " +
+                                  "| ssh -oStrictHostKeyChecking=no -p %s localhost '%s'") %
+                                 (host_src, source_cmd("dd bs=1M if=%s" % path_src),
+                                  port, sink_cmd("dd bs=1M of=%s" % path_dst)),
+                                 path_src)
                 elif cfg_migrate.file_compression == "gzip":
-                    run(("ssh -oStrictHostKeyChecking=no %s 'gzip -%s -c %s' " +
-                         "| ssh -oStrictHostKeyChecking=no -p %s localhost 'gunzip | dd bs=1M of=%s'") %
-                        (host_src, cfg_migrate.level_compression,
-                         path_src, port, path_dst))
+                    # checksums are of uncompressed data
+                    run_verified(("ssh -oStrictHostKeyChecking=no %s '%s | gzip -%s -c' " +
+                                  "| ssh -oStrictHostKeyChecking=no -p %s localhost 'gunzip | %s'") %
+                                 (host_src, source_cmd("dd bs=1M if=%s" % path_src),
+                                  cfg_migrate.level_compression,
+                                  port, sink_cmd("dd bs=1M of=%s" % path_dst)),
+                                 path_src)
 
 
 def transfer_from_ceph_to_iscsi(cloud_src,
@@ -50,8 +85,11 @@ def transfer_from_ceph_to_iscsi(cloud_src,
     with settings(host_string=ssh_ip_src):
         with utils.forward_agent(env.key_filename):
             with utils.up_ssh_tunnel(dst_host, ssh_ip_dst) as port:
-                run(("rbd export -p %s %s - | ssh -oStrictHostKeyChecking=no -p %s localhost " +
-                     "'dd bs=1M of=%s'") % (ceph_pool_src, name_file_src, port, dst_path))
+                run_verified(("%s | ssh -oStrictHostKeyChecking=no -p %s localhost " +
+                              "'%s'") %
+                             (source_cmd("rbd export -p %s %s -" % (ceph_pool_src, name_file_src)),
+                              port, sink_cmd("dd bs=1M of=%s" % dst_path)),
+                             name_file_src)
 
 
 def transfer_from_iscsi_to_ceph(cloud_src,
@@ -65,9 +103,12 @@ def transfer_from_iscsi_to_ceph(cloud_src,
     delete_file_from_rbd(ssh_ip_dst, ceph_pool_dst, name_file_dst)
     with settings(host_string=ssh_ip_src):
         with utils.forward_agent(env.key_filename):
-            run(("ssh -oStrictHostKeyChecking=no %s 'dd bs=1M if=%s' | " +
-                "ssh -oStrictHostKeyChecking=no %s 'rbd import --image-format=2 - %s/%s'") %
-                (host_src, source_volume_path, ssh_ip_dst, ceph_pool_dst, name_file_dst))
+            run_verified(("ssh -oStrictHostKeyChecking=no %s '%s' | " +
+                          "ssh -oStrictHostKeyChecking=no %s '%s'") %
+                         (host_src, source_cmd("dd bs=1M if=%s" % source_volume_path),
+                          ssh_ip_dst,
+                          sink_cmd("rbd import --image-format=2 - %s/%s" % (ceph_pool_dst, name_file_dst))),
+                         source_volume_path)
 
 
 def transfer_from_ceph_to_ceph(cloud_src,
@@ -81,9 +122,12 @@ def transfer_from_ceph_to_ceph(cloud_src,
     delete_file_from_rbd(ssh_ip_dst, ceph_pool_dst, name_file_dst)
     with settings(host_string=ssh_ip_src):
         with utils.forward_agent(env.key_filename):
-            run(("rbd export -p %s volume-%s - | " +
-                 "ssh -oStrictHostKeyChecking=no %s 'rbd import --image-format=2 - %s/%s'") %
-                (ceph_pool_src, name_file_src, ssh_ip_dst, ceph_pool_dst, name_file_dst))
+            run_verified(("%s | " +
+                          "ssh -oStrictHostKeyChecking=no %s '%s'") %
+                         (source_cmd("rbd export -p %s volume-%s -" % (ceph_pool_src, name_file_src)),
+                          ssh_ip_dst,
+                          sink_cmd("rbd import --image-format=2 - %s/%s" % (ceph_pool_dst, name_file_dst))),
+                         name_file_src)
 
 
 def delete_file_from_rbd(ssh_ip, ceph_pool, name_file):
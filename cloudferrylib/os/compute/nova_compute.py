@@ -13,17 +13,19 @@
 # limitations under the License.
 
 
-import time
-
 from novaclient.v1_1 import client as nova_client
 
 from cloudferrylib.base import compute
+from cloudferrylib.utils import list_cache
+from cloudferrylib.utils import status_poller
+from cloudferrylib.utils import token_cache
 from utils import forward_agent
 
 
 DISK = "disk"
 LOCAL = ".local"
 LEN_UUID_INSTANCE = 36
+PAGE_SIZE = 1000
 
 
 class NovaCompute(compute.Compute):
@@ -42,22 +44,26 @@ class NovaCompute(compute.Compute):
         if params is None:
             params = self.config['cloud']
 
+        auth_url = token_cache.auth_url(params['host'])
+        token, endpoint = token_cache.get_token_and_endpoint(
+            params['user'], params['password'], params['tenant'], auth_url,
+            'compute')
+        kwargs = {}
+        if token and endpoint:
+            kwargs = {'auth_token': token, 'bypass_url': endpoint}
         return nova_client.Client(params['user'], params['password'],
-                                  params['tenant'],
-                                  "http://%s:35357/v2.0/" % params['host'])
+                                  params['tenant'], auth_url, **kwargs)
 
     def read_info(self, **kwargs):
         """
         Read info from cloud
 
         :param search_opts: Search options to filter out servers (optional).
+        :param page_size: Number of servers requested at once (optional).
         """
         search_opts = kwargs.get('search_opts', None)
-        info = {'compute': {'keypairs': {},
-                            'instances': {},
-                            'flavors': {},
-                            'user_quotas': [],
-                            'project_quotas': []}}
+        page_size = kwargs.get('page_size', PAGE_SIZE)
+        info = self.empty_info()
 
         for keypair in self.get_keypair_list():
             info['compute']['keypairs'][keypair.id] = {
@@ -65,56 +71,9 @@ class NovaCompute(compute.Compute):
                             'public_key': keypair.public_key},
                 'meta': {}}
 
-        for instance in self.get_instances_list(search_opts=search_opts):
-            security_groups = []
-            interfaces = []
-
-            for security_group in instance.security_groups:
-                security_groups.append(security_group['name'])
-
-            for interface in self.get_interface_list(instance.id):
-                interfaces.append({'port_id': interface.port_id,
-                                   'net_id': interface.net_id,
-                                   'fixed_ip': None})
-            is_ephemeral = self.get_flavor_from_id(instance.flavor['id']).ephemeral > 0
-            is_ceph = self.config['cloud']['backend'].lower == 'ceph'
-            host = getattr(instance, 'OS-EXT-SRV-ATTR:host')
-            if is_ceph:
-                host = self.config['cloud']['host']
-
-            ephemeral_path = {
-                'path_src': None,
-                'path_dst': None,
-                'host_src': host}
-            if is_ephemeral:
-                ephemeral_path['path_src'] = self._get_file_path(instance,
-                                                     is_ephemeral,
-                                                     is_ceph)
-            diff = {
-                'path_src': None,
-                'path_dst': None,
-                'host_src': host
-            }
-            if instance.image:
-                diff['path_src'] = self._get_file_path(instance, False, is_ceph)
-
-            info['compute']['instances'][instance.id] = {
-                'instance': {'name': instance.name,
-                             'id': instance.id,
-                             'tenant_id': instance.tenant_id,
-                             'status': instance.status,
-                             'flavor_id': instance.flavor['id'],
-                             'image_id': instance.image['id'],
-                             'key_name': instance.keyname,
-                             'availability_zone': instance.availability_zone,
-                             'security_groups': security_groups,
-                             'volume': None,
-                             'interfaces': interfaces,
-                             'host': host
-                             },
-                'ephemeral': ephemeral_path,
-                'diff': diff,
-                'meta': {}}
+        for instance_id, instance_info in self.read_instances_info(
+                search_opts, page_size):
+            info['compute']['instances'][instance_id] = instance_info
 
         for flavor in self.get_flavor_list():
             info['compute']['flavors'][flavor.id] = {
@@ -150,6 +109,132 @@ class NovaCompute(compute.Compute):
                      'meta': {}})
         return info
 
+    @staticmethod
+    def empty_info():
+        return {'compute': {'keypairs': {},
+                            'instances': {},
+                            'flavors': {},
+                            'user_quotas': [],
+                            'project_quotas': []}}
+
+    def read_info_by_instance(self, search_opts=None, page_size=PAGE_SIZE):
+        """Generator of info of every server in format of read_info, with
+        this server only and without keypairs, flavors and quotas.
+
+        Unlike read_info, info of all servers isn't held at once, consumer
+        can migrate first servers while next pages are loaded.
+        """
+        for instance_id, instance_info in self.read_instances_info(
+                search_opts, page_size):
+            info = self.empty_info()
+            info['compute']['instances'][instance_id] = instance_info
+            yield info
+
+    def read_instances_info(self, search_opts=None, page_size=PAGE_SIZE):
+        """Generator of (instance id, instance info) for every server.
+
+        Servers are requested by pages, so work with first instances can
+        start before next pages are loaded. Flavors are requested once and
+        ports once per page, not for every instance.
+        """
+        flavors = dict((flavor.id, flavor) for flavor in
+                       self.get_flavor_list(is_public=None))
+        for page in self.get_instances_pages(search_opts, page_size):
+            interfaces = self.get_interfaces_by_instances(page)
+            for instance in page:
+                yield self.make_instance_info(instance, flavors, interfaces)
+
+    def get_instances_pages(self, search_opts=None, page_size=PAGE_SIZE):
+        """Generator of pages of servers, up to page_size servers in every
+        page.
+
+        Pages are requested until empty one: nova cuts pages to its
+        osapi_max_limit, so short page isn't the last one.
+        """
+        marker = None
+        while True:
+            page = self.get_instances_list(search_opts=search_opts,
+                                           marker=marker, limit=page_size)
+            if not page:
+                return
+            yield page
+            marker = page[-1].id
+
+    def get_interfaces_by_instances(self, instances):
+        """Interfaces of instances by instance id from neutron ports.
+
+        None if cloud has no neutron, interfaces are requested from nova
+        for every instance then.
+        """
+        network = self.cloud.resources.get('network')
+        if not hasattr(network, 'get_ports_by_devices'):
+            return None
+        ports = network.get_ports_by_devices(
+            [instance.id for instance in instances])
+        return dict((device_id, [{'port_id': port['id'],
+                                  'net_id': port['network_id'],
+                                  'fixed_ip': None}
+                                 for port in device_ports])
+                    for device_id, device_ports in ports.iteritems())
+
+    def make_instance_info(self, instance, flavors=None, interfaces=None):
+        security_groups = []
+
+        for security_group in instance.security_groups:
+            security_groups.append(security_group['name'])
+
+        if interfaces is not None:
+            interfaces = interfaces.get(instance.id, [])
+        else:
+            interfaces = [{'port_id': interface.port_id,
+                           'net_id': interface.net_id,
+                           'fixed_ip': None}
+                          for interface in
+                          self.get_interface_list(instance.id)]
+        flavor = (flavors or {}).get(instance.flavor['id'])
+        if flavor is None:
+            # flavor can be deleted or hidden from list
+            flavor = self.get_flavor_from_id(instance.flavor['id'])
+        is_ephemeral = flavor.ephemeral > 0
+        is_ceph = self.config['cloud']['backend'].lower == 'ceph'
+        host = getattr(instance, 'OS-EXT-SRV-ATTR:host')
+        if is_ceph:
+            host = self.config['cloud']['host']
+
+        ephemeral_path = {
+            'path_src': None,
+            'path_dst': None,
+            'host_src': host}
+        if is_ephemeral:
+            ephemeral_path['path_src'] = self._get_file_path(instance,
+                                                             is_ephemeral,
+                                                             is_ceph)
+        diff = {
+            'path_src': None,
+            'path_dst': None,
+            'host_src': host
+        }
+        if instance.image:
+            diff['path_src'] = self._get_file_path(instance, False, is_ceph)
+
+        return instance.id, {
+            'instance': {'name': instance.name,
+                         'id': instance.id,
+                         'tenant_id': instance.tenant_id,
+                         'status': instance.status,
+                         'flavor_id': instance.flavor['id'],
+                         'image_id': instance.image['id'],
+                         'key_name': instance.keyname,
+                         'availability_zone': instance.availability_zone,
+                         'security_groups': security_groups,
+                         'volume': None,
+                         'interfaces': interfaces,
+                         'host': host
+                         },
+            'ephemeral': ephemeral_path,
+            'diff': diff,
+            'meta': {}}
+
     def deploy(self, info, **kwargs):
         resources_deploy = kwargs.get('resources_deploy', False)
         if resources_deploy:
@@ -162,25 +247,25 @@ class NovaCompute(compute.Compute):
             self._deploy_instances(info['compute']['instances'])
 
     def _deploy_user_quotas(self, quotas):
-        insert_cmd = "use nova;INSERT INTO quotas " \
+        insert_cmd = "INSERT INTO nova.quotas " \
                      "(user_id, project_id, resource, hard_limit) " \
-                     "VALUES ('%s', '%s', '%s', %s)"
-        for _quota in quotas:
-            quota = _quota['quota']
-            meta = _quota['meta']
-            self.mysql_connector.execute(insert_cmd % (
-                meta['user']['id'], meta['project']['id'], quota['resource'],
-                quota['hard_limit']))
+                     "VALUES (:user_id, :project_id, :resource, :hard_limit)"
+        self.mysql_connector.execute_many(insert_cmd, [
+            {'user_id': _quota['meta']['user']['id'],
+             'project_id': _quota['meta']['project']['id'],
+             'resource': _quota['quota']['resource'],
+             'hard_limit': _quota['quota']['hard_limit']}
+            for _quota in quotas])
 
     def _deploy_project_quotas(self, quotas):
-        insert_cmd = "use nova;INSERT INTO project_user_quotas " \
+        insert_cmd = "INSERT INTO nova.project_user_quotas " \
                      "(project_id, resource, hard_limit) " \
-                     "VALUES ('%s', '%s', %s)"
-        for _quota in quotas:
-            quota = _quota['quota']
-            meta = _quota['meta']
-            self.mysql_connector.execute(insert_cmd % (
-                meta['project']['id'], quota['resource'], quota['hard_limit']))
+                     "VALUES (:project_id, :resource, :hard_limit)"
+        self.mysql_connector.execute_many(insert_cmd, [
+            {'project_id': _quota['meta']['project']['id'],
+             'resource': _quota['quota']['resource'],
+             'hard_limit': _quota['quota']['hard_limit']}
+            for _quota in quotas])
 
     def _deploy_keypair(self, keypairs):
         dest_keypairs = [keypair.name for keypair in self.get_keypair_list()]
@@ -268,22 +353,27 @@ class NovaCompute(compute.Compute):
         return self.nova_client.flavors.get(flavor_id)
 
     def get_flavor_list(self, **kwargs):
-        return self.nova_client.flavors.list(**kwargs)
+        return list_cache.cached_list(self.nova_client.flavors, **kwargs)
 
     def create_flavor(self, **kwargs):
-        return self.nova_client.flavors.create(**kwargs)
+        flavor = self.nova_client.flavors.create(**kwargs)
+        list_cache.invalidate(self.nova_client.flavors)
+        return flavor
 
     def delete_flavor(self, flavor_id):
         self.nova_client.flavors.delete(flavor_id)
+        list_cache.invalidate(self.nova_client.flavors)
 
     def get_keypair_list(self):
-        return self.nova_client.keypairs.list()
+        return list_cache.cached_list(self.nova_client.keypairs)
 
     def get_keypair(self, name):
         return self.nova_client.keypairs.get(name)
 
     def create_keypair(self, name, public_key=None):
-        return self.nova_client.keypairs.create(name, public_key)
+        keypair = self.nova_client.keypairs.create(name, public_key)
+        list_cache.invalidate(self.nova_client.keypairs)
+        return keypair
 
     def get_interface_list(self, server_id):
         return self.nova_client.servers.interface_list(server_id)
@@ -292,10 +382,9 @@ class NovaCompute(compute.Compute):
         return self.nova_client.servers.interface_attach(server_id, port_id,
                                                          net_id, fixed_ip)
 
-    def wait_for_status(self, getter, id, status):
-        # FIXME(toha) What if it is infinite loop here?
-        while getter.get(id).status != status:
-            time.sleep(1)
+    def wait_for_status(self, getter, id, status, timeout=None):
+        status_poller.wait_for_status(getter, id, status, timeout,
+                                      search_opts={'all_tenants': 1})
 
     def get_status(self, getter, id):
         return getter.get(id).status
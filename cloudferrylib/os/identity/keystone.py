@@ -12,11 +12,21 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from multiprocessing.pool import ThreadPool
+
 from cloudferrylib.base import identity
 from keystoneclient.v2_0 import client as keystone_client
-from utils import Postman, Templater, GeneratorPassword
+from cloudferrylib.os.identity import service_catalog
+from cloudferrylib.utils import list_cache
+from cloudferrylib.utils import mysql_connector
+from cloudferrylib.utils import rate_limit
+from cloudferrylib.utils import token_cache
+from utils import Postman, Templater, GeneratorPassword, get_log
+
+LOG = get_log(__name__)
 
 NOVA_SERVICE = 'nova'
+KEYSTONE_DB = 'keystone'
 
 
 class KeystoneIdentity(identity.Identity):
@@ -26,7 +36,7 @@ class KeystoneIdentity(identity.Identity):
         super(KeystoneIdentity, self).__init__()
         self.config = config
         self.keystone_client = self.get_client()
-        self.mysql_connector = cloud.mysql_connector
+        self.mysql_connector = self.get_db_connector()
         self.cloud = cloud
         self.postman = None
         if self.config['mail']:
@@ -88,43 +98,51 @@ class KeystoneIdentity(identity.Identity):
     def get_client(self):
         """ Getting keystone client """
 
-        ks_client_for_token = keystone_client.Client(
-            username=self.config['cloud']['user'],
-            password=self.config['cloud']['password'],
-            tenant_name=self.config['cloud']['tenant'],
-            auth_url="http://" + self.config['cloud']['host'] + ":35357/v2.0/")
+        auth_url = token_cache.auth_url(self.config['cloud']['host'])
+        auth_ref = token_cache.get_auth_ref(self.config['cloud']['user'],
+                                            self.config['cloud']['password'],
+                                            self.config['cloud']['tenant'],
+                                            auth_url, token_only=True)
+
+        return keystone_client.Client(token=auth_ref['token']['id'],
+                                      endpoint=auth_url)
+
+    def get_db_connector(self):
+        """Connector of keystone database, db_* options of identity config
+        override mysql config of cloud.
+        """
+        identity_config = self.config.get('identity') or {}
+        db_config = dict(self.config.get('mysql') or {})
+        for option in ('host', 'user', 'password'):
+            if identity_config.get('db_' + option):
+                db_config[option] = identity_config['db_' + option]
+        return mysql_connector.MysqlConnector(
+            db_config, identity_config.get('db_name') or KEYSTONE_DB)
 
-        return keystone_client.Client(
-            token=ks_client_for_token.auth_ref['token']['id'],
-            endpoint="http://" + self.config['cloud']['host'] + ":35357/v2.0/")
+    def get_catalog(self):
+        return service_catalog.get_catalog(self.keystone_client)
 
     def get_service_name_by_type(self, service_type):
         """Getting service_name from keystone. """
 
-        for service in self.get_services_list():
-            if service.type == service_type:
-                return service.name
-        return NOVA_SERVICE
+        service = self.get_catalog().get_service_by_type(service_type)
+        return service.name if service else NOVA_SERVICE
 
     def get_public_endpoint_service_by_id(self, service_id):
         """Getting endpoint public URL from keystone. """
 
-        for endpoint in self.keystone_client.endpoints.list():
-            if endpoint.service_id == service_id:
-                return endpoint.publicurl
+        return self.get_catalog().get_public_endpoint(service_id)
 
     def get_service_id(self, service_name):
         """Getting service_id from keystone. """
 
-        for service in self.get_services_list():
-            if service.name == service_name:
-                return service.id
+        service = self.get_catalog().get_service_by_name(service_name)
+        return service.id if service else None
 
     def get_endpoint_by_service_name(self, service_name):
         """ Getting endpoint public URL by service name from keystone. """
 
-        service_id = self.get_service_id(service_name)
-        return self.get_public_endpoint_service_by_id(service_id)
+        return self.get_catalog().get_endpoint_by_name(service_name)
 
     def get_tenants_func(self):
         tenants = {tenant.id: tenant.name for tenant in self.get_tenants_list()}
@@ -160,17 +178,17 @@ class KeystoneIdentity(identity.Identity):
     def get_tenants_list(self):
         """ Getting list of tenants from keystone. """
 
-        return self.keystone_client.tenants.list()
+        return list_cache.cached_list(self.keystone_client.tenants)
 
     def get_users_list(self):
         """ Getting list of users from keystone. """
 
-        return self.keystone_client.users.list()
+        return list_cache.cached_list(self.keystone_client.users)
 
     def get_roles_list(self):
         """ Getting list of available roles from keystone. """
 
-        return self.keystone_client.roles.list()
+        return list_cache.cached_list(self.keystone_client.roles)
 
     def roles_for_user(self, user_id, tenant_id):
         """ Getting list of user roles for tenant """
@@ -180,33 +198,41 @@ class KeystoneIdentity(identity.Identity):
     def create_role(self, role_name):
         """ Create new role in keystone. """
 
-        return self.keystone_client.roles.create(role_name)
+        role = self.keystone_client.roles.create(role_name)
+        list_cache.invalidate(self.keystone_client.roles)
+        return role
 
     def create_tenant(self, tenant_name, description=None, enabled=True):
         """ Create new tenant in keystone. """
 
-        return self.keystone_client.tenants.create(tenant_name=tenant_name,
-                                                   description=description,
-                                                   enabled=enabled)
+        tenant = self.keystone_client.tenants.create(tenant_name=tenant_name,
+                                                     description=description,
+                                                     enabled=enabled)
+        list_cache.invalidate(self.keystone_client.tenants)
+        return tenant
 
     def create_user(self, name, password=None, email=None, tenant_id=None,
                     enabled=True):
         """ Create new user in keystone. """
 
-        return self.keystone_client.users.create(name=name,
+        user = self.keystone_client.users.create(name=name,
                                                  password=password,
                                                  email=email,
                                                  tenant_id=tenant_id,
                                                  enabled=enabled)
+        list_cache.invalidate(self.keystone_client.users)
+        return user
 
     def update_tenant(self, tenant_id, tenant_name=None, description=None,
                       enabled=None):
         """Update a tenant with a new name and description."""
 
-        return self.keystone_client.tenants.update(tenant_id,
-                                                   tenant_name=tenant_name,
-                                                   description=description,
-                                                   enabled=enabled)
+        tenant = self.keystone_client.tenants.update(tenant_id,
+                                                     tenant_name=tenant_name,
+                                                     description=description,
+                                                     enabled=enabled)
+        list_cache.invalidate(self.keystone_client.tenants)
+        return tenant
 
     def update_user(self, user, **kwargs):
         """Update user data.
@@ -214,7 +240,9 @@ class KeystoneIdentity(identity.Identity):
         Supported arguments include ``name``, ``email``, and ``enabled``.
         """
 
-        return self.keystone_client.users.update(user, **kwargs)
+        user = self.keystone_client.users.update(user, **kwargs)
+        list_cache.invalidate(self.keystone_client.users)
+        return user
 
     def get_auth_token_from_user(self):
         return self.keystone_client.auth_token_from_user
@@ -278,40 +306,92 @@ class KeystoneIdentity(identity.Identity):
                 _role['meta']['new_id'] = dst_roles[role['name']]
 
     def _get_user_passwords(self):
+        names = {user.id: user.name for user in self.get_users_list()}
         info = {}
-        for user in self.get_users_list():
-            for password in self.mysql_connector.execute(
-                    "SELECT password FROM user WHERE id = :user_id",
-                    user_id=user.id):
-                info[user.name] = password[0]
+        for user_id, password in self.mysql_connector.select_in(
+                "SELECT id, password FROM user WHERE id IN :values", names):
+            info[names[user_id]] = password
 
         return info
 
     def _get_user_tenants_roles(self):
+        """Index {user name: {tenant name: [roles]}} of role assignments,
+        pairs of user and tenant without roles are not listed.
+        """
+        try:
+            assignments = self._get_role_assignments_from_db()
+        except Exception as e:
+            LOG.warning("Can't read role assignments from keystone db "
+                        "(%s), requesting them through API", e)
+            assignments = self._get_role_assignments_from_api()
+        users = {user.id: user.name for user in self.get_users_list()}
+        tenants = {tenant.id: tenant.name
+                   for tenant in self.get_tenants_list()}
+        roles = {role.id: role.name for role in self.get_roles_list()}
         user_tenants_roles = {}
-        tenants = self.get_tenants_list()
-        for user in self.get_users_list():
-            user_tenants_roles[user.name] = {}
-            for tenant in tenants:
-                roles = []
-                for role in self.roles_for_user(user.id, tenant.id):
-                    roles.append({'role': {'name': role.name, 'id': role.id}})
-                user_tenants_roles[user.name][tenant.name] = roles
+        for user_id, tenant_id, role_id in assignments:
+            if (user_id not in users or tenant_id not in tenants or
+                    role_id not in roles):
+                continue
+            user_tenants_roles.setdefault(users[user_id], {}).setdefault(
+                tenants[tenant_id], []).append(
+                {'role': {'name': roles[role_id], 'id': role_id}})
         return user_tenants_roles
 
+    def _get_role_assignments_from_db(self):
+        """(user id, tenant id, role id) of all assignments in one query."""
+        return [tuple(row) for row in self.mysql_connector.execute(
+            "SELECT actor_id, target_id, role_id FROM assignment "
+            "WHERE type = 'UserProject' AND inherited = 0")]
+
+    def _get_role_assignments_from_api(self, pairs=None):
+        """(user id, tenant id, role id) of assignments of given (user id,
+        tenant id) pairs, of all pairs by default. Pairs are requested
+        concurrently.
+        """
+        if pairs is None:
+            tenants = self.get_tenants_list()
+            pairs = [(user.id, tenant.id) for user in self.get_users_list()
+                     for tenant in tenants]
+
+        def pair_assignments(pair):
+            user_id, tenant_id = pair
+            return [(user_id, tenant_id, role.id)
+                    for role in self.roles_for_user(user_id, tenant_id)]
+
+        return [assignment
+                for assignments in self._api_map(pair_assignments, pairs)
+                for assignment in assignments]
+
+    def _api_map(self, func, items):
+        """Results of func for items, calls are made by identity_api_workers
+        threads, identity_api_rate calls per second at most (0 - no limit).
+        """
+        limiter = rate_limit.TokenBucket(
+            self.config['migrate']['identity_api_rate'])
+
+        def call(item):
+            limiter.consume(1)
+            return func(item)
+
+        pool = ThreadPool(self.config['migrate']['identity_api_workers'])
+        try:
+            return pool.map(call, items)
+        finally:
+            pool.close()
+            pool.join()
+
     def _upload_user_passwords(self, users, user_passwords):
-        for _user in users:
-            user = _user['user']
-            if not _user['meta']['overwrite_password']:
-                continue
-            self.mysql_connector.execute(
-                "UPDATE user SET password = :password WHERE id = :user_id",
-                user_id=_user['meta']['new_id'],
-                password=user_passwords[user['name']])
+        self.mysql_connector.execute_many(
+            "UPDATE user SET password = :password WHERE id = :user_id",
+            [{'user_id': _user['meta']['new_id'],
+              'password': user_passwords[_user['user']['name']]}
+             for _user in users if _user['meta']['overwrite_password']])
 
     def _upload_user_tenant_roles(self, user_tenants_roles, users, tenants):
         roles_id = {role.name: role.id for role in self.get_roles_list()}
 
+        required = set()
         for _user in users:
             user = _user['user']
             # FIXME should be deleted after determining how
@@ -320,16 +400,31 @@ class KeystoneIdentity(identity.Identity):
                 continue
             for _tenant in tenants:
                 tenant = _tenant['tenant']
-                exists_roles = [role.name for role in
-                                self.roles_for_user(_user['meta']['new_id'],
-                                                    _tenant['meta']['new_id'])]
-                for _role in user_tenants_roles[user['name']][tenant['name']]:
-                    role = _role['role']
-                    if role['name'] in exists_roles:
-                        continue
-                    self.keystone_client.roles.add_user_role(
-                        _user['meta']['new_id'], roles_id[role['name']],
-                        _tenant['meta']['new_id'])
+                for _role in user_tenants_roles.get(user['name'], {}).get(
+                        tenant['name'], []):
+                    required.add((_user['meta']['new_id'],
+                                  _tenant['meta']['new_id'],
+                                  roles_id[_role['role']['name']]))
+        if not required:
+            return
+
+        try:
+            existing = self._get_role_assignments_from_db()
+        except Exception as e:
+            LOG.warning("Can't read role assignments from keystone db "
+                        "(%s), requesting them through API", e)
+            existing = self._get_role_assignments_from_api(
+                {(user_id, tenant_id) for user_id, tenant_id, _ in required})
+        missing = sorted(required - set(existing))
+        LOG.info("Adding %d of %d role assignments", len(missing),
+                 len(required))
+
+        def add_user_role(assignment):
+            user_id, tenant_id, role_id = assignment
+            self.keystone_client.roles.add_user_role(user_id, role_id,
+                                                     tenant_id)
+
+        self._api_map(add_user_role, missing)
 
     def _generate_password(self):
         return self.generator.get_random_password()
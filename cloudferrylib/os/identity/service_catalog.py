@@ -0,0 +1,108 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import threading
+import weakref
+
+
+class ServiceCatalog(object):
+    """Services and public endpoints of cloud indexed by name, type and id.
+
+    Catalog is shared by all clients of cloud (auth url and region).
+    Services and endpoints are listed once and listed again only when
+    auth token of client, which listed them, is changed.
+    """
+
+    def __init__(self, keystone_client, region=None):
+        self.keystone_client = keystone_client
+        self.region = region
+        self.loaded_by = None
+        self.token = None
+        self.by_name = {}
+        self.by_type = {}
+        self.public_urls = {}
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        with self.lock:
+            client = self.keystone_client
+            token = getattr(client, 'auth_token', None)
+            if self.loaded_by is not None and (
+                    self.loaded_by() is not client or token == self.token):
+                # clients of other tenants don't change catalog of cloud
+                return
+            by_name, by_type, public_urls = {}, {}, {}
+            for service in client.services.list():
+                # the first one wins as in lookup by listing
+                by_name.setdefault(service.name, service)
+                by_type.setdefault(service.type, service)
+            for endpoint in client.endpoints.list():
+                if self.region and endpoint.region != self.region:
+                    continue
+                public_urls.setdefault(endpoint.service_id,
+                                       endpoint.publicurl)
+            self.by_name, self.by_type = by_name, by_type
+            self.public_urls = public_urls
+            self.token = token
+            self.loaded_by = weakref.ref(client)
+
+    def get_service_by_name(self, name):
+        self.refresh()
+        return self.by_name.get(name)
+
+    def get_service_by_type(self, service_type):
+        self.refresh()
+        return self.by_type.get(service_type)
+
+    def get_public_endpoint(self, service_id):
+        self.refresh()
+        return self.public_urls.get(service_id)
+
+    def get_endpoint_by_name(self, name):
+        service = self.get_service_by_name(name)
+        return self.get_public_endpoint(service.id) if service else None
+
+    def get_endpoint_by_type(self, service_type, **params):
+        """Public URL of service for tenant_id and user_id in params."""
+        service = self.get_service_by_type(service_type)
+        url = self.get_public_endpoint(service.id) if service else None
+        return format_url(url, **params) if url else None
+
+
+def format_url(url, **params):
+    """URL with values of keystone template, e.g. '$(tenant_id)s'."""
+    return url.replace('$(', '%(') % params
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(keystone_client, auth_url=None, region=None):
+    """Catalog shared by all clients of cloud, auth_url defaults to
+    endpoint of keystone client.
+    """
+    if auth_url is None:
+        auth_url = (keystone_client.auth_url or
+                    keystone_client.management_url)
+    key = (auth_url.rstrip('/'), region)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = _catalogs[key] = ServiceCatalog(keystone_client,
+                                                      region)
+    with catalog.lock:
+        # the last client has the freshest token
+        catalog.keystone_client = keystone_client
+    return catalog
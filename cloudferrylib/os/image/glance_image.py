@@ -13,17 +13,66 @@
 # limitations under the License.
 
 
+import functools
 import json
-import time
+import os
 
 from fabric.api import run
 from fabric.api import settings
 
 from cloudferrylib.base import image
+from cloudferrylib.utils import list_cache
+from cloudferrylib.utils import parallel_copy
+from cloudferrylib.utils import rate_limit
+from cloudferrylib.utils import resumable_transfer
+from cloudferrylib.utils import status_poller
+from glanceclient import exc as glance_exc
 from glanceclient.v1 import client as glance_client
 from migrationlib.os.utils import FileLikeProxy
 
 
+class ImageIndex(object):
+    """Images of cloud indexed by id, name and checksum.
+
+    Index is built from one listing of images and is updated by the owner
+    when it creates or deletes images. When several images have the same
+    name or checksum, the first listed one is found.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self.by_id = {}
+        self.by_name = {}
+        self.by_checksum = {}
+
+    def load(self, images):
+        self.by_id, self.by_name, self.by_checksum = {}, {}, {}
+        for glance_image in images:
+            self.add(glance_image)
+        self.loaded = True
+
+    def add(self, glance_image):
+        self.by_id[glance_image.id] = glance_image
+        self.by_name.setdefault(glance_image.name, glance_image)
+        if glance_image.checksum:
+            self.by_checksum.setdefault(glance_image.checksum, glance_image)
+
+    def remove(self, image_id):
+        glance_image = self.by_id.pop(image_id, None)
+        if glance_image is None:
+            return
+        # other image with the same name or checksum takes its place
+        for index, attr in ((self.by_name, 'name'),
+                            (self.by_checksum, 'checksum')):
+            value = getattr(glance_image, attr)
+            if index.get(value) is glance_image:
+                del index[value]
+                for other in self.by_id.itervalues():
+                    if getattr(other, attr) == value:
+                        index[value] = other
+                        break
+
+
 class GlanceImage(image.Image):
 
     """
@@ -36,6 +85,7 @@ class GlanceImage(image.Image):
         self.cloud = cloud
         self.identity_client = cloud.resources['identity']
         self.glance_client = self.get_glance_client()
+        self.index = ImageIndex()
         super(GlanceImage, self).__init__()
 
     def get_glance_client(self):
@@ -49,30 +99,44 @@ class GlanceImage(image.Image):
             token=self.identity_client.get_auth_token_from_user())
 
     def get_image_list(self):
-        return self.glance_client.images.list()
+        return list_cache.cached_list(self.glance_client.images)
+
+    def get_index(self):
+        """ Index of images, images are listed on first use. """
+
+        if not self.index.loaded:
+            self.index.load(self.get_image_list())
+        return self.index
 
     def create_image(self, **kwargs):
-        return self.glance_client.images.create(**kwargs)
+        glance_image = self.glance_client.images.create(**kwargs)
+        list_cache.invalidate(self.glance_client.images)
+        if self.index.loaded:
+            self.index.add(glance_image)
+        return glance_image
 
     def delete_image(self, image_id):
         self.glance_client.images.delete(image_id)
+        list_cache.invalidate(self.glance_client.images)
+        self.index.remove(image_id)
 
     def get_image_by_id(self, image_id):
-        for glance_image in self.get_image_list():
-            if glance_image.id == image_id:
-                return glance_image
+        try:
+            return self.glance_client.images.get(image_id)
+        except glance_exc.HTTPNotFound:
+            return None
 
     def get_image_by_name(self, image_name):
-        for glance_image in self.get_image_list():
-            if glance_image.name == image_name:
-                return glance_image
+        return self.get_index().by_name.get(image_name)
+
+    def get_image_by_checksum(self, checksum):
+        return self.get_index().by_checksum.get(checksum)
 
     def get_image(self, im):
         """ Get image by id or name. """
 
-        for glance_image in self.get_image_list():
-            if im in (glance_image.name, glance_image.id):
-                return glance_image
+        index = self.get_index()
+        return index.by_id.get(im) or index.by_name.get(im)
 
     def get_image_status(self, image_id):
         return self.get_image_by_id(image_id).status
@@ -118,7 +182,10 @@ class GlanceImage(image.Image):
                 info['image']['images'][glance_image.id]['meta'] = meta
 
         else:
-            for glance_image in self.get_image_list():
+            glance_images = self.get_image_list()
+            # full listing is also used for refreshing index
+            self.index.load(glance_images)
+            for glance_image in glance_images:
                 info = self.make_image_info(glance_image, info)
 
         return info
@@ -145,39 +212,81 @@ class GlanceImage(image.Image):
         return info
 
     def deploy(self, info):
-        migrate_images_list = []
+        jobs = []
+        planned = set()
         for gl_image in info['image']['images'].itervalues():
-            if gl_image['image']['checksum'] in [x.checksum for x in
-                                                 self.get_image_list()]:
+            checksum = gl_image['image']['checksum']
+            # destination images are listed once for the whole deploy,
+            # image with the same data is uploaded once
+            if checksum in planned or self.get_image_by_checksum(checksum):
                 continue
+            if checksum:
+                planned.add(checksum)
             gl_image['image']['resource_src'] = info['image']['resource']
-            migrate_image = self.create_image(
-                name=gl_image['image']['name'] + 'Migrate',
-                container_format=gl_image['image']['container_format'],
-                disk_format=gl_image['image']['disk_format'],
-                is_public=gl_image['image']['is_public'],
-                protected=gl_image['image']['protected'],
-                size=gl_image['image']['size'],
-                data=FileLikeProxy.FileLikeProxy(
-                    gl_image['image'],
-                    FileLikeProxy.callback_print_progress,
-                    self.config['migrate']['speed_limit']))
-
-            meta = gl_image['meta']
-            migrate_images_list.append((migrate_image, meta))
+            jobs.append(parallel_copy.CopyJob(
+                gl_image['image']['name'], gl_image['image']['size'],
+                functools.partial(self.upload_image, gl_image)))
+
+        copier = parallel_copy.ParallelCopy(
+            self.config['migrate']['image_copy_streams'],
+            rate_limit.parse_speed_limit(
+                self.config['migrate']['speed_limit']))
+        migrate_images_list = copier.run(jobs)
 
         if migrate_images_list:
-            im_name_list = [(im.name, meta) for (im, meta) in
-                            migrate_images_list]
-            print im_name_list
-            new_info = self.read_info(images_list_meta=im_name_list)
+            print [(im.name, meta) for (im, meta) in migrate_images_list]
+            new_info = {'image': {'resource': self,
+                                  'images': {}}
+                        }
+            for (migrate_image, meta) in migrate_images_list:
+                new_info = self.make_image_info(migrate_image, new_info)
+                new_info['image']['images'][migrate_image.id]['meta'] = meta
             return new_info
 
         return {}
 
-    def wait_for_status(self, id_res, status):
-        while self.glance_client.images.get(id_res).status != status:
-            time.sleep(1)
+    def upload_image(self, gl_image, limiter):
+        """Copy image to cloud, returns new image and meta of source one.
+
+        With staging directory image is downloaded to it first, download
+        and upload failed in previous attempts are resumed from the last
+        complete chunk.
+        """
+        def open_stream(offset=0):
+            stream = FileLikeProxy.FileLikeProxy(
+                gl_image['image'],
+                FileLikeProxy.callback_print_progress,
+                self.config['migrate']['speed_limit'],
+                limiter=limiter)
+            if offset:
+                stream.skip(offset)
+            return stream
+
+        spool = None
+        if self.config['migrate']['image_staging']:
+            spool = resumable_transfer.ChunkSpool(
+                os.path.join(self.config['migrate']['image_staging'],
+                             gl_image['image']['id']),
+                source_id=gl_image['image']['checksum'])
+            spool.download(open_stream)
+            data = spool.reader()
+        else:
+            data = open_stream()
+        migrate_image = self.create_image(
+            name=gl_image['image']['name'] + 'Migrate',
+            container_format=gl_image['image']['container_format'],
+            disk_format=gl_image['image']['disk_format'],
+            is_public=gl_image['image']['is_public'],
+            protected=gl_image['image']['protected'],
+            size=gl_image['image']['size'],
+            data=data)
+        if spool:
+            spool.remove()
+        return migrate_image, gl_image['meta']
+
+    def wait_for_status(self, id_res, status, timeout=None):
+        status_poller.wait_for_status(self.glance_client.images, id_res,
+                                      status, timeout)
 
     @staticmethod
     def patch_image(backend_storage, cloud, image_id):
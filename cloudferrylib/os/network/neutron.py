@@ -15,10 +15,13 @@
 from cloudferrylib.base import network
 from neutronclient.v2_0 import client as neutron_client
 from neutronclient.common.exceptions import IpAddressGenerationFailureClient
+from cloudferrylib.utils import token_cache
 from utils import get_log
 
 LOG = get_log(__name__)
 DEFAULT_SECGR = 'default'
+# device ids are sent in query string, which length is limited
+PORTS_CHUNK = 100
 
 
 class NeutronNetwork(network.Network):
@@ -36,11 +39,18 @@ class NeutronNetwork(network.Network):
         super(NeutronNetwork, self).__init__()
 
     def get_client(self):
+        auth_url = token_cache.auth_url(self.config["host"])
+        token, endpoint = token_cache.get_token_and_endpoint(
+            self.config["user"], self.config["password"],
+            self.config["tenant"], auth_url, 'network')
+        kwargs = {}
+        if token and endpoint:
+            kwargs = {'token': token, 'endpoint_url': endpoint}
         return neutron_client.Client(
             username=self.config["user"],
             password=self.config["password"],
             tenant_name=self.config["tenant"],
-            auth_url="http://" + self.config["host"] + ":35357/v2.0/")
+            auth_url=auth_url, **kwargs)
 
     def read_info(self, **kwargs):
 
@@ -169,6 +179,17 @@ class NeutronNetwork(network.Network):
             routers_info.append(rinfo)
         return routers_info
 
+    def get_ports_by_devices(self, device_ids, chunk_size=PORTS_CHUNK):
+        """Ports of devices by device id, requested by chunks of ids."""
+        ports = {}
+        device_ids = list(device_ids)
+        for i in xrange(0, len(device_ids), chunk_size):
+            chunk = device_ids[i:i + chunk_size]
+            for port in self.neutron_client.list_ports(
+                    device_id=chunk)['ports']:
+                ports.setdefault(port['device_id'], []).append(port)
+        return ports
+
     def get_floatingips(self):
         floatings = self.neutron_client.list_floatingips()['floatingips']
         get_tenant_name = self.identity_client.get_tenants_func()
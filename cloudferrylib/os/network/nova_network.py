@@ -13,6 +13,8 @@
 # limitations under the License.
 from cloudferrylib.base import network
 from novaclient.v1_1 import client as nova_client
+from cloudferrylib.utils import list_cache
+from cloudferrylib.utils import token_cache
 
 
 class NovaNetwork(network.Network):
@@ -22,10 +24,17 @@ class NovaNetwork(network.Network):
         self.nova_client = self.get_client()
 
     def get_client(self):
+        auth_url = token_cache.auth_url(self.config["host"])
+        token, endpoint = token_cache.get_token_and_endpoint(
+            self.config["user"], self.config["password"],
+            self.config["tenant"], auth_url, 'compute')
+        kwargs = {}
+        if token and endpoint:
+            kwargs = {'auth_token': token, 'bypass_url': endpoint}
         return nova_client.Client(self.config["user"],
                                   self.config["password"],
                                   self.config["tenant"],
-                                  "http://" + self.config["host"] + ":35357/v2.0/")
+                                  auth_url, **kwargs)
 
     def read_info(self, opts=None):
         opts = {} if not opts else opts
@@ -38,7 +47,7 @@ class NovaNetwork(network.Network):
 
     def get_security_groups(self, instance=None):
         if instance is None:
-            return self.nova_client.security_groups.list()
+            return list_cache.cached_list(self.nova_client.security_groups)
         return self.nova_client.servers.list_security_group(instance)
 
     def upload_security_groups(self, security_groups):
@@ -53,6 +62,7 @@ class NovaNetwork(network.Network):
                                                                  from_port=rule['from_port'],
                                                                  to_port=rule['to_port'],
                                                                  cidr=rule['ip_range']['cidr'])
+        list_cache.invalidate(self.nova_client.security_groups)
 
     def get_func_mac_address(self, instance):
         list_mac = self._get_mac_addresses(instance)
@@ -15,10 +15,11 @@
 
 from cloudferrylib.base import storage
 from cinderclient.v1 import client as cinder_client
-from cloudferrylib.utils import mysql_connector
+from cloudferrylib.utils import status_poller
+from cloudferrylib.utils import table_copy
+from cloudferrylib.utils import token_cache
 from fabric.api import settings
 from fabric.api import run
-import time
 
 AVAILABLE = 'available'
 IN_USE = "in-use"
@@ -36,17 +37,27 @@ class CinderStorage(storage.Storage):
         self.cloud = cloud
         self.identity_client = cloud.resources['identity']
         self.cinder_client = self.get_cinder_client(self.config)
+        self.mysql_connector = cloud.mysql_connector
         super(CinderStorage, self).__init__(config)
 
     def get_cinder_client(self, params):
 
         """ Getting cinder client """
 
-        return cinder_client.Client(
+        auth_url = token_cache.auth_url(params.cloud.host)
+        client = cinder_client.Client(
             params.cloud.user,
             params.cloud.password,
             params.cloud.tenant,
-            "http://%s:35357/v2.0/" % params.cloud.host)
+            auth_url)
+        token, endpoint = token_cache.get_token_and_endpoint(
+            params.cloud.user, params.cloud.password, params.cloud.tenant,
+            auth_url, 'volume')
+        if token and endpoint:
+            # client authenticates itself again only if token is rejected
+            client.client.auth_token = token
+            client.client.management_url = endpoint.rstrip('/')
+        return client
 
     def read_info(self, **kwargs):
         info = dict(resource=self, storage={})
@@ -69,10 +80,9 @@ class CinderStorage(storage.Storage):
                                                       'image': None
                                                   }}
         if self.config['migrate']['keep_volume_storage']:
+            # destination reads rows from source db during deploy
             info['storage']['volumes_db'] = \
-                {'volumes': '/tmp/volumes'}
-            for table_name, file_name in info['storage']['volumes_db'].iteritems():
-                self.download_table_from_db_to_file(table_name, file_name)
+                {'volumes': self.mysql_connector}
         return info
 
     def convert(self, vol):
@@ -90,18 +100,17 @@ class CinderStorage(storage.Storage):
 
     def deploy(self, info):
         if info['storage']['volumes_db']:
-            for table_name, file_name in info['storage']['volumes_db'].iteritems():
-                self.upload_table_to_db(table_name, file_name)
-            for tenant in info['identity']['tenants']:
-                self.update_column_with_condition('volumes',
-                                                  'project_id',
-                                                  tenant['tenant']['id'],
-                                                  tenant['meta']['new_id'])
-            for user in info['identity']['users']:
-                self.update_column_with_condition('volumes', 'user_id', user['user']['id'], user['meta']['new_id'])
-            self.update_column_with_condition('volumes', 'attach_status', 'attached', 'detached')
-            self.update_column_with_condition('volumes', 'status', 'in-use', 'available')
-            self.update_column('volumes', 'instance_uuid', 'NULL')
+            mappings = {
+                'project_id': {tenant['tenant']['id']: tenant['meta']['new_id']
+                               for tenant in info['identity']['tenants']},
+                'user_id': {user['user']['id']: user['meta']['new_id']
+                            for user in info['identity']['users']},
+                'attach_status': {'attached': 'detached'},
+                'status': {'in-use': 'available'}}
+            for table_name, src_connector in \
+                    info['storage']['volumes_db'].iteritems():
+                self.copy_table_from_db(src_connector, table_name, mappings,
+                                        {'instance_uuid': None})
             for vol in info['storage']['volumes'].itervalues():
                 self.attach_volume_to_instance(vol)
             volumes = self.get_volumes_list(
@@ -112,19 +121,27 @@ class CinderStorage(storage.Storage):
             vol_for_deploy = self.convert(vol)
             volume = self.create_volume(**vol_for_deploy)
             vol['volume']['id'] = volume.id
-            self.wait_for_status(volume.id, AVAILABLE)
-            self.finish(vol)
-            self.attach_volume_to_instance(vol)
             volumes.append(volume)
+        # volumes are created in parallel, wait for all of them at once
+        self.wait_for_statuses([volume.id for volume in volumes], AVAILABLE)
+        attached = []
+        for vol in info['storage']['volumes'].itervalues():
+            self.finish(vol)
+            if self.attach_volume_to_instance(vol, wait=False):
+                attached.append(vol['volume']['id'])
+        self.wait_for_statuses(attached, IN_USE)
         return volumes
 
-    def attach_volume_to_instance(self, volume_info):
+    def attach_volume_to_instance(self, volume_info, wait=True):
         if 'instance' in volume_info['meta']:
             if volume_info['meta']['instance']:
                 self.attach_volume(volume_info['volume']['id'],
                                    volume_info['meta']['instance']['id'],
                                    volume_info['volume']['device'])
-                self.wait_for_status(volume_info['volume']['id'], IN_USE)
+                if wait:
+                    self.wait_for_status(volume_info['volume']['id'], IN_USE)
+                return True
+        return False
 
     def get_volumes_list(self, detailed=True, search_opts=None):
         return self.cinder_client.volumes.list(detailed, search_opts)
@@ -182,25 +199,18 @@ class CinderStorage(storage.Storage):
             disk_format=disk_format)
         return resp, image['os-volume_upload_image']['image_id']
 
-    def wait_for_status(self, id_res, status):
-        while self.cinder_client.volumes.get(id_res).status != status:
-            time.sleep(1)
-
-    def download_table_from_db_to_file(self, table_name, file_name):
-        connector = mysql_connector.MysqlConnector(self.config.mysql, 'cinder')
-        connector.execute("SELECT * FROM %s INTO OUTFILE '%s';" % (table_name, file_name))
-
-    def upload_table_to_db(self, table_name, file_name):
-        connector = mysql_connector.MysqlConnector(self.config.mysql, 'cinder')
-        connector.execute(("LOAD DATA INFILE '%s' INTO TABLE %s") % (file_name, table_name))
-
-    def update_column_with_condition(self, table_name, column,
-                                     old_value, new_value):
-
-        connector = mysql_connector.MysqlConnector(self.config.mysql, 'cinder')
-        connector.execute(("UPDATE %s SET %s='%s' WHERE %s='%s'") %
-                          (table_name, column, new_value, column, old_value))
-
-    def update_column(self, table_name, column_name, new_value):
-        connector = mysql_connector.MysqlConnector(self.config.mysql, 'cinder')
-        connector.execute(("UPDATE %s SET %s='%s'") % (table_name, column_name, new_value))
+    def wait_for_status(self, id_res, status, timeout=None):
+        status_poller.wait_for_status(self.cinder_client.volumes, id_res,
+                                      status, timeout,
+                                      search_opts={'all_tenants': 1})
+
+    def wait_for_statuses(self, ids, status, timeout=None):
+        status_poller.wait_for_statuses(self.cinder_client.volumes, ids,
+                                        status, timeout,
+                                        search_opts={'all_tenants': 1})
+
+    def copy_table_from_db(self, src_connector, table_name, mappings=None,
+                           values=None):
+        return table_copy.TableCopy(src_connector, self.mysql_connector,
+                                    table_name, mappings=mappings,
+                                    values=values).run()
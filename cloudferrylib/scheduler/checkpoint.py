@@ -0,0 +1,212 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import copy
+import cPickle as pickle
+import os
+import Queue
+import threading
+
+from cloudferrylib.scheduler.namespace import CHILDREN
+from thread_tasks import WrapThreadTask, WaitThreadTask, WaitThreadAllTask
+
+TASK = 'task'
+FORK = 'fork'
+JOIN = 'join'
+
+
+def task_kind(task):
+    if isinstance(task, WrapThreadTask):
+        return FORK
+    if isinstance(task, (WaitThreadTask, WaitThreadAllTask)):
+        return JOIN
+    return TASK
+
+
+def snapshot(value):
+    """Copy of value for writer thread: containers are copied one level
+    deep, so values appended or set by next tasks aren't saved.
+    """
+    if isinstance(value, (list, dict, set)):
+        return copy.copy(value)
+    return value
+
+
+class CheckpointStore(object):
+    """Persists progress of scheduler after every completed task.
+
+    Record of task contains its position in cursor, name and namespace
+    values set by it. Scheduler only takes snapshot of values, they are
+    pickled and appended to file by background thread, so saving doesn't
+    delay next task. Values changed in place deeper than one level of
+    containers by next tasks before writer gets to record are saved
+    changed.
+
+    In resume mode store loads the longest prefix of completed tasks by
+    position, which can be safely skipped: every task has all its values
+    saved and every forked thread task was joined. Scheduler skips these
+    tasks and restores their values into namespace. Forked children keep
+    their own stores next to parent's one (see child()).
+
+    File is opened and writer is started on first use, so store can be
+    created in parent for forked child.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.resume = resume
+        self.completed = []
+        # positions of not joined forks by id of their thread task
+        self.forks = {}
+        self.queue = Queue.Queue()
+        self.stream = None
+        self.writer = None
+        self.lock = threading.Lock()
+
+    def child(self, position):
+        """Store of child forked by thread task at position."""
+        return CheckpointStore('%s.%s' % (self.path, position), self.resume)
+
+    def start(self):
+        with self.lock:
+            if self.writer is not None:
+                return
+            if self.resume:
+                self.completed, _ = self.load(self.path)
+            # records after resumable prefix will be written again
+            self.stream = open(self.path, 'wb')
+            for record in self.completed:
+                self.write(pickle.dumps(record, pickle.HIGHEST_PROTOCOL))
+            self.writer = threading.Thread(target=self.write_records)
+            self.writer.daemon = True
+            self.writer.start()
+
+    @staticmethod
+    def load(path):
+        """Resumable prefix of records and all records of file."""
+        records = []
+        if os.path.exists(path):
+            with open(path, 'rb') as stream:
+                while True:
+                    try:
+                        records.append(pickle.load(stream))
+                    except (EOFError, pickle.UnpicklingError,
+                            ValueError, IndexError):
+                        # the last record can be broken by crash
+                        break
+        # concurrent schedulers save tasks in order of completion
+        by_position = dict((record['position'], record)
+                           for record in records)
+        completed = []
+        prefix = []
+        forks = set()
+        while len(prefix) in by_position:
+            record = by_position[len(prefix)]
+            if not record['complete']:
+                break
+            if record['kind'] == FORK:
+                forks.add(record['position'])
+            elif record['kind'] == JOIN:
+                if record.get('joins') is None:
+                    forks.clear()
+                else:
+                    forks.difference_update(record['joins'])
+            prefix.append(record)
+            if not forks:
+                completed = list(prefix)
+        return completed, records
+
+    def restore(self, position, task, namespace):
+        """Restore values of completed task, False if task should be run."""
+        self.start()
+        if position >= len(self.completed):
+            return False
+        record = self.completed[position]
+        if record['task'] != repr(task):
+            # plan was changed, rerun everything from this task
+            self.queue.put({'rewrite': self.completed[:position]})
+            self.completed = []
+            return False
+        for key, value in record['delta'].iteritems():
+            namespace.vars[key] = pickle.loads(value)
+        return True
+
+    def save(self, position, task, namespace, before, failed=False):
+        self.start()
+        record = {'position': position,
+                  'task': repr(task),
+                  'kind': task_kind(task),
+                  'complete': not failed,
+                  'delta': {}}
+        if record['kind'] == FORK:
+            self.forks.setdefault(id(task), []).append(position)
+        elif record['kind'] == JOIN:
+            # None - all forks are joined
+            record['joins'] = None
+            if isinstance(task, WaitThreadTask):
+                record['joins'] = self.forks.pop(id(task.tt), [])
+            else:
+                self.forks.clear()
+            # fork with failed tasks is rerun, child resumes from own store
+            if any(child.get('failed') for child in
+                   namespace.vars.get(CHILDREN, {}).itervalues()):
+                record['complete'] = False
+        for key, value in namespace.vars.iteritems():
+            if key == CHILDREN or (key in before and before[key] is value):
+                continue
+            record['delta'][key] = snapshot(value)
+        self.queue.put({'record': record})
+
+    @staticmethod
+    def dump_record(record):
+        for key, value in record['delta'].items():
+            try:
+                record['delta'][key] = pickle.dumps(value,
+                                                    pickle.HIGHEST_PROTOCOL)
+            except (pickle.PicklingError, TypeError, RuntimeError):
+                # value can't be restored, so task can't be skipped
+                del record['delta'][key]
+                record['complete'] = False
+        return pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+
+    def write_records(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            if 'rewrite' in item:
+                self.stream.seek(0)
+                self.stream.truncate()
+                for record in item['rewrite']:
+                    self.write(pickle.dumps(record, pickle.HIGHEST_PROTOCOL))
+            else:
+                self.write(self.dump_record(item['record']))
+            self.queue.task_done()
+
+    def write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+        os.fsync(self.stream.fileno())
+
+    def flush(self):
+        if self.writer is not None:
+            self.queue.join()
+
+    def close(self):
+        if self.writer is None:
+            return
+        self.queue.put(None)
+        self.writer.join()
+        self.stream.close()
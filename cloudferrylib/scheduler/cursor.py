@@ -18,34 +18,63 @@ DEFAULT = 0
 NO_ELEMENT = -1
 
 
+class Plan(object):
+    """Net of elements compiled into flat indexed arrays.
+
+    For element with index i: elements[i] is element itself, threads[i] are
+    its thread tasks in order of execution and branches[i] are indexes of
+    its next elements, so set_next_path(num) selects branches[i][num].
+    """
+
+    def __init__(self, net):
+        self.elements = [Cursor.forward_back(net)]
+        self.threads = []
+        self.branches = []
+        indexes = {id(self.elements[0]): 0}
+        for element in self.elements:
+            self.threads.append(list(reversed(element.parall_elem)))
+            branches = []
+            for next_element in element.next_element:
+                if id(next_element) not in indexes:
+                    indexes[id(next_element)] = len(self.elements)
+                    self.elements.append(next_element)
+                branches.append(indexes[id(next_element)])
+            self.branches.append(branches)
+
+
 class Cursor(object):
     def __init__(self, net):
-        self.net = net
-        self.next_iter = None
+        self.plan = Plan(net)
+        self.net = self.plan.elements[0]
+        self.index = None
         self.threads = []
+        self.num_thread = 0
         self.to_start()
 
     def next(self):
-        if not self.next_iter:
-            self.next_iter = self.net
-            self.threads = [i for i in self.next_iter.parall_elem]
+        if self.num_thread < len(self.threads):
+            self.num_thread += 1
+            return self.threads[self.num_thread - 1]
+        if self.index is None:
+            self.__change_state_cursor(0)
+        elif self.index == NO_ELEMENT:
+            raise StopIteration
         else:
-            if self.threads:
-                return self.threads.pop()
-            if self.next_iter.next_element:
-                if self.next_iter.num_element < len(self.next_iter.next_element):
-                    self.__change_state_cursor(self.next_iter.num_element)
-                else:
-                    self.__change_state_cursor(DEFAULT)
+            branches = self.plan.branches[self.index]
+            if not branches:
+                self.index = NO_ELEMENT
+                raise StopIteration
+            num_element = self.plan.elements[self.index].num_element
+            if num_element < len(branches):
+                self.__change_state_cursor(branches[num_element])
             else:
-                self.next_iter = NO_ELEMENT
-        if self.next_iter == NO_ELEMENT:
-            raise StopIteration
-        return self.next_iter
+                self.__change_state_cursor(branches[DEFAULT])
+        return self.plan.elements[self.index]
 
-    def __change_state_cursor(self, num_element):
-        self.next_iter = self.next_iter.next_element[num_element]
-        self.threads = [i for i in self.next_iter.parall_elem]
+    def __change_state_cursor(self, index):
+        self.index = index
+        self.threads = self.plan.threads[index]
+        self.num_thread = 0
 
     def __iter__(self):
         return self
@@ -61,7 +90,7 @@ class Cursor(object):
         return obj
 
     def to_start(self):
-        obj = self.forward_back(self.net)
-        self.net = obj
-        self.next_iter = None
-        return obj
+        self.index = None
+        self.threads = []
+        self.num_thread = 0
+        return self.net
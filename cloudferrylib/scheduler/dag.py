@@ -0,0 +1,185 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import ast
+import inspect
+import textwrap
+
+from task import BaseTask
+from cloudferrylib.scheduler.namespace import CHILDREN
+
+DEFAULT_MAX_WORKERS = 8
+
+
+def get_requires(task):
+    """Namespace keys consumed by task.
+
+    Task can declare them explicitly with `requires` attribute, otherwise
+    named arguments of `run` are used. None means unknown: `run` takes
+    **kwargs and can read any namespace value.
+    """
+    if hasattr(task, 'requires'):
+        return set(task.requires)
+    try:
+        argspec = inspect.getargspec(task.run)
+    except TypeError:
+        return None
+    if argspec.keywords is not None:
+        return None
+    return set(argspec.args[1:])
+
+
+def get_provides(task):
+    """Namespace keys returned by task.
+
+    Task can declare them explicitly with `provides` attribute, otherwise
+    keys are taken from dict literals returned by `run`. None means unknown,
+    including tasks returning nothing: they work by side effects, which
+    can't be ordered by keys.
+    """
+    if hasattr(task, 'provides'):
+        return set(task.provides)
+    return returned_keys(task.run) or None
+
+
+def returned_keys(func):
+    try:
+        source = textwrap.dedent(inspect.getsource(func))
+        func_def = ast.parse(source).body[0]
+    except (IOError, TypeError, SyntaxError, IndexError):
+        return None
+    keys = set()
+    for value in _returned_values(func_def):
+        if value is None or (isinstance(value, ast.Name) and
+                             value.id == 'None'):
+            continue
+        if not isinstance(value, ast.Dict):
+            return None
+        for key in value.keys:
+            if not isinstance(key, ast.Str):
+                return None
+            keys.add(key.s)
+    return keys
+
+
+def _returned_values(func_def):
+    """Values of `return` and of `raise Return()` used by coroutines."""
+    nodes = list(func_def.body)
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, ast.Return):
+            yield node.value
+        elif isinstance(node, ast.Raise) and _is_return_call(node.type):
+            yield node.type.args[0] if node.type.args else None
+        elif not isinstance(node, (ast.FunctionDef, ast.ClassDef,
+                                   ast.Lambda)):
+            nodes.extend(ast.iter_child_nodes(node))
+
+
+def _is_return_call(node):
+    if not isinstance(node, ast.Call):
+        return False
+    func = node.func
+    name = func.attr if isinstance(func, ast.Attribute) else getattr(
+        func, 'id', None)
+    return name == 'Return'
+
+
+class Node(object):
+    def __init__(self, index, task):
+        self.index = index
+        self.task = task
+        self.deps = set()
+        self.dependents = []
+        self.requires = None
+        self.provides = None
+        if isinstance(task, BaseTask):
+            self.requires = get_requires(task)
+            self.provides = get_provides(task)
+        self.barrier = (self.requires is None or self.provides is None or
+                        CHILDREN in self.requires)
+
+    def __repr__(self):
+        return "Node|%s|%s" % (self.index, self.task)
+
+
+class TaskGraph(object):
+    """Dependency graph of tasks from cursor.
+
+    Task depends on previous producer of every key it consumes, and on
+    previous consumers and producers of every key it returns, so result
+    of parallel execution is the same as of sequential one. Tasks with
+    unknown dependencies (thread tasks, tasks working with children, tasks
+    without declared `requires` taking **kwargs, tasks without declared
+    `provides` returning nothing) are barriers: they wait for all previous
+    tasks and block all next ones.
+
+    Cursor is walked once when graph is built, so branch is chosen by
+    `set_next_path` made before start, changing it from running task
+    doesn't affect graph.
+    """
+
+    def __init__(self, tasks):
+        self.nodes = [Node(i, task) for i, task in enumerate(tasks)]
+        self.build()
+
+    def build(self):
+        last_writer = {}
+        readers = {}
+        since_barrier = []
+        barrier = None
+        for node in self.nodes:
+            if node.barrier:
+                deps = set(since_barrier)
+                if barrier is not None:
+                    deps.add(barrier)
+                self.link(node, deps)
+                last_writer, readers, since_barrier = {}, {}, []
+                barrier = node
+                continue
+            deps = set()
+            if barrier is not None:
+                deps.add(barrier)
+            for key in node.requires:
+                if key in last_writer:
+                    deps.add(last_writer[key])
+            for key in node.provides:
+                if key in last_writer:
+                    deps.add(last_writer[key])
+                deps.update(readers.get(key, []))
+            self.link(node, deps)
+            for key in node.requires:
+                readers.setdefault(key, []).append(node)
+            for key in node.provides:
+                last_writer[key] = node
+                readers[key] = []
+            since_barrier.append(node)
+
+    @staticmethod
+    def link(node, deps):
+        deps.discard(node)
+        node.deps = set(dep.index for dep in deps)
+        for dep in deps:
+            dep.dependents.append(node)
+
+    def roots(self):
+        return [node for node in self.nodes if not node.deps]
+
+    def critical_path(self, cost=lambda node: 1):
+        """Length of the longest chain of dependent tasks."""
+        length = {}
+        for node in self.nodes:
+            length[node.index] = cost(node) + max(
+                [length[dep] for dep in node.deps] or [0])
+        return max(length.values() or [0])
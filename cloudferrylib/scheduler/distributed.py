@@ -0,0 +1,298 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import contextlib
+import cPickle as pickle
+import importlib
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+from cloudferrylib.scheduler.cursor import Cursor
+from cloudferrylib.scheduler.namespace import Namespace
+from scheduler import Scheduler, NO_ERROR
+from thread_tasks import POLL_INTERVAL, pickle_values, unpickle_values
+
+PENDING = 'pending'
+TAKEN = 'taken'
+DONE = 'done'
+FAILED = 'failed'
+
+HEARTBEAT_INTERVAL = 10
+
+
+class LeaseLost(Exception):
+    """Job was requeued and can be taken by other worker, result of its
+    previous owner is discarded.
+    """
+
+
+class Job(object):
+    def __init__(self, job_id, plan, kwargs, state=PENDING, worker=None,
+                 result=None, error=None):
+        self.id = job_id
+        self.plan = plan
+        self.kwargs = kwargs
+        self.state = state
+        self.worker = worker
+        self.result = result
+        self.error = error
+
+
+class BaseQueue(object):
+    """Queue of jobs shared by coordinator and workers.
+
+    Job is a sub-plan: path to function building net of tasks
+    ('package.module.function') and its keyword arguments, which also
+    become initial namespace values. Backend must be reachable from all
+    transition hosts.
+    """
+
+    def put(self, plan, kwargs):
+        """Add job, returns its id."""
+        raise NotImplementedError()
+
+    def take(self, worker):
+        """Mark the oldest pending job as taken by worker and return it,
+        None if there are no pending jobs.
+        """
+        raise NotImplementedError()
+
+    def heartbeat(self, job_id, worker):
+        """Renew lease of worker on taken job, False if lease is lost."""
+        raise NotImplementedError()
+
+    def complete(self, job_id, worker, result):
+        """Record result of job, raises LeaseLost if worker doesn't own
+        job anymore.
+        """
+        raise NotImplementedError()
+
+    def fail(self, job_id, worker, error):
+        raise NotImplementedError()
+
+    def get(self, job_ids):
+        """Jobs by ids."""
+        raise NotImplementedError()
+
+    def requeue(self, timeout):
+        """Return taken jobs without heartbeat for timeout seconds to
+        pending (their workers are considered dead).
+        """
+        raise NotImplementedError()
+
+
+class SqliteQueue(BaseQueue):
+    """Queue stored in SQLite database file.
+
+    Every operation opens own connection, so queue can be used from several
+    processes, and from several hosts if file is on shared storage.
+    """
+
+    def __init__(self, path, timeout=30):
+        self.path = path
+        self.timeout = timeout
+        with self.transaction() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS jobs ("
+                         "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                         "plan TEXT, kwargs BLOB, state TEXT, worker TEXT, "
+                         "taken_at REAL, heartbeat_at REAL, result BLOB, "
+                         "error TEXT)")
+
+    @contextlib.contextmanager
+    def transaction(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout,
+                               isolation_level=None)
+        try:
+            # take write lock at once, so two workers can't take one job
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def put(self, plan, kwargs):
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (plan, kwargs, state) VALUES (?, ?, ?)",
+                (plan, buffer(pickle.dumps(kwargs, pickle.HIGHEST_PROTOCOL)),
+                 PENDING))
+            return cursor.lastrowid
+
+    def take(self, worker):
+        with self.transaction() as conn:
+            row = conn.execute("SELECT id, plan, kwargs FROM jobs "
+                               "WHERE state = ? ORDER BY id LIMIT 1",
+                               (PENDING,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            conn.execute("UPDATE jobs SET state = ?, worker = ?, "
+                         "taken_at = ?, heartbeat_at = ? WHERE id = ?",
+                         (TAKEN, worker, now, now, row[0]))
+        return Job(row[0], row[1], pickle.loads(str(row[2])), TAKEN, worker)
+
+    def heartbeat(self, job_id, worker):
+        with self.transaction() as conn:
+            return bool(conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? "
+                "WHERE id = ? AND state = ? AND worker = ?",
+                (time.time(), job_id, TAKEN, worker)).rowcount)
+
+    def complete(self, job_id, worker, result):
+        self._finish(job_id, worker, DONE, 'result', buffer(pickle.dumps(
+            pickle_values(result), pickle.HIGHEST_PROTOCOL)))
+
+    def fail(self, job_id, worker, error):
+        self._finish(job_id, worker, FAILED, 'error', error)
+
+    def _finish(self, job_id, worker, state, column, value):
+        with self.transaction() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET state = ?, %s = ? "
+                "WHERE id = ? AND state = ? AND worker = ?" % column,
+                (state, value, job_id, TAKEN, worker)).rowcount
+        if not updated:
+            raise LeaseLost("Job %s isn't owned by %s" % (job_id, worker))
+
+    def get(self, job_ids):
+        jobs = {}
+        job_ids = list(job_ids)
+        with self.transaction() as conn:
+            for row in conn.execute("SELECT id, plan, kwargs, state, worker, "
+                                    "result, error FROM jobs WHERE id IN "
+                                    "(%s)" % ', '.join('?' * len(job_ids)),
+                                    job_ids):
+                result = None
+                if row[5] is not None:
+                    result = unpickle_values(pickle.loads(str(row[5])))
+                jobs[row[0]] = Job(row[0], row[1], pickle.loads(str(row[2])),
+                                   row[3], row[4], result, row[6])
+        return jobs
+
+    def requeue(self, timeout):
+        with self.transaction() as conn:
+            return conn.execute("UPDATE jobs SET state = ?, worker = NULL "
+                                "WHERE state = ? AND heartbeat_at < ?",
+                                (PENDING, TAKEN,
+                                 time.time() - timeout)).rowcount
+
+
+def import_plan(plan):
+    module, name = plan.rsplit('.', 1)
+    return getattr(importlib.import_module(module), name)
+
+
+class Coordinator(object):
+    """Splits migration into jobs and collects their results."""
+
+    def __init__(self, queue, job_timeout=None):
+        self.queue = queue
+        self.job_timeout = job_timeout
+
+    def submit(self, plan, **kwargs):
+        return self.queue.put(plan, kwargs)
+
+    def run(self, plan, jobs_kwargs, poll_interval=POLL_INTERVAL):
+        """Submit job of plan for every kwargs and wait for all of them.
+
+        Jobs are submitted as `jobs_kwargs` yields them, so workers start
+        the first jobs while the rest are listed.
+        """
+        job_ids = [self.submit(plan, **kwargs) for kwargs in jobs_kwargs]
+        return self.wait(job_ids, poll_interval)
+
+    def wait(self, job_ids, poll_interval=POLL_INTERVAL):
+        """Wait until all jobs are done or failed, returns them by ids."""
+        job_ids = set(job_ids)
+        while True:
+            if self.job_timeout:
+                self.queue.requeue(self.job_timeout)
+            jobs = self.queue.get(job_ids)
+            if all(job.state in (DONE, FAILED) for job in jobs.values()):
+                return jobs
+            time.sleep(poll_interval)
+
+
+class Worker(object):
+    """Takes jobs from queue and runs them with scheduler.
+
+    Net of job is built by its plan function from job arguments, namespace
+    values set by tasks are reported back as result of job. Lease on job is
+    renewed every `heartbeat_interval` seconds while job runs. Default
+    name is unique for every worker process, even on the same host.
+    """
+
+    def __init__(self, queue, name=None, scheduler_cls=Scheduler,
+                 heartbeat_interval=HEARTBEAT_INTERVAL):
+        self.queue = queue
+        self.name = name or '%s:%d:%s' % (socket.gethostname(), os.getpid(),
+                                          uuid.uuid4().hex)
+        self.scheduler_cls = scheduler_cls
+        self.heartbeat_interval = heartbeat_interval
+
+    def heartbeat(self, job, stopped):
+        while not stopped.wait(self.heartbeat_interval):
+            if not self.queue.heartbeat(job.id, self.name):
+                return
+
+    def run_job(self, job):
+        stopped = threading.Event()
+        heartbeat = threading.Thread(target=self.heartbeat,
+                                     args=(job, stopped))
+        heartbeat.daemon = True
+        heartbeat.start()
+        try:
+            self.finish_job(job)
+        except LeaseLost:
+            # job was given to other worker, its result wins
+            traceback.print_exc()
+        finally:
+            stopped.set()
+            heartbeat.join()
+
+    def finish_job(self, job):
+        try:
+            net = import_plan(job.plan)(**job.kwargs)
+            namespace = Namespace(dict(job.kwargs))
+            namespace.base = dict(namespace.vars)
+            scheduler = self.scheduler_cls(namespace=namespace,
+                                           cursor=Cursor(net))
+            scheduler.start()
+        except Exception:
+            self.queue.fail(job.id, self.name, traceback.format_exc())
+            return
+        if scheduler.status_error != NO_ERROR:
+            self.queue.fail(job.id, self.name,
+                            repr(getattr(scheduler, 'exception', None)))
+        else:
+            self.queue.complete(job.id, self.name, namespace.delta())
+
+    def run(self, wait=False, poll_interval=POLL_INTERVAL):
+        """Run jobs until queue is empty, with wait - forever."""
+        while True:
+            job = self.queue.take(self.name)
+            if job:
+                self.run_job(job)
+            elif wait:
+                time.sleep(poll_interval)
+            else:
+                return
@@ -0,0 +1,275 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import collections
+import heapq
+import itertools
+import Queue
+import sys
+import threading
+import time
+import types
+
+DEFAULT_EXECUTOR_SIZE = 16
+
+
+class Return(Exception):
+    """Raised by coroutine to return value (generators can't return it)."""
+
+    def __init__(self, value=None):
+        super(Return, self).__init__(value)
+        self.value = value
+
+
+class Sleep(object):
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+
+class Blocking(object):
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+
+def sleep(seconds):
+    """Yield it from coroutine to wait without blocking event loop."""
+    return Sleep(seconds)
+
+
+def blocking(func, *args, **kwargs):
+    """Yield it from coroutine to run blocking call (HTTP, SSH) in executor.
+
+    Result of call is sent back into coroutine, exception is raised in it.
+    """
+    return Blocking(func, args, kwargs)
+
+
+class Future(object):
+    def __init__(self):
+        self.done = False
+        self.result = None
+        self.exc_info = None
+        self.callbacks = []
+
+    def set_result(self, result):
+        self.result = result
+        self._finish()
+
+    def set_exception(self, exc_info):
+        self.exc_info = exc_info
+        self._finish()
+
+    def _finish(self):
+        self.done = True
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+    def add_done_callback(self, callback):
+        if self.done:
+            callback(self)
+        else:
+            self.callbacks.append(callback)
+
+    def get(self):
+        if self.exc_info:
+            raise self.exc_info[0], self.exc_info[1], self.exc_info[2]
+        return self.result
+
+
+class EventLoop(object):
+    """Runs generator based coroutines in one thread.
+
+    Coroutine can yield:
+      - sleep(seconds) - to wait;
+      - blocking(func, *args, **kwargs) - to run blocking call in executor
+        (pool of `executor_size` threads);
+      - another coroutine or Future - to wait for its result;
+      - list of all above - to wait for all of them at once.
+    All callbacks and coroutine steps are executed in thread of loop,
+    so coroutines don't need locks for shared data. Other threads pass
+    callbacks to loop with call_soon_threadsafe.
+    """
+
+    def __init__(self, executor_size=DEFAULT_EXECUTOR_SIZE):
+        self.executor_size = executor_size
+        self.ready = collections.deque()
+        self.timers = []
+        self.counter = itertools.count()
+        self.calls = Queue.Queue()
+        # callbacks from other threads (executor, limits), wakes loop up
+        self.completed = Queue.Queue()
+        self.workers = []
+        self.pending = 0
+
+    def call_soon(self, callback, *args):
+        self.ready.append((callback, args))
+
+    def call_soon_threadsafe(self, callback, *args):
+        """call_soon for other threads, wakes loop waiting for them."""
+        self.completed.put((callback, args))
+
+    def external_future(self):
+        """Future completed from other thread.
+
+        Returns future and function setting its result, which can be called
+        from any thread. Loop waits for future as for pending work.
+        """
+        future = Future()
+        self.pending += 1
+
+        def set_result(result=None):
+            self.call_soon_threadsafe(self._complete, future, result, None)
+
+        return future, set_result
+
+    def spawn(self, coroutine):
+        """Start coroutine, returns Future of its result."""
+        future = Future()
+        self.call_soon(self._step, coroutine, future, None, None)
+        return future
+
+    def sleep(self, seconds):
+        future = Future()
+        self.pending += 1
+        heapq.heappush(self.timers,
+                       (time.time() + seconds, next(self.counter), future))
+        return future
+
+    def run_in_executor(self, func, *args, **kwargs):
+        future = Future()
+        if len(self.workers) < self.executor_size:
+            worker = threading.Thread(target=self._work)
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+        self.pending += 1
+        self.calls.put((future, func, args, kwargs))
+        return future
+
+    def gather(self, items):
+        futures = [self.to_future(item) for item in items]
+        result = Future()
+        remaining = [len(futures)]
+
+        def done(_):
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+            for future in futures:
+                if future.exc_info:
+                    result.set_exception(future.exc_info)
+                    return
+            result.set_result([future.result for future in futures])
+
+        if not futures:
+            result.set_result([])
+        for future in futures:
+            future.add_done_callback(done)
+        return result
+
+    def to_future(self, item):
+        if isinstance(item, Future):
+            return item
+        if isinstance(item, types.GeneratorType):
+            return self.spawn(item)
+        if isinstance(item, Sleep):
+            return self.sleep(item.seconds)
+        if isinstance(item, Blocking):
+            return self.run_in_executor(item.func, *item.args, **item.kwargs)
+        if isinstance(item, (list, tuple)):
+            return self.gather(item)
+        raise TypeError("Coroutine yielded unsupported object %r" % item)
+
+    def run_until_complete(self, item):
+        future = self.to_future(item)
+        while not future.done:
+            if not self.ready and not self.pending:
+                raise RuntimeError("Event loop has nothing to wait for")
+            self.run_once()
+        return future.get()
+
+    def run_once(self):
+        while self.ready:
+            callback, args = self.ready.popleft()
+            callback(*args)
+        now = time.time()
+        while self.timers and self.timers[0][0] <= now:
+            future = heapq.heappop(self.timers)[-1]
+            self.pending -= 1
+            future.set_result(None)
+        if self.ready or not self.pending:
+            return
+        timeout = max(self.timers[0][0] - now, 0) if self.timers else None
+        try:
+            callback, args = self.completed.get(True, timeout)
+        except Queue.Empty:
+            return
+        callback(*args)
+
+    def _complete(self, future, result, exc_info):
+        self.pending -= 1
+        if exc_info:
+            future.set_exception(exc_info)
+        else:
+            future.set_result(result)
+
+    def close(self):
+        for _ in self.workers:
+            self.calls.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+
+    def _step(self, coroutine, future, value, exc_info):
+        try:
+            if exc_info:
+                item = coroutine.throw(*exc_info)
+            else:
+                item = coroutine.send(value)
+        except StopIteration:
+            future.set_result(None)
+            return
+        except Return as e:
+            future.set_result(e.value)
+            return
+        except Exception:
+            future.set_exception(sys.exc_info())
+            return
+        try:
+            awaited = self.to_future(item)
+        except TypeError:
+            self.call_soon(self._step, coroutine, future, None,
+                           sys.exc_info())
+            return
+        awaited.add_done_callback(
+            lambda f: self.call_soon(self._step, coroutine, future,
+                                     f.result, f.exc_info))
+
+    def _work(self):
+        while True:
+            call = self.calls.get()
+            if call is None:
+                return
+            future, func, args, kwargs = call
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                self.call_soon_threadsafe(self._complete, future, None,
+                                          sys.exc_info())
+            else:
+                self.call_soon_threadsafe(self._complete, future, result,
+                                          None)
@@ -0,0 +1,202 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import collections
+import contextlib
+import multiprocessing
+import os
+import threading
+
+UNLIMITED = 0
+SEPARATOR = ':'
+# seconds between checks of labels released by other processes, in case
+# their notification is missed
+WATCH_INTERVAL = 0.1
+
+
+def get_resources(task, namespace):
+    """Labels of resources used by task, e.g. 'compute:host1', 'glance:src'.
+
+    Task declares them with `resources` attribute: list of labels or
+    callable, which gets namespace values (labels often depend on data,
+    e.g. host of migrated instance).
+    """
+    resources = getattr(task, 'resources', None)
+    if resources is None:
+        return frozenset()
+    if callable(resources):
+        resources = resources(**namespace.vars)
+    return frozenset(resources)
+
+
+class ResourceLimits(object):
+    """Limits number of tasks using the same resource at once.
+
+    Limits are set per label ('compute:host1': 1) or per kind of label
+    ('compute': 2 - every compute host gets own limit 2). Task holds all
+    its labels at once, so tasks can't deadlock each other. Waiting tasks
+    are served in order of request: task can't take label, which is
+    awaited by earlier task, but tasks waiting for other labels aren't
+    delayed.
+
+    Limits are shared by threads and coroutines of one process. After
+    share() they are shared by processes forked later too; order of
+    requests is kept within process only.
+    """
+
+    def __init__(self, limits=None, default=UNLIMITED):
+        self.limits = dict(limits or {})
+        self.default = default
+        self.used = {}
+        self.manager = None
+        # condition of counters shared between processes, None until share()
+        self.changed = None
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.waiting = collections.deque()
+        self.lock = threading.Lock()
+        self.watcher = None
+
+    def share(self):
+        """Keep counters in manager process, so processes forked after
+        it take labels from the same counters.
+        """
+        with self._locked():
+            if self.changed is not None:
+                return
+            self.manager = multiprocessing.Manager()
+            self.used = self.manager.dict(self.used)
+            self.changed = multiprocessing.Condition()
+
+    @contextlib.contextmanager
+    def _locked(self):
+        if self.pid != os.getpid():
+            # forked: waiting tasks and lock state belong to parent
+            self._reset()
+        with self.lock:
+            if self.changed is None:
+                yield
+            else:
+                with self.changed:
+                    yield
+
+    def limit(self, label):
+        if label in self.limits:
+            return self.limits[label]
+        return self.limits.get(label.split(SEPARATOR, 1)[0], self.default)
+
+    def acquire(self, labels, callback=None):
+        """Take labels, blocks until they are free.
+
+        With callback doesn't block: callback is called when labels are
+        taken (at once or later from release()).
+        """
+        labels = frozenset(labels)
+        event = None
+        if callback is None:
+            event = threading.Event()
+            callback = event.set
+        with self._locked():
+            self.waiting.append((labels, callback))
+            granted = self._grant()
+            self._watch_others()
+        for granted_callback in granted:
+            granted_callback()
+        if event:
+            event.wait()
+
+    def try_acquire(self, labels, blocked=frozenset()):
+        """Take labels if they are free and not awaited by earlier tasks.
+
+        `blocked` - labels reserved by caller for its own earlier tasks.
+        """
+        labels = frozenset(labels)
+        with self._locked():
+            waited = set(blocked)
+            for waiting_labels, _ in self.waiting:
+                waited.update(waiting_labels)
+            if waited & labels or not self._available(labels):
+                return False
+            self._take(labels)
+            return True
+
+    def release(self, labels):
+        with self._locked():
+            for label in labels:
+                used = self.used[label] - 1
+                if used:
+                    self.used[label] = used
+                else:
+                    del self.used[label]
+            if self.changed is not None:
+                self.changed.notify_all()
+            granted = self._grant()
+        for callback in granted:
+            callback()
+
+    @contextlib.contextmanager
+    def hold(self, labels):
+        self.acquire(labels)
+        try:
+            yield
+        finally:
+            self.release(labels)
+
+    def _available(self, labels):
+        for label in labels:
+            limit = self.limit(label)
+            if limit != UNLIMITED and self.used.get(label, 0) >= limit:
+                return False
+        return True
+
+    def _take(self, labels):
+        for label in labels:
+            self.used[label] = self.used.get(label, 0) + 1
+
+    def _watch_others(self):
+        """Grant labels released by other processes to waiting tasks."""
+        if self.changed is None or not self.waiting or self.watcher:
+            return
+        self.watcher = threading.Thread(target=self._watch)
+        self.watcher.daemon = True
+        self.watcher.start()
+
+    def _watch(self):
+        while True:
+            with self.changed:
+                self.changed.wait(WATCH_INTERVAL)
+            with self._locked():
+                granted = self._grant()
+                done = not self.waiting
+                if done:
+                    self.watcher = None
+            for callback in granted:
+                callback()
+            if done:
+                return
+
+    def _grant(self):
+        granted = []
+        blocked = set()
+        for entry in list(self.waiting):
+            labels, callback = entry
+            if not blocked & labels and self._available(labels):
+                self._take(labels)
+                self.waiting.remove(entry)
+                granted.append(callback)
+            else:
+                blocked.update(labels)
+        return granted
@@ -12,17 +12,54 @@
 # See the License for the specific language governing permissions and#
 # limitations under the License.
 import copy
+import cPickle as pickle
 __author__ = 'mirrorcoder'
 
 CHILDREN = '__children__'
 
 
+def dump_value(value):
+    """Pickled value, None if it can't be pickled (clients, connections)."""
+    try:
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError):
+        return None
+
+
 class Namespace:
 
     def __init__(self, vars={}):
         if not CHILDREN in vars:
             vars[CHILDREN] = dict()
         self.vars = vars
+        self.base = {}
+        self.base_dumps = {}
 
     def fork(self, is_deep_copy=False):
-        return Namespace(copy.copy(self.vars)) if not is_deep_copy else Namespace(copy.deepcopy(self.vars))
+        # children of parent belong to parent process, fork starts without
+        vars = dict((key, value) for key, value in self.vars.iteritems()
+                    if key != CHILDREN)
+        if is_deep_copy:
+            vars = copy.deepcopy(vars)
+        namespace = Namespace(vars)
+        namespace.base = dict(namespace.vars)
+        namespace.base_dumps = dict(
+            (key, dump_value(value))
+            for key, value in namespace.vars.iteritems() if key != CHILDREN)
+        return namespace
+
+    def delta(self):
+        """Values which were set, replaced or changed in place since
+        namespace was forked.
+
+        Values changed in place are found by pickled value, so in-place
+        changes of values which can't be pickled aren't seen.
+        """
+        return dict((key, value) for key, value in self.vars.iteritems()
+                    if key != CHILDREN and self.changed(key, value))
+
+    def changed(self, key, value):
+        if key not in self.base or self.base[key] is not value:
+            return True
+        dump = self.base_dumps.get(key)
+        return dump is not None and dump != dump_value(value)
@@ -0,0 +1,109 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import heapq
+import itertools
+import time
+from multiprocessing import Process
+
+from thread_tasks import NORMAL
+
+DEFAULT_POOL_SIZE = 4
+POLL_INTERVAL = 0.1
+
+# size of pools created without explicit size, set from config
+POOL_SIZE = DEFAULT_POOL_SIZE
+
+
+def init_pool(size=DEFAULT_POOL_SIZE):
+    """Set size of pools of thread tasks, 0 - no limit."""
+    globals()['POOL_SIZE'] = size
+
+
+class PoolProcess(object):
+    """Handle of a thread task submitted to WorkerPool.
+
+    Exposes join()/is_alive() like multiprocessing.Process, so it can be
+    stored in namespace children and joined by WaitThreadTask.
+    Connections from `close_on_start` belong to worker process, they are
+    closed in parent once worker is started.
+    """
+
+    def __init__(self, pool, target, priority=None, close_on_start=()):
+        self.pool = pool
+        self.target = target
+        self.priority = priority if priority is not None else NORMAL
+        self.close_on_start = close_on_start
+        self.worker = None
+        self.finished = False
+
+    def start(self):
+        self.worker = self.pool.worker_cls(target=self.target)
+        self.worker.start()
+        for conn in self.close_on_start:
+            conn.close()
+
+    def is_alive(self):
+        self.pool.dispatch()
+        return not self.finished
+
+    def join(self):
+        self.pool.wait(self)
+
+
+class WorkerPool(object):
+    """Runs submitted targets with at most `size` workers at once.
+
+    Pending targets are started in order of priority (HIGH first), targets
+    with equal priority are started in order of submission.
+    Zero size means no limit, default size is set by init_pool.
+    """
+
+    def __init__(self, size=None, worker_cls=Process):
+        self.size = POOL_SIZE if size is None else size
+        self.worker_cls = worker_cls
+        self.queue = []
+        self.running = []
+        self.counter = itertools.count()
+
+    def submit(self, target, priority=None, close_on_start=()):
+        handle = PoolProcess(self, target, priority, close_on_start)
+        heapq.heappush(self.queue,
+                       (-handle.priority, next(self.counter), handle))
+        self.dispatch()
+        return handle
+
+    def dispatch(self):
+        for handle in self.running[:]:
+            if not handle.worker.is_alive():
+                handle.worker.join()
+                handle.finished = True
+                self.running.remove(handle)
+        while self.queue and (not self.size or
+                              len(self.running) < self.size):
+            handle = heapq.heappop(self.queue)[-1]
+            handle.start()
+            self.running.append(handle)
+
+    def wait(self, handle):
+        self.dispatch()
+        while not handle.finished:
+            time.sleep(POLL_INTERVAL)
+            self.dispatch()
+
+    def wait_all(self):
+        self.dispatch()
+        while self.queue or self.running:
+            time.sleep(POLL_INTERVAL)
+            self.dispatch()
@@ -12,32 +12,53 @@
 # See the License for the specific language governing permissions and#
 # limitations under the License.
 
+import inspect
+import itertools
+import Queue
+import threading
 import traceback
-from multiprocessing import Process
+from multiprocessing import Process, Pipe
 
 from task import BaseTask
 from cloudferrylib.scheduler.namespace import Namespace, CHILDREN
-from thread_tasks import WrapThreadTask
+from thread_tasks import WrapThreadTask, ChildError, join_child, send_result
 from cursor import Cursor
+from pool import WorkerPool, POLL_INTERVAL
+from dag import TaskGraph, DEFAULT_MAX_WORKERS
+from event_loop import EventLoop, DEFAULT_EXECUTOR_SIZE, blocking
+from limits import get_resources
 
 __author__ = 'mirrorcoder'
 
 NO_ERROR = 0
 ERROR = 255
 
+# keys of forked children in namespace, thread tasks compare by class name
+# and can't be used as keys
+CHILD_IDS = itertools.count()
+
 
 class BaseScheduler(object):
     def __init__(self, namespace=None, cursor=None):
         self.namespace = namespace if namespace else Namespace()
         self.status_error = NO_ERROR
         self.cursor = cursor
+        self.tracer = None
+        self.checkpoint = None
+        # position of running task in cursor, forks are checkpointed by it
+        self.position = None
+        self.limits = None
         self.map_func_task = dict() if not hasattr(self, 'map_func_task') else self.map_func_task
         self.map_func_task[BaseTask()] = self.task_run
 
     def event_start_task(self, task):
+        if self.tracer:
+            self.tracer.task_start(task, self)
         return True
 
     def event_end_task(self, task):
+        if self.tracer:
+            self.tracer.task_end(task, self)
         return True
 
     def event_error_task(self, task, e):
@@ -46,20 +67,53 @@ class BaseScheduler(object):
     def error_task(self, task, e):
         return self.event_error_task(task, e)
 
+    def resources(self, task):
+        if not self.limits:
+            return frozenset()
+        return get_resources(task, self.namespace)
+
     def run_task(self, task):
-        if self.event_start_task(task):
-            self.map_func_task[task](task)
-        self.event_end_task(task)
+        labels = self.resources(task)
+        if labels:
+            self.limits.acquire(labels)
+        try:
+            if self.event_start_task(task):
+                self.map_func_task[task](task)
+            self.event_end_task(task)
+        finally:
+            if labels:
+                self.limits.release(labels)
+
+    def restore(self, position, task):
+        """Restore values of task completed by previous run, False if task
+        should be run.
+        """
+        if not self.checkpoint:
+            return False
+        return self.checkpoint.restore(position, task, self.namespace)
+
+    def save(self, position, task, namespace, before, failed=False):
+        if self.checkpoint:
+            self.checkpoint.save(position, task, namespace, before, failed)
 
     def start(self):
-        for task in self.cursor:
+        for position, task in enumerate(self.cursor):
+            if self.restore(position, task):
+                continue
+            before = dict(self.namespace.vars) if self.checkpoint else {}
+            self.position = position
             try:
                 self.run_task(task)
+                self.save(position, task, self.namespace, before)
             except Exception as e:
                 self.status_error = ERROR
                 self.exception = e
                 self.error_task(task, e)
                 traceback.print_exc()
+                self.save(position, task, self.namespace, before,
+                          failed=True)
+        if self.checkpoint:
+            self.checkpoint.flush()
 
     def task_run(self, task):
         task(namespace=self.namespace)
@@ -67,6 +121,15 @@ class BaseScheduler(object):
     def addCursor(self, cursor):
         self.cursor = cursor
 
+    def addTracer(self, tracer):
+        self.tracer = tracer
+
+    def addCheckpoint(self, checkpoint):
+        self.checkpoint = checkpoint
+
+    def addLimits(self, limits):
+        self.limits = limits
+
 
 class SchedulerThread(BaseScheduler):
     def __init__(self, namespace=None, thread_task=None, cursor=None, scheduler_parent=None):
@@ -75,33 +138,62 @@ class SchedulerThread(BaseScheduler):
         self.child_threads = dict()
         self.thread_task = thread_task
         self.scheduler_parent = scheduler_parent
+        self.result_sender = None
+        self.child_id = None
 
-    def event_start_children(self, thread_task):
-        self.child_threads[thread_task] = True
+    def event_start_children(self, child_id):
+        self.child_threads[child_id] = True
         return True
 
-    def event_stop_children(self, thread_task):
-        del self.child_threads[thread_task]
+    def event_stop_children(self, child_id):
+        del self.child_threads[child_id]
         return True
 
     def trigger_start_scheduler(self):
         if self.scheduler_parent:
-            self.scheduler_parent.event_start_children(self.thread_task)
+            self.scheduler_parent.event_start_children(self.child_id)
 
     def trigger_stop_scheduler(self):
+        if self.tracer:
+            # events of children must be written before trace is dumped
+            self.wait_children()
+        if self.checkpoint and self.thread_task:
+            # store of child is opened in child process
+            self.checkpoint.close()
+        elif self.checkpoint:
+            self.checkpoint.flush()
+        if self.result_sender:
+            send_result(self.result_sender, self.namespace.delta(),
+                        failed=self.status_error != NO_ERROR)
         if self.scheduler_parent:
-            self.scheduler_parent.event_stop_children(self.thread_task)
+            self.scheduler_parent.event_stop_children(self.child_id)
+
+    def wait_children(self):
+        """Join children nobody waited for, their results are dropped."""
+        children = self.namespace.vars[CHILDREN]
+        for child_id in sorted(children):
+            if children[child_id].get('joined'):
+                continue
+            try:
+                join_child(children[child_id])
+            except ChildError:
+                traceback.print_exc()
 
     def start(self):
         if not self.thread_task:
             self.start_current_thread()
+            if self.tracer:
+                self.tracer.dump()
         else:
             self.start_separate_thread()
 
     def start_separate_thread(self):
         p = Process(target=self.start_current_thread)
-        self.namespace.vars[CHILDREN][self.thread_task]['process'] = p
+        self.scheduler_parent.namespace.vars[CHILDREN][
+            self.child_id]['process'] = p
         p.start()
+        # child has its own copy, otherwise pipe isn't closed if child dies
+        self.result_sender.close()
 
     def start_current_thread(self):
         self.trigger_start_scheduler()
@@ -110,14 +202,26 @@ class SchedulerThread(BaseScheduler):
 
     def fork(self, thread_task, is_deep_copy=False):
         namespace = self.namespace.fork(is_deep_copy)
+        receiver, sender = Pipe(duplex=False)
         scheduler = self.__class__(namespace=namespace,
                                    thread_task=thread_task,
                                    cursor=Cursor(thread_task.getNet()),
                                    scheduler_parent=self)
-        self.namespace.vars[CHILDREN][thread_task] = {
+        scheduler.result_sender = sender
+        scheduler.child_id = next(CHILD_IDS)
+        scheduler.tracer = self.tracer
+        if self.limits:
+            # child is another process, counters have to be shared with it
+            self.limits.share()
+        scheduler.limits = self.limits
+        if self.checkpoint:
+            scheduler.checkpoint = self.checkpoint.child(self.position)
+        self.namespace.vars[CHILDREN][scheduler.child_id] = {
+            'task': thread_task,
             'namespace': namespace,
             'scheduler': scheduler,
-            'process': None
+            'process': None,
+            'result': receiver
         }
         return scheduler
 
@@ -126,6 +230,212 @@ class SchedulerThread(BaseScheduler):
         scheduler_fork.start()
 
 
-class Scheduler(SchedulerThread):
+class SchedulerPool(SchedulerThread):
+    """Scheduler with bounded number of simultaneously running thread tasks.
+
+    Thread tasks are queued into fixed-size pool and started according to
+    priority of WrapThreadTask (HIGH, NORMAL, LOW). Pool size is
+    migrate.scheduler_pool_size unless given explicitly.
+    """
+
+    def __init__(self, namespace=None, thread_task=None, cursor=None,
+                 scheduler_parent=None, pool_size=None):
+        super(SchedulerPool, self).__init__(namespace, thread_task, cursor,
+                                            scheduler_parent)
+        self.pool = WorkerPool(pool_size)
+
+    def start_separate_thread(self):
+        handle = self.scheduler_parent.pool.submit(
+            self.start_current_thread, self.thread_task.priority,
+            close_on_start=[self.result_sender])
+        self.scheduler_parent.namespace.vars[CHILDREN][
+            self.child_id]['process'] = handle
+
+    def start_current_thread(self):
+        self.trigger_start_scheduler()
+        BaseScheduler.start(self)
+        self.pool.wait_all()
+        self.trigger_stop_scheduler()
+
+    def fork(self, thread_task, is_deep_copy=False):
+        scheduler = super(SchedulerPool, self).fork(thread_task, is_deep_copy)
+        scheduler.pool = WorkerPool(self.pool.size)
+        return scheduler
+
+
+class SchedulerDag(SchedulerThread):
+    """Scheduler running independent tasks concurrently.
+
+    Tasks from cursor are arranged into TaskGraph by namespace keys they
+    consume and return. Every task is started in separate thread as soon as
+    all its dependencies are finished and its resources (see limits) are
+    free, with at most `max_workers` tasks at once, and its result is joined
+    back into namespace.
+    """
+
+    def __init__(self, namespace=None, thread_task=None, cursor=None,
+                 scheduler_parent=None, max_workers=DEFAULT_MAX_WORKERS):
+        super(SchedulerDag, self).__init__(namespace, thread_task, cursor,
+                                           scheduler_parent)
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+
+    def start_current_thread(self):
+        self.trigger_start_scheduler()
+        self.run_graph(TaskGraph(self.cursor))
+        self.trigger_stop_scheduler()
+
+    def run_graph(self, graph):
+        finished = Queue.Queue()
+        waiting = dict((node.index, len(node.deps)) for node in graph.nodes)
+        ready = graph.roots()
+        running = 0
+        while ready or running:
+            blocked = set()
+            for node in ready[:]:
+                with self.lock:
+                    restored = self.restore(node.index, node.task)
+                if restored:
+                    ready.remove(node)
+                    running += 1
+                    finished.put(node)
+                    continue
+                if running >= self.max_workers:
+                    break
+                if node.barrier:
+                    # barrier is ready only when nothing else is running
+                    ready.remove(node)
+                    running += 1
+                    self.run_node(node, finished)
+                    continue
+                with self.lock:
+                    labels = self.resources(node.task)
+                if labels and not self.limits.try_acquire(labels, blocked):
+                    # later tasks can't overtake it on the same resources
+                    blocked.update(labels)
+                    continue
+                ready.remove(node)
+                running += 1
+                threading.Thread(target=self.run_node,
+                                 args=(node, finished, labels)).start()
+            try:
+                # resources can be released by other schedulers too
+                node = finished.get(True, POLL_INTERVAL if ready else None)
+            except Queue.Empty:
+                continue
+            running -= 1
+            for dependent in node.dependents:
+                waiting[dependent.index] -= 1
+                if not waiting[dependent.index]:
+                    ready.append(dependent)
+
+    def run_node(self, node, finished, labels=frozenset()):
+        try:
+            if node.barrier:
+                before = dict(self.namespace.vars)
+                self.position = node.index
+                self.run_task(node.task)
+                self.save(node.index, node.task, self.namespace, before)
+            elif self.event_start_task(node.task):
+                self.run_task_concurrently(node)
+                self.event_end_task(node.task)
+        except Exception as e:
+            self.status_error = ERROR
+            self.exception = e
+            self.error_task(node.task, e)
+            traceback.print_exc()
+            self.save(node.index, node.task, Namespace({}), {}, failed=True)
+        finally:
+            if labels:
+                self.limits.release(labels)
+            finished.put(node)
+
+    def run_task_concurrently(self, node):
+        with self.lock:
+            namespace = Namespace(dict(self.namespace.vars))
+        node.task(namespace=namespace)
+        provided = {}
+        with self.lock:
+            for key in node.provides:
+                if key in namespace.vars:
+                    self.namespace.vars[key] = namespace.vars[key]
+                    provided[key] = namespace.vars[key]
+            self.save(node.index, node.task, Namespace(provided), {})
+
+
+class AsyncScheduler(SchedulerThread):
+    """Scheduler running tasks as coroutines in one event loop.
+
+    Tasks are arranged into TaskGraph as in SchedulerDag. Task with generator
+    `run` is coroutine: it can yield blocking calls, sleeps and other
+    coroutines (see event_loop) and returns result with `raise Return()`.
+    Plain `run` of other tasks is called in executor of event loop.
+    """
+
+    def __init__(self, namespace=None, thread_task=None, cursor=None,
+                 scheduler_parent=None, executor_size=DEFAULT_EXECUTOR_SIZE):
+        super(AsyncScheduler, self).__init__(namespace, thread_task, cursor,
+                                             scheduler_parent)
+        self.loop = EventLoop(executor_size)
+
+    def start_current_thread(self):
+        self.trigger_start_scheduler()
+        try:
+            self.loop.run_until_complete(self.run_graph(TaskGraph(self.cursor)))
+        finally:
+            self.loop.close()
+        self.trigger_stop_scheduler()
+
+    def run_graph(self, graph):
+        futures = []
+        for node in graph.nodes:
+            deps = [futures[dep] for dep in node.deps]
+            futures.append(self.loop.spawn(self.run_node(node, deps)))
+        yield futures
+
+    def run_node(self, node, deps):
+        yield deps
+        if self.restore(node.index, node.task):
+            return
+        labels = frozenset()
+        if not node.barrier:
+            labels = self.resources(node.task)
+        if labels:
+            # labels can be released and granted by other threads
+            granted, grant = self.loop.external_future()
+            self.limits.acquire(labels, grant)
+            yield granted
+        try:
+            if node.barrier:
+                before = dict(self.namespace.vars)
+                self.position = node.index
+                self.run_task(node.task)
+                self.save(node.index, node.task, self.namespace, before)
+            elif self.event_start_task(node.task):
+                kwargs = dict(self.namespace.vars)
+                if inspect.isgeneratorfunction(node.task.run):
+                    result = yield node.task.run(**kwargs)
+                else:
+                    result = yield blocking(node.task.run, **kwargs)
+                provided = {}
+                if type(result) == dict:
+                    for key in node.provides:
+                        if key in result:
+                            self.namespace.vars[key] = result[key]
+                            provided[key] = result[key]
+                self.save(node.index, node.task, Namespace(provided), {})
+                self.event_end_task(node.task)
+        except Exception as e:
+            self.status_error = ERROR
+            self.exception = e
+            self.error_task(node.task, e)
+            traceback.print_exc()
+            self.save(node.index, node.task, Namespace({}), {}, failed=True)
+        finally:
+            if labels:
+                self.limits.release(labels)
+
+
+class Scheduler(SchedulerPool):
     def __init__(self, namespace=None, thread_task=False, cursor=None, scheduler_parent=None):
         super(Scheduler, self).__init__(namespace, thread_task, cursor, scheduler_parent)
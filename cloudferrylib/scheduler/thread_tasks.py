@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and#
 # limitations under the License.
 
+import cPickle as pickle
+
 from task import Task
 from utils.equ_instance import EquInstance
 __author__ = 'mirrorcoder'
@@ -20,6 +22,84 @@ HIGH = 3
 NORMAL = 2
 LOW = 1
 
+POLL_INTERVAL = 0.1
+
+
+class ChildError(Exception):
+    pass
+
+
+def pickle_values(values):
+    """Pickle every value separately, skipping values which can't be pickled
+    (clients, connections).
+    """
+    result = {}
+    for key, value in values.iteritems():
+        try:
+            result[key] = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError):
+            continue
+    return result
+
+
+def unpickle_values(values):
+    return dict((key, pickle.loads(value))
+                for key, value in values.iteritems())
+
+
+def send_result(conn, delta, failed=False):
+    """Send changed namespace values from child to parent and whether some
+    task of child failed.
+
+    Values which can't be pickled stay in child.
+    """
+    conn.send((pickle_values(delta), failed))
+    conn.close()
+
+
+def join_child(child):
+    """Wait for child and return namespace values changed by it.
+
+    ChildError is raised if child exits without sending result. Child with
+    failed tasks is marked `failed`.
+    """
+    process = child['process']
+    conn = child.get('result')
+    result = None
+    if conn:
+        # read result before join, otherwise child can block on full pipe
+        while not conn.poll(POLL_INTERVAL):
+            if not process.is_alive():
+                break
+        try:
+            if conn.poll():
+                values, child['failed'] = conn.recv()
+                result = unpickle_values(values)
+        except EOFError:
+            pass
+        conn.close()
+    process.join()
+    child['joined'] = True
+    if conn and result is None:
+        raise ChildError("Thread task %s exited without result" %
+                         child.get('task'))
+    return result or {}
+
+
+def join_children(children, thread_task=None):
+    """Join children not joined yet in order of fork, all of them or only
+    forks of thread_task, returns values changed by them.
+    """
+    result = {}
+    for child_id in sorted(children):
+        child = children[child_id]
+        if child.get('joined'):
+            continue
+        if thread_task is not None and child.get('task') is not thread_task:
+            continue
+        result.update(join_child(child))
+    return result
+
 
 class WrapThreadTask(EquInstance):
     def __init__(self, net=None, priority=None):
@@ -38,11 +118,10 @@ class WaitThreadTask(Task):
 
     def run(self, __children__={}, **kwargs):
         if __children__:
-            __children__[self.tt]['process'].join()
+            return join_children(__children__, self.tt)
 
 
 class WaitThreadAllTask(Task):
     def run(self, __children__={}, **kwargs):
         if __children__:
-            for p in __children__:
-                __children__[p]['process'].join()
+            return join_children(__children__)
@@ -0,0 +1,121 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+from cloudferrylib.scheduler.namespace import CHILDREN
+
+MAIN_THREAD = 'main'
+
+
+class Tracer(object):
+    """Records timing of scheduler tasks in Chrome trace_event format.
+
+    Every process (forked scheduler children included) appends its events
+    to own part file `<path>.<run id>.<pid>`, dump() merges parts of this
+    run into `path`, which can be opened in chrome://tracing. Schedulers
+    with tracer wait for their children before finishing, so root scheduler
+    dumps trace when all processes of run are finished.
+    """
+
+    def __init__(self, path='trace.json'):
+        self.path = path
+        # parts left by other runs with the same path aren't merged
+        self.run_id = uuid.uuid4().hex
+        self.started = {}
+        self.named_processes = set()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def now():
+        return int(time.time() * 1000000)
+
+    @staticmethod
+    def lineage(scheduler):
+        names = []
+        while scheduler is not None:
+            thread_task = getattr(scheduler, 'thread_task', None)
+            names.append(repr(thread_task.getNet()) if thread_task
+                         else MAIN_THREAD)
+            scheduler = getattr(scheduler, 'scheduler_parent', None)
+        return '/'.join(reversed(names))
+
+    @staticmethod
+    def namespace_sizes(namespace):
+        sizes = {}
+        for key, value in namespace.vars.iteritems():
+            if key == CHILDREN:
+                continue
+            try:
+                sizes[key] = len(value)
+            except TypeError:
+                sizes[key] = None
+        return sizes
+
+    def task_start(self, task, scheduler):
+        key = (threading.current_thread().ident, id(task))
+        with self.lock:
+            self.started[key] = self.now()
+
+    def task_end(self, task, scheduler):
+        end = self.now()
+        key = (threading.current_thread().ident, id(task))
+        with self.lock:
+            start = self.started.pop(key, end)
+        pid = os.getpid()
+        events = []
+        if pid not in self.named_processes:
+            self.named_processes.add(pid)
+            events.append({'name': 'process_name',
+                           'ph': 'M',
+                           'pid': pid,
+                           'args': {'name': self.lineage(scheduler)}})
+        events.append({'name': task.__class__.__name__,
+                       'cat': 'task',
+                       'ph': 'X',
+                       'ts': start,
+                       'dur': end - start,
+                       'pid': pid,
+                       'tid': threading.current_thread().ident,
+                       'args': {
+                           'ppid': os.getppid(),
+                           'lineage': self.lineage(scheduler),
+                           'namespace': self.namespace_sizes(
+                               scheduler.namespace)}})
+        self.write(pid, events)
+
+    def write(self, pid, events):
+        with self.lock:
+            with open(self.part_path(pid), 'a') as part:
+                for event in events:
+                    part.write(json.dumps(event) + '\n')
+
+    def part_path(self, pid):
+        return '%s.%s.%s' % (self.path, self.run_id, pid)
+
+    def dump(self):
+        events = []
+        for part_path in sorted(glob.glob(self.part_path('[0-9]*'))):
+            with open(part_path) as part:
+                events.extend(json.loads(line) for line in part if line)
+            os.remove(part_path)
+        with open(self.path, 'w') as trace:
+            json.dump({'traceEvents': events,
+                       'displayTimeUnit': 'ms'}, trace)
+        return events
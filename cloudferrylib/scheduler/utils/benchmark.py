@@ -0,0 +1,67 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import time
+
+from cloudferrylib.scheduler.cursor import Cursor, Plan
+from cloudferrylib.scheduler.namespace import Namespace
+from cloudferrylib.scheduler.scheduler import BaseScheduler
+from cloudferrylib.scheduler.task import Task
+
+
+class NoopTask(Task):
+    def run(self, **kwargs):
+        pass
+
+
+def make_net(num_tasks):
+    head = last = NoopTask()
+    for _ in xrange(num_tasks - 1):
+        last = last >> NoopTask()
+    return head
+
+
+def measure(func, repeat):
+    best = None
+    for _ in xrange(repeat):
+        start = time.time()
+        func()
+        spent = time.time() - start
+        best = spent if best is None else min(best, spent)
+    return best
+
+
+def scheduler_overhead(num_tasks=10000, repeat=3):
+    """Measure overhead of scheduler per task in microseconds.
+
+    :return: dict with time of compiling net into plan, of walking cursor
+             over plan and of running no-op tasks by scheduler
+    """
+    net = make_net(num_tasks)
+    cursor = Cursor(net)
+
+    def walk():
+        cursor.to_start()
+        for _ in cursor:
+            pass
+
+    def run():
+        cursor.to_start()
+        BaseScheduler(namespace=Namespace({}), cursor=cursor).start()
+
+    per_task = 1000000.0 / num_tasks
+    return {'tasks': num_tasks,
+            'compile_us': measure(lambda: Plan(net), repeat) * per_task,
+            'cursor_us': measure(walk, repeat) * per_task,
+            'scheduler_us': measure(run, repeat) * per_task}
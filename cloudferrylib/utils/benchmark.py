@@ -0,0 +1,86 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import time
+
+from migrationlib.os.utils import FileLikeProxy
+
+MB = 1024 * 1024
+GB = 1024 * MB
+# size of reads made by glanceclient when it uploads image
+READ_SIZE = 64 * 1024
+
+
+class FakeResponse(object):
+    """Image data served from memory without copying."""
+
+    def __init__(self, length, block=MB):
+        self.length = length
+        self.left = length
+        self.block = '\0' * block
+
+    def read(self, size=None):
+        size = min(size or self.left, self.left, len(self.block))
+        self.left -= size
+        return self.block if size == len(self.block) else self.block[:size]
+
+    def close(self):
+        pass
+
+
+class FakeSource(object):
+    def __init__(self, length):
+        self.length = length
+
+    def get_ref_image(self, image_id):
+        return FakeResponse(self.length)
+
+
+def read_all(proxy):
+    while proxy.read(READ_SIZE):
+        pass
+
+
+def measure_cpu(func, repeat):
+    best = None
+    for _ in xrange(repeat):
+        # processor time, sleeping of limiter isn't counted
+        start = time.clock()
+        func()
+        spent = time.clock() - start
+        best = spent if best is None else min(best, spent)
+    return best
+
+
+def proxy_read_cost(size_mb=256, speed_limit='10000MB', repeat=3):
+    """Measure CPU cost of reading data through FileLikeProxy.
+
+    :return: dict with CPU seconds per GB for unlimited reads and for reads
+             limited by speed_limit
+    """
+    length = int(size_mb) * MB
+    transfer_object = {'resource_src': FakeSource(length), 'id': 'bench',
+                       'name': 'bench', 'size': length}
+
+    def read(limit):
+        read_all(FileLikeProxy.FileLikeProxy(transfer_object,
+                                             lambda *args: None, limit))
+
+    per_gb = float(GB) / length
+    return {'size_mb': size_mb,
+            'speed_limit': speed_limit,
+            'unlimited_s_per_gb': measure_cpu(lambda: read('-'),
+                                              repeat) * per_gb,
+            'limited_s_per_gb': measure_cpu(lambda: read(speed_limit),
+                                            repeat) * per_gb}
@@ -0,0 +1,113 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import collections
+import json
+import threading
+import time
+import weakref
+
+DEFAULT_TTL = 0
+
+
+def manager_name(manager):
+    # class name alone is ambiguous, e.g. ImageManager of nova and glance
+    return '%s.%s' % (type(manager).__module__, type(manager).__name__)
+
+
+class ListCache(object):
+    """Read-through cache of list() calls of novaclient-like managers.
+
+    Result of list is kept for `ttl` seconds separately for every manager
+    (so for every client and cloud) and every set of arguments. Code which
+    creates, updates or deletes objects must invalidate cache, which drops
+    entries of all managers of the same resource type, whatever client or
+    cloud they belong to. Objects created by code not going through this
+    module stay invisible until ttl expires, so cache is off by default.
+    Hits, misses and invalidations are counted by module and name of
+    manager class.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.entries = weakref.WeakKeyDictionary()
+        self.stats = collections.defaultdict(
+            lambda: {'hits': 0, 'misses': 0, 'invalidations': 0})
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(kwargs):
+        return json.dumps(kwargs, sort_keys=True, default=repr)
+
+    def list(self, manager, **kwargs):
+        key = self.key(kwargs)
+        name = manager_name(manager)
+        with self.lock:
+            entry = self.entries.get(manager, {}).get(key)
+            if entry and entry[0] > time.time():
+                self.stats[name]['hits'] += 1
+                return list(entry[1])
+            self.stats[name]['misses'] += 1
+        # request isn't made under lock, other managers aren't blocked by it
+        objects = list(manager.list(**kwargs))
+        with self.lock:
+            self.entries.setdefault(manager, {})[key] = (
+                time.time() + self.ttl, objects)
+        return list(objects)
+
+    def invalidate(self, manager):
+        name = manager_name(manager)
+        with self.lock:
+            for cached in self.entries.keys():
+                if manager_name(cached) == name:
+                    del self.entries[cached]
+            self.stats[name]['invalidations'] += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def summary(self):
+        """Statistics by manager: hits, misses (API calls made) and
+        invalidations.
+        """
+        with self.lock:
+            return dict((name, dict(counters))
+                        for name, counters in self.stats.iteritems())
+
+
+CACHE = None
+
+
+def init_cache(ttl=DEFAULT_TTL):
+    """Enable cache, ttl 0 disables it."""
+    globals()['CACHE'] = ListCache(ttl) if ttl else None
+
+
+def cached_list(manager, **kwargs):
+    """List objects of manager through cache, directly if cache isn't
+    initialized.
+    """
+    if CACHE is None:
+        return manager.list(**kwargs)
+    return CACHE.list(manager, **kwargs)
+
+
+def invalidate(manager):
+    if CACHE is not None:
+        CACHE.invalidate(manager)
+
+
+def stats():
+    return CACHE.summary() if CACHE is not None else {}
@@ -1,5 +1,38 @@
+import itertools
+import os
+import re
+import threading
+
 import sqlalchemy
 
+# rows sent in one statement by bulk operations
+BULK_SIZE = 1000
+POOL_RECYCLE = 3600
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(connection_url):
+    """Pooled engine shared by all connectors of (host, db), forked
+    processes create own engines instead of sharing sockets of parent.
+    """
+    key = (os.getpid(), connection_url)
+    with _engines_lock:
+        if key not in _engines:
+            _engines[key] = sqlalchemy.create_engine(
+                connection_url, pool_recycle=POOL_RECYCLE)
+        return _engines[key]
+
+
+def chunks(items, size):
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
 
 class MysqlConnector():
     def __init__(self, config, db):
@@ -14,7 +47,44 @@ class MysqlConnector():
                                          self.config['host'],
                                          self.db)
 
+    def get_engine(self):
+        return get_engine(self.connection_url)
+
     def execute(self, command, **kwargs):
-        with sqlalchemy.create_engine(
-                self.connection_url).begin() as connection:
+        with self.get_engine().begin() as connection:
             return connection.execute(sqlalchemy.text(command), **kwargs)
+
+    def execute_many(self, command, rows, chunk_size=BULK_SIZE):
+        """Execute command for every dict of parameters in rows in one
+        transaction.
+
+        Parameters are sent by chunks with executemany, MySQL drivers send
+        INSERT ... VALUES as one multi-row INSERT per chunk. Rows may be
+        generator, it is consumed chunk by chunk.
+        """
+        rows = chunks(rows, chunk_size)
+        first = next(rows, None)
+        if first is None:
+            return
+        with self.get_engine().begin() as connection:
+            for chunk in itertools.chain([first], rows):
+                connection.execute(sqlalchemy.text(command), chunk)
+
+    def select_in(self, command, values, chunk_size=BULK_SIZE, **kwargs):
+        """Rows of SELECT command with condition `IN :values` for all
+        values, which are sent by chunks.
+        """
+        rows = []
+        with self.get_engine().begin() as connection:
+            for chunk in chunks(values, chunk_size):
+                params = dict(kwargs)
+                names = []
+                for i, value in enumerate(chunk):
+                    names.append(':value%d' % i)
+                    params['value%d' % i] = value
+                # other parameters may start with :values, e.g. :values_type
+                statement = re.sub(r':values\b', '(%s)' % ', '.join(names),
+                                   command)
+                rows.extend(connection.execute(sqlalchemy.text(statement),
+                                               **params))
+        return rows
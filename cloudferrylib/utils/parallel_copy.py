@@ -0,0 +1,115 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import Queue
+import sys
+import threading
+import time
+
+from cloudferrylib.utils import rate_limit
+from cloudferrylib.utils import utils
+
+LOG = utils.get_log(__name__)
+
+DEFAULT_STREAMS = 4
+MB = 1024 * 1024
+
+
+class CopyJob(object):
+    """Copy of one object: func is called with speed limiter shared by all
+    streams and returns result of copy.
+    """
+
+    def __init__(self, name, size, func):
+        self.name = name
+        self.size = size or 0
+        self.func = func
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.exc_info = None
+
+    def throughput(self):
+        """Bytes per second."""
+        if self.started is None or self.finished is None:
+            return 0
+        return self.size / max(self.finished - self.started, 1e-6)
+
+
+class ParallelCopy(object):
+    """Runs copy jobs in `streams` threads, largest jobs first.
+
+    Speed limit (bytes per second, 0 - no limit) is a budget shared by all
+    streams. Throughput of every stream and of the whole copy is logged.
+    """
+
+    def __init__(self, streams=DEFAULT_STREAMS, speed_limit=0):
+        self.streams = max(int(streams), 1)
+        self.limiter = rate_limit.TokenBucket(speed_limit)
+        self.started = None
+        self.finished = None
+
+    def run(self, jobs):
+        """Run jobs, returns their results in order of jobs.
+
+        Error of job doesn't stop others, the first one is raised when all
+        jobs are finished.
+        """
+        queue = Queue.Queue()
+        for job in sorted(jobs, key=lambda job: job.size, reverse=True):
+            queue.put(job)
+        self.started = time.time()
+        threads = [threading.Thread(target=self.work, args=(queue,))
+                   for _ in xrange(min(self.streams, len(jobs)))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            # join with timeout, otherwise Ctrl+C doesn't interrupt it
+            while thread.is_alive():
+                thread.join(1)
+        self.finished = time.time()
+        self.report(jobs)
+        for job in jobs:
+            if job.exc_info:
+                raise job.exc_info[0], job.exc_info[1], job.exc_info[2]
+        return [job.result for job in jobs]
+
+    def work(self, queue):
+        while True:
+            try:
+                job = queue.get_nowait()
+            except Queue.Empty:
+                return
+            job.started = time.time()
+            try:
+                job.result = job.func(self.limiter)
+            except Exception:
+                job.exc_info = sys.exc_info()
+                LOG.exception("Copy of %s failed", job.name)
+            job.finished = time.time()
+            LOG.info("Copied %s: %d bytes, %.2f MB/s", job.name, job.size,
+                     job.throughput() / MB)
+
+    def throughput(self, jobs):
+        """Aggregate bytes per second of finished jobs."""
+        if self.started is None or self.finished is None:
+            return 0
+        size = sum(job.size for job in jobs if not job.exc_info)
+        return size / max(self.finished - self.started, 1e-6)
+
+    def report(self, jobs):
+        LOG.info("Copied %d objects in %d streams: %.2f MB/s",
+                 len([job for job in jobs if not job.exc_info]),
+                 self.streams, self.throughput(jobs) / MB)
@@ -0,0 +1,60 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import re
+import threading
+import time
+
+
+def parse_speed_limit(speed_limit):
+    """Bytes per second from '10MB', '512kb', etc., 0 for '-'."""
+    if speed_limit == '-':
+        return 0
+    array = filter(None, re.split(r'(\d+)', speed_limit))
+    mult = {
+        'b': 1,
+        'kb': 1024,
+        'mb': 1024 * 1024,
+    }[array[1].lower()]
+    return int(array[0]) * mult
+
+
+class TokenBucket(object):
+    """Token bucket limiting speed (bytes per second) of several streams.
+
+    Bucket is refilled with `rate` tokens per second up to `capacity`
+    (one second of traffic by default), every read takes tokens for its
+    bytes and sleeps while bucket is in debt, so total speed of all streams
+    sharing bucket doesn't exceed rate. Rate 0 - no limit.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.time()
+        self.lock = threading.Lock()
+
+    def consume(self, size):
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.time()
+            self.tokens = min(self.capacity,
+                              self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= size
+            sleep_time = -float(self.tokens) / self.rate
+        if sleep_time > 0:
+            time.sleep(sleep_time)
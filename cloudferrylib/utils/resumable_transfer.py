@@ -0,0 +1,181 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import hashlib
+import json
+import os
+import shutil
+
+from cloudferrylib.utils import utils
+
+LOG = utils.get_log(__name__)
+
+CHUNK_SIZE = 64 * 1024 * 1024
+READ_SIZE = 1024 * 1024
+RETRIES = 3
+MANIFEST = 'manifest.json'
+
+
+class ChecksumError(Exception):
+    pass
+
+
+class ChunkSpool(object):
+    """Stream spooled to local directory in chunks with checksums.
+
+    Chunk is written to temporary file, synced and renamed, then it is
+    recorded in manifest, so manifest lists only complete chunks. Download
+    interrupted by error (in this run or in previous one) continues from
+    the end of the last recorded chunk. Spool of other source (different
+    `source_id`, e.g. checksum of image) is discarded.
+    """
+
+    def __init__(self, path, source_id=None, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.source_id = source_id
+        self.chunk_size = chunk_size
+        self.chunks = []
+        self.complete = False
+        self.load()
+
+    def chunk_path(self, index):
+        return os.path.join(self.path, 'chunk.%06d' % index)
+
+    def load(self):
+        manifest_path = os.path.join(self.path, MANIFEST)
+        if not os.path.exists(manifest_path):
+            return
+        with open(manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+        if (manifest['source_id'] != self.source_id or
+                manifest['chunk_size'] != self.chunk_size):
+            LOG.info("Discarding spool %s of other source", self.path)
+            self.remove()
+            return
+        for index, chunk in enumerate(manifest['chunks']):
+            chunk_path = self.chunk_path(index)
+            if (not os.path.exists(chunk_path) or
+                    os.path.getsize(chunk_path) != chunk['size']):
+                break
+            self.chunks.append(chunk)
+        self.complete = (manifest['complete'] and
+                         len(self.chunks) == len(manifest['chunks']))
+
+    def save(self):
+        manifest_path = os.path.join(self.path, MANIFEST)
+        temp_path = manifest_path + '.tmp'
+        with open(temp_path, 'w') as manifest_file:
+            json.dump({'source_id': self.source_id,
+                       'chunk_size': self.chunk_size,
+                       'chunks': self.chunks,
+                       'complete': self.complete}, manifest_file)
+        os.rename(temp_path, manifest_path)
+
+    def offset(self):
+        """Number of bytes in verified chunks."""
+        return sum(chunk['size'] for chunk in self.chunks)
+
+    def download(self, open_stream, retries=RETRIES):
+        """Spool stream, open_stream(offset) returns file-like object
+        reading stream from offset.
+
+        Failed download is restarted from the last complete chunk up to
+        `retries` times.
+        """
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+        attempt = 0
+        while not self.complete:
+            offset = self.offset()
+            try:
+                self.spool(open_stream(offset))
+            except Exception:
+                attempt += 1
+                if attempt > retries:
+                    raise
+                LOG.exception("Download to %s failed at %d bytes, resuming "
+                              "from %d", self.path, self.offset(), offset)
+
+    def spool(self, stream):
+        while not self.complete:
+            index = len(self.chunks)
+            temp_path = self.chunk_path(index) + '.tmp'
+            checksum = hashlib.md5()
+            size = 0
+            with open(temp_path, 'wb') as chunk_file:
+                while size < self.chunk_size:
+                    data = stream.read(min(READ_SIZE, self.chunk_size - size))
+                    if not data:
+                        break
+                    checksum.update(data)
+                    chunk_file.write(data)
+                    size += len(data)
+                chunk_file.flush()
+                os.fsync(chunk_file.fileno())
+            if size:
+                os.rename(temp_path, self.chunk_path(index))
+                self.chunks.append({'size': size,
+                                    'md5': checksum.hexdigest()})
+            else:
+                os.remove(temp_path)
+            self.complete = size < self.chunk_size
+            self.save()
+
+    def reader(self):
+        return SpoolReader(self)
+
+    def remove(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.chunks = []
+        self.complete = False
+
+
+class SpoolReader(object):
+    """File-like object reading spooled chunks one by one.
+
+    Checksum of every chunk is verified while it is read, ChecksumError is
+    raised at the end of corrupted chunk.
+    """
+
+    def __init__(self, spool):
+        self.spool = spool
+        self.index = 0
+        self.chunk_file = None
+        self.checksum = None
+
+    def read(self, size=READ_SIZE):
+        if size is None or size < 0:
+            size = READ_SIZE
+        while self.index < len(self.spool.chunks):
+            if self.chunk_file is None:
+                self.chunk_file = open(self.spool.chunk_path(self.index),
+                                       'rb')
+                self.checksum = hashlib.md5()
+            data = self.chunk_file.read(size)
+            if data:
+                self.checksum.update(data)
+                return data
+            self.chunk_file.close()
+            self.chunk_file = None
+            if (self.checksum.hexdigest() !=
+                    self.spool.chunks[self.index]['md5']):
+                raise ChecksumError("Chunk %s is corrupted" %
+                                    self.spool.chunk_path(self.index))
+            self.index += 1
+        return ''
+
+    def close(self):
+        if self.chunk_file is not None:
+            self.chunk_file.close()
+            self.chunk_file = None
@@ -0,0 +1,274 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import os
+import sys
+import threading
+import time
+import weakref
+
+DEFAULT_INTERVAL = 1
+MAX_INTERVAL = 30
+BACKOFF = 2
+# large volumes and images take hours
+DEFAULT_TIMEOUT = 4 * 60 * 60
+ERROR_STATUSES = ('error',)
+# up to this number of objects statuses are got one by one, listing all
+# objects of cloud is cheaper only for many of them
+LIST_THRESHOLD = 20
+
+# timeout of pollers created without explicit timeout, set from config
+TIMEOUT = DEFAULT_TIMEOUT
+
+
+def init_poller(timeout=DEFAULT_TIMEOUT):
+    """Set seconds of waiting for status, 0 - no limit."""
+    globals()['TIMEOUT'] = timeout
+
+
+class StatusTimeout(Exception):
+    pass
+
+
+class StatusError(Exception):
+    pass
+
+
+class Failure(object):
+    """Error of getting status of one object, it fails only waiters for
+    this object.
+    """
+
+    def __init__(self, exc_info):
+        self.exc_info = exc_info
+
+
+def manager_statuses(manager, list_threshold=LIST_THRESHOLD, **list_kwargs):
+    """Function getting statuses of objects of novaclient-like manager.
+
+    Statuses of up to `list_threshold` objects are got by GET of every
+    object, of more objects - by one list request (objects missing in list,
+    e.g. of other tenants, are got one by one). Failed GET (e.g. 404) is
+    returned as Failure of this object.
+    """
+    def get_status(id_res):
+        try:
+            return manager.get(id_res).status
+        except Exception:
+            return Failure(sys.exc_info())
+
+    def statuses(ids):
+        if len(ids) <= list_threshold:
+            return dict((id_res, get_status(id_res)) for id_res in ids)
+        found = dict((obj.id, obj.status)
+                     for obj in manager.list(**list_kwargs) if obj.id in ids)
+        for id_res in ids:
+            if id_res not in found:
+                found[id_res] = get_status(id_res)
+        return found
+    return statuses
+
+
+class Waiter(object):
+    def __init__(self, id_res, status, deadline, callback):
+        self.id_res = id_res
+        self.status = status
+        self.deadline = deadline
+        self.callback = callback
+        self.event = threading.Event()
+        self.exc_info = None
+
+    def resolve(self, exc_info=None):
+        self.exc_info = exc_info
+        self.event.set()
+        if self.callback:
+            self.callback(self)
+
+    def done(self):
+        return self.event.is_set()
+
+    def wait(self):
+        # wait with timeout, otherwise Ctrl+C doesn't interrupt it
+        while not self.event.wait(MAX_INTERVAL):
+            pass
+        if self.exc_info:
+            raise self.exc_info[0], self.exc_info[1], self.exc_info[2]
+
+
+class StatusPoller(object):
+    """Waits for statuses of many objects with one request per round.
+
+    Objects are polled by background thread, which starts with
+    `interval` between requests and backs off to `max_interval` while no
+    status is changed. Waiter is resolved when object gets expected status,
+    fails with StatusError when object gets one of `error_statuses` and
+    with StatusTimeout after its deadline (default timeout is set by
+    init_poller).
+    """
+
+    def __init__(self, list_statuses, interval=DEFAULT_INTERVAL,
+                 max_interval=MAX_INTERVAL, backoff=BACKOFF,
+                 timeout=None, error_statuses=ERROR_STATUSES):
+        self.list_statuses = list_statuses
+        self.interval = interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.timeout = timeout
+        self.error_statuses = error_statuses
+        self.waiters = []
+        self.statuses = {}
+        self.condition = threading.Condition()
+        self.thread = None
+        self.current_interval = interval
+
+    def watch(self, id_res, status, callback=None, timeout=None):
+        """Start waiting for status, returns Waiter.
+
+        Callback is called with waiter from thread of poller.
+        """
+        return self.watch_all([id_res], status, callback, timeout)[0]
+
+    def watch_all(self, ids, status, callback=None, timeout=None):
+        """Start waiting for status of all objects at once, so they are
+        polled in the same round, returns their Waiters.
+        """
+        for default in (self.timeout, TIMEOUT):
+            if timeout is None:
+                timeout = default
+        deadline = time.time() + timeout if timeout else None
+        waiters = [Waiter(id_res, status, deadline, callback)
+                   for id_res in ids]
+        with self.condition:
+            self.waiters.extend(waiters)
+            # new object is polled at once
+            self.current_interval = self.interval
+            self.condition.notify()
+            if not self.thread:
+                self.thread = threading.Thread(target=self.run)
+                self.thread.daemon = True
+                self.thread.start()
+        return waiters
+
+    def wait_for_status(self, id_res, status, timeout=None):
+        self.watch(id_res, status, timeout=timeout).wait()
+
+    def wait_for_statuses(self, ids, status, timeout=None):
+        for waiter in self.watch_all(ids, status, timeout=timeout):
+            waiter.wait()
+
+    def poll(self):
+        """Poll statuses once, returns True if any status was changed."""
+        with self.condition:
+            waiters = list(self.waiters)
+        ids = set(waiter.id_res for waiter in waiters)
+        try:
+            statuses = self.list_statuses(ids)
+        except Exception:
+            exc_info = sys.exc_info()
+            for waiter in waiters:
+                self.finish(waiter, exc_info)
+            return True
+        changed = False
+        now = time.time()
+        for waiter in waiters:
+            status = statuses.get(waiter.id_res)
+            if isinstance(status, Failure):
+                changed = True
+                self.finish(waiter, status.exc_info)
+                continue
+            if status != self.statuses.get(waiter.id_res):
+                changed = True
+            if status == waiter.status:
+                self.finish(waiter)
+            elif status and status.lower() in self.error_statuses:
+                self.finish(waiter, self.exc_info(StatusError(
+                    "%s got status %s waiting for %s" %
+                    (waiter.id_res, status, waiter.status))))
+            elif waiter.deadline and now > waiter.deadline:
+                self.finish(waiter, self.exc_info(StatusTimeout(
+                    "%s has status %s after waiting for %s" %
+                    (waiter.id_res, status, waiter.status))))
+        self.statuses = statuses
+        return changed
+
+    @staticmethod
+    def exc_info(exception):
+        try:
+            raise exception
+        except Exception:
+            return sys.exc_info()
+
+    def finish(self, waiter, exc_info=None):
+        with self.condition:
+            self.waiters.remove(waiter)
+        waiter.resolve(exc_info)
+
+    def run(self):
+        while True:
+            with self.condition:
+                if not self.waiters:
+                    self.thread = None
+                    return
+            if self.poll():
+                interval = self.interval
+            else:
+                interval = min(self.current_interval * self.backoff,
+                               self.max_interval)
+            with self.condition:
+                self.current_interval = interval
+                if self.waiters:
+                    self.condition.wait(interval)
+
+
+_pollers = weakref.WeakKeyDictionary()
+_pollers_lock = threading.Lock()
+_pollers_pid = os.getpid()
+
+
+def _freeze(value):
+    """Hashable copy of list arguments, e.g. search_opts dict."""
+    if isinstance(value, dict):
+        return frozenset((key, _freeze(item))
+                         for key, item in value.iteritems())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def get_poller(manager, **list_kwargs):
+    """Poller shared by all waiters for objects of manager listed with
+    the same arguments.
+    """
+    global _pollers, _pollers_lock, _pollers_pid
+    if _pollers_pid != os.getpid():
+        # forked: threads of pollers and their waiters are left in parent
+        _pollers = weakref.WeakKeyDictionary()
+        _pollers_lock = threading.Lock()
+        _pollers_pid = os.getpid()
+    key = _freeze(list_kwargs)
+    with _pollers_lock:
+        pollers = _pollers.setdefault(manager, {})
+        if key not in pollers:
+            pollers[key] = StatusPoller(
+                manager_statuses(weakref.proxy(manager), **list_kwargs))
+        return pollers[key]
+
+
+def wait_for_status(manager, id_res, status, timeout=None, **list_kwargs):
+    get_poller(manager, **list_kwargs).wait_for_status(id_res, status,
+                                                       timeout)
+
+
+def wait_for_statuses(manager, ids, status, timeout=None, **list_kwargs):
+    get_poller(manager, **list_kwargs).wait_for_statuses(ids, status, timeout)
@@ -0,0 +1,93 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import itertools
+
+from cloudferrylib.utils import mysql_connector
+from cloudferrylib.utils import utils
+
+LOG = utils.get_log(__name__)
+
+CHUNK_SIZE = mysql_connector.BULK_SIZE
+
+
+class TableCopy(object):
+    """Copies rows of table from source to destination database.
+
+    Rows are read by chunks ordered by primary key `key` and remapped in
+    memory: `mappings` is {column: {old value: new value}}, values missing
+    in mapping are kept as is, `values` is {column: value} set in every row.
+    All rows are inserted into destination in one transaction.
+    """
+
+    def __init__(self, src, dst, table, key='id', chunk_size=CHUNK_SIZE,
+                 mappings=None, values=None):
+        self.src = src
+        self.dst = dst
+        self.table = table
+        self.key = key
+        self.chunk_size = chunk_size
+        self.mappings = mappings or {}
+        self.values = values or {}
+        self.columns = None
+        self.copied = 0
+
+    def read_chunks(self):
+        select_cmd = "SELECT * FROM `%s` %%s ORDER BY `%s` LIMIT %d" % (
+            self.table, self.key, self.chunk_size)
+        last = None
+        while True:
+            if last is None:
+                result = self.src.execute(select_cmd % '')
+            else:
+                result = self.src.execute(
+                    select_cmd % ("WHERE `%s` > :last" % self.key),
+                    last=last)
+            self.columns = result.keys()
+            rows = [dict(zip(self.columns, row)) for row in result]
+            if not rows:
+                return
+            last = rows[-1][self.key]
+            yield rows
+            if len(rows) < self.chunk_size:
+                return
+
+    def remap(self, row):
+        for column, mapping in self.mappings.iteritems():
+            if row.get(column) in mapping:
+                row[column] = mapping[row[column]]
+        row.update(self.values)
+        return row
+
+    def rows(self, chunks):
+        for rows in chunks:
+            for row in rows:
+                self.copied += 1
+                yield self.remap(row)
+
+    def run(self):
+        """Copy table, returns number of copied rows."""
+        chunks = self.read_chunks()
+        first_chunk = next(chunks, None)
+        if first_chunk is None:
+            LOG.info("Table %s is empty", self.table)
+            return 0
+        insert_cmd = "INSERT INTO `%s` (%s) VALUES (%s)" % (
+            self.table,
+            ', '.join('`%s`' % column for column in self.columns),
+            ', '.join(':%s' % column for column in self.columns))
+        rows = self.rows(itertools.chain([first_chunk], chunks))
+        self.dst.execute_many(insert_cmd, rows, chunk_size=self.chunk_size)
+        LOG.info("Copied %d rows of table %s", self.copied, self.table)
+        return self.copied
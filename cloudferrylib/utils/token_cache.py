@@ -0,0 +1,198 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import contextlib
+import fcntl
+import json
+import os
+import threading
+
+from keystoneclient import access
+from keystoneclient import exceptions
+from keystoneclient.v2_0 import client as keystone_client
+
+from cloudferrylib.os.identity import service_catalog
+
+# token is renewed if it expires earlier
+STALE_DURATION = 300
+# clients made from token alone can't authenticate again, they get token
+# with at least this part of its lifetime left
+TOKEN_ONLY_LIFETIME = 0.5
+# lifetime of token without issue time, default of keystone
+DEFAULT_TOKEN_LIFETIME = 3600
+ENDPOINT_TYPE = 'publicURL'
+
+
+def auth_url(host):
+    return "http://%s:35357/v2.0/" % host
+
+
+def authenticate(user, password, tenant, url):
+    return keystone_client.Client(username=user,
+                                  password=password,
+                                  tenant_name=tenant,
+                                  auth_url=url).auth_ref
+
+
+def catalog_client(auth_ref, url):
+    """Keystone client listing services and endpoints of shared catalog."""
+    return keystone_client.Client(token=auth_ref.auth_token, endpoint=url)
+
+
+def lifetime(auth_ref):
+    """Seconds from issue to expiration of token."""
+    try:
+        return (auth_ref.expires - auth_ref.issued).total_seconds()
+    except (KeyError, TypeError, ValueError):
+        return DEFAULT_TOKEN_LIFETIME
+
+
+class TokenCache(object):
+    """Keystone tokens and service catalogs by (auth url, user, tenant).
+
+    Token is shared by all clients of one user and tenant, forked
+    processes inherit cache. With path tokens are also stored in file
+    (readable by owner only) and reused by other workers and next runs
+    until they expire; file is rewritten under flock with tokens saved by
+    other workers merged in. Clients built from token alone (token_only) get
+    token with at least half of its lifetime left, since they can't
+    authenticate again.
+    """
+
+    def __init__(self, path=None, stale_duration=STALE_DURATION):
+        self.path = path
+        self.stale_duration = stale_duration
+        self.auth_refs = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(user, tenant, url):
+        return json.dumps([url, user, tenant])
+
+    def get_auth_ref(self, user, password, tenant, url, token_only=False):
+        key = self.key(user, tenant, url)
+        with self.lock:
+            auth_ref = self.auth_refs.get(key)
+            if self.expired(auth_ref, token_only):
+                # token can be got by other worker
+                self.load()
+                auth_ref = self.auth_refs.get(key)
+            if self.expired(auth_ref, token_only):
+                auth_ref = authenticate(user, password, tenant, url)
+                self.auth_refs[key] = auth_ref
+                self.save()
+            return auth_ref
+
+    def get_token_and_endpoint(self, user, password, tenant, url,
+                               service_type):
+        """Token and public endpoint of service, endpoint is None if
+        catalog has no such service.
+
+        Endpoint is taken from service catalog shared by clients of cloud,
+        catalog of token is used if user can't list the shared one.
+        """
+        auth_ref = self.get_auth_ref(user, password, tenant, url)
+        try:
+            catalog = service_catalog.get_catalog(
+                catalog_client(auth_ref, url), url)
+            endpoint = catalog.get_endpoint_by_type(
+                service_type, tenant_id=auth_ref.tenant_id,
+                user_id=auth_ref.user_id)
+        except exceptions.ClientException:
+            endpoint = None
+        if endpoint is None:
+            try:
+                endpoint = auth_ref.service_catalog.url_for(
+                    service_type=service_type, endpoint_type=ENDPOINT_TYPE)
+            except exceptions.EndpointNotFound:
+                pass
+        return auth_ref.auth_token, endpoint
+
+    def expired(self, auth_ref, token_only=False):
+        if auth_ref is None:
+            return True
+        stale_duration = self.stale_duration
+        if token_only:
+            stale_duration = max(stale_duration,
+                                 lifetime(auth_ref) * TOKEN_ONLY_LIFETIME)
+        return auth_ref.will_expire_soon(stale_duration)
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as cache_file:
+                stored = json.load(cache_file)
+        except ValueError:
+            return
+        for key, body in stored.iteritems():
+            auth_ref = access.AccessInfo.factory(body={'access': body})
+            if not self.expired(auth_ref) and self.expired(
+                    self.auth_refs.get(key)):
+                self.auth_refs[key] = auth_ref
+
+    @contextlib.contextmanager
+    def file_lock(self):
+        """Lock of cache file shared by workers of this host."""
+        fd = os.open(self.path + '.lock', os.O_WRONLY | os.O_CREAT, 0600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def save(self):
+        if not self.path:
+            return
+        with self.file_lock():
+            # tokens saved by other workers since our load are kept
+            self.load()
+            self.write()
+
+    def write(self):
+        stored = dict((key, dict(auth_ref))
+                      for key, auth_ref in self.auth_refs.iteritems()
+                      if not self.expired(auth_ref))
+        temp_path = '%s.%s' % (self.path, os.getpid())
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0600)
+        with os.fdopen(fd, 'w') as cache_file:
+            json.dump(stored, cache_file)
+        # rename is atomic, readers never see partially written file
+        os.rename(temp_path, self.path)
+
+
+CACHE = None
+
+
+def init_cache(path=None):
+    globals()['CACHE'] = TokenCache(path or None)
+
+
+def get_auth_ref(user, password, tenant, url, token_only=False):
+    """Auth ref of user, token_only - for client which is built from
+    token alone and can't authenticate again.
+    """
+    if CACHE is None:
+        return authenticate(user, password, tenant, url)
+    return CACHE.get_auth_ref(user, password, tenant, url, token_only)
+
+
+def get_token_and_endpoint(user, password, tenant, url, service_type):
+    """Cached token and endpoint for client of service, (None, None) if
+    cache isn't initialized - client should authenticate itself.
+    """
+    if CACHE is None:
+        return None, None
+    return CACHE.get_token_and_endpoint(user, password, tenant, url,
+                                        service_type)
@@ -27,6 +27,10 @@ import os
 import inspect
 from multiprocessing import Lock
 from fabric.api import run, settings, local, env
+from cloudferrylib.scheduler import pool
+from cloudferrylib.utils import list_cache
+from cloudferrylib.utils import status_poller
+from cloudferrylib.utils import token_cache
 
 
 ISCSI = "iscsi"
@@ -161,7 +165,7 @@ class GeneratorPassword:
         return self.__generate_password()
 
     def __generate_password(self):
-        random.seed = (os.urandom(1024))
+        random.seed(os.urandom(1024))
         return ''.join(random.choice(self.chars) for i in range(self.length))
 
 
@@ -381,4 +385,8 @@ def get_libvirt_block_info(libvirt_name, init_host, compute_host):
 
 def init_singletones(cfg):
     globals()['up_ssh_tunnel'] = wrapper_singletone_ssh_tunnel(cfg.migrate.ssh_transfer_port)
+    token_cache.init_cache(cfg.migrate.token_cache)
+    list_cache.init_cache(cfg.migrate.list_cache_ttl)
+    pool.init_pool(cfg.migrate.scheduler_pool_size)
+    status_poller.init_poller(cfg.migrate.status_timeout)
 
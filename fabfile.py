@@ -17,6 +17,7 @@ from cloudferrylib.scheduler.namespace import Namespace
 from cloudferrylib.scheduler.scheduler import Scheduler
 import cfglib
 from utils import get_log
+from cloudferrylib.utils import list_cache
 from cloudferrylib.utils import utils
 from cloud import cloud_ferry
 env.forward_agent = True
@@ -25,16 +26,21 @@ LOG = get_log(__name__)
 
 
 @task
-def migrate(name_config=None, name_instance=None):
+def migrate(name_config=None, name_instance=None, resume=False):
     """
         :name_config - name of config yaml-file, example 'config.yaml'
+        :resume - continue from checkpoint of previous run, example
+                  'fab migrate:resume=True'
     """
     cfglib.collector_configs_plugins()
     cfglib.init_config(name_config)
     utils.init_singletones(cfglib.CONF)
     env.key_filename = cfglib.CONF.migrate.key_filename
     cloud = cloud_ferry.CloudFerry(cfglib.CONF)
+    cloud.resume = resume not in (False, 'False', 'false')
     cloud.migrate()
+    for name, counters in sorted(list_cache.stats().iteritems()):
+        LOG.info("List cache of %s: %s", name, counters)
 
 
 @task
@@ -43,5 +49,74 @@ def get_info(name_config):
     namespace = Namespace({'name_config': name_config})
     scheduler = Scheduler(namespace)
 
+
+@task
+def bench_scheduler(num_tasks=10000):
+    """
+        :num_tasks - number of no-op tasks in generated plan
+    """
+    from cloudferrylib.scheduler.utils import benchmark
+    result = benchmark.scheduler_overhead(int(num_tasks))
+    LOG.info("Scheduler overhead for %(tasks)s tasks (us per task): "
+             "compile %(compile_us).2f, cursor %(cursor_us).2f, "
+             "scheduler %(scheduler_us).2f" % result)
+
+
+@task
+def bench_file_proxy(size_mb=256, speed_limit='10000MB'):
+    """
+        :size_mb - size of data read through proxy
+        :speed_limit - speed limit for limited reads, example '100MB'
+    """
+    from cloudferrylib.utils import benchmark
+    result = benchmark.proxy_read_cost(int(size_mb), speed_limit)
+    LOG.info("FileLikeProxy CPU cost for %(size_mb)s MB (s per GB): "
+             "unlimited %(unlimited_s_per_gb).3f, limited by %(speed_limit)s "
+             "%(limited_s_per_gb).3f" % result)
+
+
+@task
+def coordinate(queue_path, name_config=None, instances=None, job_timeout=60):
+    """
+        :queue_path - path to SQLite queue of jobs on shared storage
+        :name_config - name of config yaml-file, example 'config.yaml'
+        :instances - ids of instances separated by ';', by default all
+                     instances of source cloud are migrated
+        :job_timeout - seconds without heartbeat, after which job of dead
+                       worker is given to other worker
+    """
+    from cloud import instance_jobs
+    from cloudferrylib.scheduler import distributed
+    cfglib.collector_configs_plugins()
+    cfglib.init_config(name_config)
+    utils.init_singletones(cfglib.CONF)
+    if instances:
+        jobs_kwargs = [{'instance_id': instance_id}
+                       for instance_id in instances.split(';')]
+    else:
+        jobs_kwargs = instance_jobs.instance_jobs()
+    coordinator = distributed.Coordinator(
+        distributed.SqliteQueue(queue_path), job_timeout=int(job_timeout))
+    jobs = coordinator.run(instance_jobs.PLAN, jobs_kwargs)
+    for job_id, job in sorted(jobs.iteritems()):
+        LOG.info("Instance %s: %s %s", job.kwargs['instance_id'], job.state,
+                 job.error or '')
+
+
+@task
+def worker(queue_path, name_config=None, wait=True):
+    """
+        :queue_path - path to SQLite queue of jobs on shared storage
+        :name_config - name of config yaml-file, example 'config.yaml'
+    """
+    from cloudferrylib.scheduler import distributed
+    cfglib.collector_configs_plugins()
+    cfglib.init_config(name_config)
+    utils.init_singletones(cfglib.CONF)
+    env.key_filename = cfglib.CONF.migrate.key_filename
+    queue = distributed.SqliteQueue(queue_path)
+    distributed.Worker(queue).run(wait=wait not in (False, 'False', 'false'))
+
+
 if __name__ == '__main__':
     migrate(None)
@@ -12,7 +12,6 @@
 # See the License for the specific language governing permissions and#
 # limitations under the License.
 
-import time
 import json
 
 from utils import forward_agent, CEPH, REMOTE_FILE, log_step, get_log
@@ -20,6 +19,7 @@ from scheduler.builder_wrapper import inspect_func, supertask
 from fabric.api import run, settings, env, cd
 from migrationlib.os.utils.osVolumeTransfer import VolumeTransferDirectly, VolumeTransferViaImage
 from migrationlib.os.utils.osImageTransfer import ImageTransfer
+from cloudferrylib.utils import status_poller
 
 __author__ = 'mirrorcoder'
 
@@ -388,8 +388,7 @@ class osBuilderExporter:
         return getter.get(id).status
 
     def __wait_for_status(self, getter, id, status):
-        while self.__get_status(getter, id) != status:
-            time.sleep(1)
+        status_poller.wait_for_status(getter, id, status)
 
     def __getattr__(self, item):
         list_getters = {
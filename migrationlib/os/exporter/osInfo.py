@@ -17,6 +17,7 @@
 Package with OpenStack info class.
 """
 
+from cloudferrylib.utils import list_cache
 from migrationlib.os import osCommon
 from utils import log_step, get_log, render_info, write_info
 
@@ -46,23 +47,23 @@ class MainInfoResource(osCommon.osCommon):
 
     @log_step(LOG)
     def info_tenants_list(self):
-        MainInfoResource.source_info['tenants'] = self.keystone_client.tenants.list()
-        return self.keystone_client.tenants.list()
+        MainInfoResource.source_info['tenants'] = list_cache.cached_list(self.keystone_client.tenants)
+        return list_cache.cached_list(self.keystone_client.tenants)
 
     @log_step(LOG)
     def info_users_list(self):
-        MainInfoResource.source_info['tenants_info'][self.tenant_name]['users'] = self.keystone_client.users.list()
-        return self.keystone_client.users.list()
+        MainInfoResource.source_info['tenants_info'][self.tenant_name]['users'] = list_cache.cached_list(self.keystone_client.users)
+        return list_cache.cached_list(self.keystone_client.users)
 
     @log_step(LOG)
     def info_roles_list(self):
-        MainInfoResource.source_info['tenants_info'][self.tenant_name]['roles'] = self.keystone_client.roles.list()
-        return self.keystone_client.roles.list()
+        MainInfoResource.source_info['tenants_info'][self.tenant_name]['roles'] = list_cache.cached_list(self.keystone_client.roles)
+        return list_cache.cached_list(self.keystone_client.roles)
 
     @log_step(LOG)
     def info_images_list(self):
-        MainInfoResource.source_info['tenants_info'][self.tenant_name]['images'] = self.glance_client.images.list()
-        return self.glance_client.images.list()
+        MainInfoResource.source_info['tenants_info'][self.tenant_name]['images'] = list_cache.cached_list(self.glance_client.images)
+        return list_cache.cached_list(self.glance_client.images)
 
     @log_step(LOG)
     def info_volumes_list(self):
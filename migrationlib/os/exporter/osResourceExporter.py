@@ -16,6 +16,7 @@
 """
 Package with OpenStack resources export/import utilities.
 """
+from cloudferrylib.utils import list_cache
 from migrationlib.os import osCommon
 from utils import log_step, get_log, render_info, write_info
 import sqlalchemy
@@ -55,18 +56,18 @@ class ResourceExporter(osCommon.osCommon):
                 tenants = [self.keystone_client.tenants.get(t.tenant_id).name for t in tenants]
                 return flavor, tenants
 
-        flavor_list = self.nova_client.flavors.list()
+        flavor_list = list_cache.cached_list(self.nova_client.flavors)
         self.data['flavors'] = map(process_flavor, flavor_list)
         return self
 
     @log_step(LOG)
     def get_tenants(self):
-        self.data['tenants'] = self.keystone_client.tenants.list()
+        self.data['tenants'] = list_cache.cached_list(self.keystone_client.tenants)
         return self
 
     @log_step(LOG)
     def get_roles(self):
-        self.data['roles'] = self.keystone_client.roles.list()
+        self.data['roles'] = list_cache.cached_list(self.keystone_client.roles)
         return self
 
     @log_step(LOG)
@@ -94,13 +95,13 @@ class ResourceExporter(osCommon.osCommon):
             self.data['network_service_info']= {}
 
     def __get_nova_security_groups(self):
-        return self.nova_client.security_groups.list()
+        return list_cache.cached_list(self.nova_client.security_groups)
 
     def __get_neutron_security_groups(self):
         return self.network_client.list_security_groups()['security_groups']
 
     def __get_user_info(self, with_password):
-        users = self.keystone_client.users.list()
+        users = list_cache.cached_list(self.keystone_client.users)
         info = {}
         if with_password:
             with sqlalchemy.create_engine(self.keystone_db_conn_url).begin() as connection:
@@ -13,13 +13,12 @@
 # limitations under the License.
 
 
-import time
-
 from migrationlib.os.utils.FileLikeProxy import FileLikeProxy
 from utils import forward_agent, up_ssh_tunnel, ChecksumImageInvalid, \
     CEPH, REMOTE_FILE, QCOW2, log_step, get_log
 from fabric.api import run, settings, env
 from migrationlib.os.osCommon import osCommon
+from cloudferrylib.utils import status_poller
 import ipaddr
 
 
@@ -967,5 +966,4 @@ class osBuilderImporter:
 
 
     def __wait_for_status(self, getter, id, status):
-        while getter.get(id).status != status:
-            time.sleep(1)
+        status_poller.wait_for_status(getter, id, status)
@@ -15,6 +15,7 @@
 """
 Package with OpenStack resources export/import utilities.
 """
+from cloudferrylib.utils import list_cache
 from migrationlib.os import osCommon
 from utils import log_step, get_log, GeneratorPassword, Postman, Templater
 from scheduler.builder_wrapper import inspect_func, supertask
@@ -99,10 +100,13 @@ class ResourceImporter(osCommon.osCommon):
     def upload_roles(self, data=None, **kwargs):
         roles = data['roles'] if data else self.data['roles']
         # do not import a role if one with the same name already exists
-        existing_roles = {r.name.lower() for r in self.keystone_client.roles.list()}
-        for role in roles:
-            if role.name.lower() not in existing_roles:
-                self.keystone_client.roles.create(role.name)
+        existing_roles = {r.name.lower() for r in list_cache.cached_list(self.keystone_client.roles)}
+        try:
+            for role in roles:
+                if role.name.lower() not in existing_roles:
+                    self.keystone_client.roles.create(role.name)
+        finally:
+            list_cache.invalidate(self.keystone_client.roles)
         return self
 
     @inspect_func
@@ -110,49 +114,53 @@ class ResourceImporter(osCommon.osCommon):
     def upload_tenants(self, data=None, **kwargs):
         tenants = data['tenants'] if data else self.data['tenants']
         # do not import tenants or users if ones with the same name already exist
-        existing_tenants = {t.name: t for t in self.keystone_client.tenants.list()}
-        existing_tenants_lower = {t.name.lower(): t for t in self.keystone_client.tenants.list()}
-        existing_users = {u.name: u for u in self.keystone_client.users.list()}
-        existing_users_lower = {u.name.lower(): u for u in self.keystone_client.users.list()}
+        existing_tenants = {t.name: t for t in list_cache.cached_list(self.keystone_client.tenants)}
+        existing_tenants_lower = {t.name.lower(): t for t in list_cache.cached_list(self.keystone_client.tenants)}
+        existing_users = {u.name: u for u in list_cache.cached_list(self.keystone_client.users)}
+        existing_users_lower = {u.name.lower(): u for u in list_cache.cached_list(self.keystone_client.users)}
         # by this time roles on source and destination should be synchronized
-        roles = {r.name: r for r in self.keystone_client.roles.list()}
+        roles = {r.name: r for r in list_cache.cached_list(self.keystone_client.roles)}
         self.users_notifications = {}
-        for tenant in tenants:
-            if not tenant.name.lower() in existing_tenants_lower:
-                dest_tenant = self.keystone_client.tenants.create(tenant_name=tenant.name,
-                                                                  description=tenant.description,
-                                                                  enabled=tenant.enabled)
-            elif not tenant.name in existing_tenants:
-                ex_tenant = existing_tenants_lower[tenant.name.lower()]
-                dest_tenant = self.keystone_client.tenants.update(ex_tenant.id, tenant_name=tenant.name)
-            else:
-                dest_tenant = existing_tenants[tenant.name]
-            # import users of this tenant that don't exist yet
-            for user in tenant.list_users():
-                if user.name.lower() not in existing_users_lower:
-                    new_password = self.__generate_password()
-                    dest_user = self.keystone_client.users.create(name=user.name,
-                                                                  password=new_password,
-                                                                  email=user.email,
-                                                                  tenant_id=dest_tenant.id,
-                                                                  enabled=user.enabled)
-                    self.users_notifications[user.name] = {
-                        'email': user.email,
-                        'password': new_password
-                    }
-                elif user.name not in existing_users:
-                    ex_user = existing_users_lower[user.name.lower()]
-                    dest_user = self.keystone_client.users.update(ex_user,
-                                                                  name=user.name)
+        try:
+            for tenant in tenants:
+                if not tenant.name.lower() in existing_tenants_lower:
+                    dest_tenant = self.keystone_client.tenants.create(tenant_name=tenant.name,
+                                                                      description=tenant.description,
+                                                                      enabled=tenant.enabled)
+                elif not tenant.name in existing_tenants:
+                    ex_tenant = existing_tenants_lower[tenant.name.lower()]
+                    dest_tenant = self.keystone_client.tenants.update(ex_tenant.id, tenant_name=tenant.name)
                 else:
-                    dest_user = existing_users[user.name]
-                # import roles of this user within the tenant that are not already assigned
-                dest_user_roles_lower = {r.name.lower() for r in dest_user.list_roles(dest_tenant)}
-                for role in user.list_roles(tenant):
-                    if role.name.lower() not in dest_user_roles_lower:
-                        for dest_role in roles:
-                            if role.name.lower() == dest_role.lower():
-                                dest_tenant.add_user(dest_user, roles[dest_role])
+                    dest_tenant = existing_tenants[tenant.name]
+                # import users of this tenant that don't exist yet
+                for user in tenant.list_users():
+                    if user.name.lower() not in existing_users_lower:
+                        new_password = self.__generate_password()
+                        dest_user = self.keystone_client.users.create(name=user.name,
+                                                                      password=new_password,
+                                                                      email=user.email,
+                                                                      tenant_id=dest_tenant.id,
+                                                                      enabled=user.enabled)
+                        self.users_notifications[user.name] = {
+                            'email': user.email,
+                            'password': new_password
+                        }
+                    elif user.name not in existing_users:
+                        ex_user = existing_users_lower[user.name.lower()]
+                        dest_user = self.keystone_client.users.update(ex_user,
+                                                                      name=user.name)
+                    else:
+                        dest_user = existing_users[user.name]
+                    # import roles of this user within the tenant that are not already assigned
+                    dest_user_roles_lower = {r.name.lower() for r in dest_user.list_roles(dest_tenant)}
+                    for role in user.list_roles(tenant):
+                        if role.name.lower() not in dest_user_roles_lower:
+                            for dest_role in roles:
+                                if role.name.lower() == dest_role.lower():
+                                    dest_tenant.add_user(dest_user, roles[dest_role])
+        finally:
+            list_cache.invalidate(self.keystone_client.tenants)
+            list_cache.invalidate(self.keystone_client.users)
         return self
 
     @inspect_func
@@ -160,22 +168,25 @@ class ResourceImporter(osCommon.osCommon):
     def upload_flavors(self, data=None, **kwargs):
         flavors = data['flavors'] if data else self.data['flavors']
         # do not import a flavor if one with the same name already exists
-        existing = {f.name for f in self.nova_client.flavors.list()}
-        for (flavor, tenants) in flavors:
-            if flavor.name not in existing:
-                if flavor.swap == "":
-                    flavor.swap = 0
-                dest_flavor = self.nova_client.flavors.create(name=flavor.name,
-                                                              ram=flavor.ram,
-                                                              vcpus=flavor.vcpus,
-                                                              disk=flavor.disk,
-                                                              swap=flavor.swap,
-                                                              rxtx_factor=flavor.rxtx_factor,
-                                                              ephemeral=flavor.ephemeral,
-                                                              is_public=flavor.is_public)
-                for tenant in tenants:
-                    dest_tenant = self.keystone_client.tenants.find(name=tenant)
-                    self.nova_client.flavor_access.add_tenant_access(dest_flavor, dest_tenant.id)
+        existing = {f.name for f in list_cache.cached_list(self.nova_client.flavors)}
+        try:
+            for (flavor, tenants) in flavors:
+                if flavor.name not in existing:
+                    if flavor.swap == "":
+                        flavor.swap = 0
+                    dest_flavor = self.nova_client.flavors.create(name=flavor.name,
+                                                                  ram=flavor.ram,
+                                                                  vcpus=flavor.vcpus,
+                                                                  disk=flavor.disk,
+                                                                  swap=flavor.swap,
+                                                                  rxtx_factor=flavor.rxtx_factor,
+                                                                  ephemeral=flavor.ephemeral,
+                                                                  is_public=flavor.is_public)
+                    for tenant in tenants:
+                        dest_tenant = self.keystone_client.tenants.find(name=tenant)
+                        self.nova_client.flavor_access.add_tenant_access(dest_flavor, dest_tenant.id)
+        finally:
+            list_cache.invalidate(self.nova_client.flavors)
         return self
 
     @inspect_func
@@ -185,7 +196,7 @@ class ResourceImporter(osCommon.osCommon):
         # upload user password if the user exists both on source and destination
         if users:
             with sqlalchemy.create_engine(self.keystone_db_conn_url).begin() as connection:
-                for user in self.keystone_client.users.list():
+                for user in list_cache.cached_list(self.keystone_client.users):
                     if user.name in users:
                         connection.execute(sqlalchemy.text("UPDATE user SET password = :password WHERE id = :user_id"),
                                            user_id=user.id,
@@ -205,36 +216,42 @@ class ResourceImporter(osCommon.osCommon):
         return self
 
     def __upload_nova_security_groups(self, security_groups):
-        existing = {sg.name for sg in self.nova_client.security_groups.list()}
-        for security_group in security_groups:
-            if security_group.name not in existing:
-                dest_security_group = self.nova_client.security_groups.create(name=security_group.name,
-                                                                              description=security_group.description)
-                for rule in security_group.rules:
-                    self.nova_client.security_group_rules.create(parent_group_id=dest_security_group.id,
-                                                                 ip_protocol=rule['ip_protocol'],
-                                                                 from_port=rule['from_port'],
-                                                                 to_port=rule['to_port'],
-                                                                 cidr=rule['ip_range']['cidr'])
+        existing = {sg.name for sg in list_cache.cached_list(self.nova_client.security_groups)}
+        try:
+            for security_group in security_groups:
+                if security_group.name not in existing:
+                    dest_security_group = self.nova_client.security_groups.create(name=security_group.name,
+                                                                                  description=security_group.description)
+                    for rule in security_group.rules:
+                        self.nova_client.security_group_rules.create(parent_group_id=dest_security_group.id,
+                                                                     ip_protocol=rule['ip_protocol'],
+                                                                     from_port=rule['from_port'],
+                                                                     to_port=rule['to_port'],
+                                                                     cidr=rule['ip_range']['cidr'])
+        finally:
+            list_cache.invalidate(self.nova_client.security_groups)
 
     def __upload_neutron_security_groups(self, security_groups):
         # existing = {sg['name'] for sg in self.network_client.list_security_groups()['security_groups']}
-        existing = {sg.name for sg in self.nova_client.security_groups.list()}
-        for security_group in security_groups:
-            if security_group['name'] not in existing:
-                dest_security_group = self.network_client.create_security_group({"security_group":{"name":security_group['name'],
-                                                                                 "description":security_group['description']}})
-                for rule in security_group['security_group_rules']:
-                    if rule['protocol']:
-                        self.network_client.create_security_group_rule({"security_group_rule":{
-                                                                        "direction":rule["direction"],
-                                                                        "port_range_min":rule["port_range_min"],
-                                                                        "ethertype":rule["ethertype"],
-                                                                        "port_range_max":rule["port_range_max"],
-                                                                        "protocol":rule["protocol"],
-                                                                        "remote_ip_prefix": rule['remote_ip_prefix'],
-                                                                        "remote_group_id":dest_security_group['security_group']['security_group_rules'][0]['remote_group_id'],
-                                                                        "security_group_id":dest_security_group['security_group']['security_group_rules'][0]['security_group_id']}})
+        existing = {sg.name for sg in list_cache.cached_list(self.nova_client.security_groups)}
+        try:
+            for security_group in security_groups:
+                if security_group['name'] not in existing:
+                    dest_security_group = self.network_client.create_security_group({"security_group":{"name":security_group['name'],
+                                                                                     "description":security_group['description']}})
+                    for rule in security_group['security_group_rules']:
+                        if rule['protocol']:
+                            self.network_client.create_security_group_rule({"security_group_rule":{
+                                                                            "direction":rule["direction"],
+                                                                            "port_range_min":rule["port_range_min"],
+                                                                            "ethertype":rule["ethertype"],
+                                                                            "port_range_max":rule["port_range_max"],
+                                                                            "protocol":rule["protocol"],
+                                                                            "remote_ip_prefix": rule['remote_ip_prefix'],
+                                                                            "remote_group_id":dest_security_group['security_group']['security_group_rules'][0]['remote_group_id'],
+                                                                            "security_group_id":dest_security_group['security_group']['security_group_rules'][0]['security_group_id']}})
+        finally:
+            list_cache.invalidate(self.nova_client.security_groups)
 
     @inspect_func
     @log_step(LOG)
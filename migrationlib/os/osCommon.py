@@ -17,6 +17,8 @@ from novaclient.v1_1 import client as novaClient
 from cinderclient.v1 import client as cinderClient
 from glanceclient.v1 import client as glanceClient
 from keystoneclient.v2_0 import client as keystoneClient
+from cloudferrylib.os.identity import service_catalog
+from cloudferrylib.utils import token_cache
 
 NOVA_SERVICE = "nova"
 
@@ -42,20 +44,35 @@ class osCommon(object):
 
         """ Getting nova client """
 
+        auth_url = token_cache.auth_url(params["host"])
+        token, endpoint = token_cache.get_token_and_endpoint(
+            params["user"], params["password"], params["tenant"], auth_url,
+            'compute')
+        kwargs = {}
+        if token and endpoint:
+            kwargs = {'auth_token': token, 'bypass_url': endpoint}
         return novaClient.Client(params["user"],
                                  params["password"],
                                  params["tenant"],
-                                 "http://" + params["host"] + ":35357/v2.0/")
+                                 auth_url, **kwargs)
 
     @staticmethod
     def get_cinder_client(params):
 
         """ Getting cinder client """
 
-        return cinderClient.Client(params["user"],
-                                   params["password"],
-                                   params["tenant"],
-                                   "http://" + params["host"] + ":35357/v2.0/")
+        auth_url = token_cache.auth_url(params["host"])
+        client = cinderClient.Client(params["user"],
+                                     params["password"],
+                                     params["tenant"],
+                                     auth_url)
+        token, endpoint = token_cache.get_token_and_endpoint(
+            params["user"], params["password"], params["tenant"], auth_url,
+            'volume')
+        if token and endpoint:
+            client.client.auth_token = token
+            client.client.management_url = endpoint.rstrip('/')
+        return client
 
     @staticmethod
     def detect_network_client(keystone):
@@ -91,12 +108,13 @@ class osCommon(object):
 
         """ Getting keystone client """
 
-        keystoneClientForToken = keystoneClient.Client(username=params["user"],
-                                                       password=params["password"],
-                                                       tenant_name=params["tenant"],
-                                                       auth_url="http://" + params["host"] + ":35357/v2.0/")
-        return keystoneClient.Client(token=keystoneClientForToken.auth_ref["token"]["id"],
-                                     endpoint="http://" + params["host"] + ":35357/v2.0/")
+        auth_url = token_cache.auth_url(params["host"])
+        auth_ref = token_cache.get_auth_ref(params["user"],
+                                            params["password"],
+                                            params["tenant"],
+                                            auth_url, token_only=True)
+        return keystoneClient.Client(token=auth_ref["token"]["id"],
+                                     endpoint=auth_url)
 
     @staticmethod
     def get_glance_client(keystone_client):
@@ -111,27 +129,22 @@ class osCommon(object):
 
         """ Getting service_id from keystone """
 
-        for service in keystone_client.services.list():
-            if service.name == name_service:
-                return service
-        return None
+        return service_catalog.get_catalog(
+            keystone_client).get_service_by_name(name_service)
 
     @staticmethod
     def get_name_service_by_type(keystone_client, type_service):
 
         """ Getting service_name from keystone """
 
-        for service in keystone_client.services.list():
-            if service.type == type_service:
-                return service.name
-        return NOVA_SERVICE
+        service = service_catalog.get_catalog(
+            keystone_client).get_service_by_type(type_service)
+        return service.name if service else NOVA_SERVICE
 
     @staticmethod
     def get_public_endpoint_service_by_id(keystone_client, service_id):
-        for endpoint in keystone_client.endpoints.list():
-            if endpoint.service_id == service_id:
-                return endpoint.publicurl
-        return None
+        return service_catalog.get_catalog(
+            keystone_client).get_public_endpoint(service_id)
 
     @staticmethod
     def get_endpoint_by_name_service(keystone_client, name_service):
@@ -13,10 +13,10 @@
 # limitations under the License.
 
 
-import re
-import time
+import hashlib
 
-from utils import get_log
+from cloudferrylib.utils import rate_limit
+from utils import get_log, ChecksumImageInvalid
 
 
 # Maximum Bytes Per Packet
@@ -36,8 +36,57 @@ def callback_print_progress(size, length, obj_id, name):
             name))
 
 
+class RingBuffer(object):
+    """Preallocated buffer of fixed capacity.
+
+    Data is copied once on write and once on read, free space is reused
+    without moving data.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = bytearray(capacity)
+        self.view = memoryview(self.data)
+        self.start = 0
+        self.size = 0
+
+    def free(self):
+        return self.capacity - self.size
+
+    def write(self, chunk):
+        """Copy as much of chunk as fits, returns number of written bytes."""
+        chunk = memoryview(chunk)
+        written = 0
+        end = (self.start + self.size) % self.capacity
+        # free space is [end, capacity) + [0, start) or [end, start)
+        if self.free() and end >= self.start:
+            segments = ((end, self.capacity), (0, self.start))
+        else:
+            segments = ((end, self.start),)
+        for begin, finish in segments:
+            part = min(finish - begin, len(chunk) - written)
+            if part <= 0:
+                break
+            self.view[begin:begin + part] = chunk[written:written + part]
+            written += part
+        self.size += written
+        return written
+
+    def read(self, size):
+        size = min(size, self.size)
+        first = min(size, self.capacity - self.start)
+        res = self.view[self.start:self.start + first].tobytes()
+        if size > first:
+            res += self.view[:size - first].tobytes()
+        self.size -= size
+        # empty buffer is filled from the beginning, reads are contiguous
+        self.start = (self.start + size) % self.capacity if self.size else 0
+        return res
+
+
 class FileLikeProxy:
-    def __init__(self, transfer_object, callback, speed_limit='1mb'):
+    def __init__(self, transfer_object, callback, speed_limit='1mb',
+                 limiter=None):
         self.__callback = callback
         self.resp = transfer_object['resource_src'].get_ref_image(
             transfer_object['id'])
@@ -48,43 +97,76 @@ class FileLikeProxy:
         self.percent = self.length / 100
         self.res = 0
         self.delta = 0
-        self.buffer = ''
-        self.prev_send_time = 0
-        self.speed_limit = self.__parse_speed_limit(speed_limit)
+        self.buffer = RingBuffer(CHUNK_SIZE)
+        self.eof = False
+        # data is verified while it streams, without second reading
+        self.expected_checksum = transfer_object.get('checksum')
+        self.checksum = hashlib.md5()
+        self.verified = False
+        # limiter shared with other streams or own one
+        self.limiter = limiter or rate_limit.TokenBucket(
+            rate_limit.parse_speed_limit(speed_limit))
+        self.speed_limit = self.limiter.rate
         if self.speed_limit != 0:
             self.read = self.speed_limited_read
 
-    def __parse_speed_limit(self, speed_limit):
-        if speed_limit is '-':
-            return 0
-        array = filter(None, re.split(r'(\d+)', speed_limit))
-        mult = {
-            'b': 1,
-            'kb': 1024,
-            'mb': 1024 * 1024,
-        }[array[1].lower()]
-        return int(array[0]) * mult
-
     def read(self, *args, **kwargs):
         res = self.resp.read(*args, **kwargs)
-        self.__trigger_callback(len(res))
+        self.__transferred(res)
         return res
 
-    def speed_limited_read(self, *args, **kwargs):
-        if len(self.buffer) < CHUNK_SIZE:
-            self.buffer += self.resp.read(*args, **kwargs)
-
-        res = self.buffer[0:CHUNK_SIZE]
-        self.buffer = self.buffer[CHUNK_SIZE::]
-
-        self.__trigger_callback(len(res))
-        cur_send_time = time.time()
-        sleep_time = float(len(res)) / self.speed_limit
-        sleep_time -= cur_send_time - self.prev_send_time
-        time.sleep(max((0, sleep_time)))
-        self.prev_send_time = cur_send_time
+    def speed_limited_read(self, size=None):
+        if size is None or size < 0 or size > CHUNK_SIZE:
+            size = CHUNK_SIZE
+        res = None
+        # short reads of response are joined into chunk of requested size
+        while self.buffer.size < size and not self.eof:
+            chunk = self.resp.read(size - self.buffer.size)
+            if not chunk:
+                self.eof = True
+            elif not self.buffer.size and len(chunk) == size:
+                # full chunk is returned as is, without copying
+                res = chunk
+                break
+            else:
+                self.buffer.write(chunk)
+        if res is None:
+            res = self.buffer.read(size)
+
+        self.__transferred(res)
+        self.limiter.consume(len(res))
         return res
 
+    def skip(self, offset):
+        """Skip offset bytes of response without speed limit (data was
+        transferred before).
+        """
+        while offset > 0:
+            data = self.resp.read(min(offset, CHUNK_SIZE))
+            if not data:
+                break
+            offset -= len(data)
+            self.__transferred(data)
+
+    def __transferred(self, data):
+        self.checksum.update(data)
+        self.__trigger_callback(len(data))
+        if not data or (self.length and self.res >= self.length):
+            self.verify()
+
+    def verify(self):
+        """Compare checksum of streamed data with checksum of source,
+        raises ChecksumImageInvalid on mismatch.
+        """
+        if self.verified or not self.expected_checksum:
+            return
+        self.verified = True
+        checksum = self.checksum.hexdigest()
+        if checksum != self.expected_checksum:
+            LOG.error("Checksum of image %s (%s) is %s instead of %s",
+                      self.name, self.id, checksum, self.expected_checksum)
+            raise ChecksumImageInvalid(self.expected_checksum, checksum)
+
     def __trigger_callback(self, len_data):
         self.delta += len_data
         self.res += len_data
@@ -0,0 +1,50 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+
+import mock
+from oslotest import mockpatch
+
+from cloudferrylib.os.actions import transport_instance
+from tests import test
+
+
+class TransportInstancesTestCase(test.TestCase):
+    def setUp(self):
+        super(TransportInstancesTestCase, self).setUp()
+        self.compute = mock.Mock()
+        self.cloud_src = mock.Mock(resources={'compute': self.compute})
+        self.transport = mock.Mock()
+        self.useFixture(mockpatch.PatchObject(
+            transport_instance.TransportInstance, 'run', new=self.transport))
+
+    def test_run(self):
+        transported = []
+
+        def read_info_by_instance(search_opts=None):
+            for instance_id in ('id0', 'id1'):
+                yield {'compute': {'instances': {instance_id: {}}}}
+                # instance is transported before the next one is read
+                transported.append(self.transport.call_count)
+
+        self.compute.read_info_by_instance.side_effect = read_info_by_instance
+        action = transport_instance.TransportInstances(
+            search_opts={'all_tenants': 1})
+        action.run(cfg='cfg', cloud_src=self.cloud_src, cloud_dst='dst')
+
+        self.assertEqual([1, 2], transported)
+        self.compute.read_info_by_instance.assert_called_once_with(
+            search_opts={'all_tenants': 1})
+        self.transport.assert_called_with(
+            cfg='cfg', cloud_src=self.cloud_src, cloud_dst='dst',
+            info={'compute': {'instances': {'id1': {}}}})
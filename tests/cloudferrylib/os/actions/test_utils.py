@@ -0,0 +1,53 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from oslotest import mockpatch
+
+from cloudferrylib.os.actions import utils
+from cloudferrylib.utils import utils as utl
+from tests import test
+
+SUM1 = 'a7c01feeadab6e3ff50a3279d3979e08'
+SUM2 = 'd41d8cd98f00b204e9800998ecf8427e'
+
+
+class RunVerifiedTestCase(test.TestCase):
+    def setUp(self):
+        super(RunVerifiedTestCase, self).setUp()
+        self.run = mock.Mock()
+        self.useFixture(mockpatch.PatchObject(utils, 'run', new=self.run))
+
+    def test_commands(self):
+        self.assertEqual("{ dd if=a | tee /dev/fd/3 | md5sum >&2; } 3>&1",
+                         utils.source_cmd("dd if=a"))
+        self.assertEqual("{ tee /dev/fd/3 | md5sum >&2; } 3>&1 | dd of=b",
+                         utils.sink_cmd("dd of=b"))
+
+    def test_match(self):
+        self.run.return_value = "%s  -\n1+0 records in\n%s  -\n" % (SUM1,
+                                                                     SUM1)
+        utils.run_verified("cmd", "file")
+        self.run.assert_called_once_with("set -o pipefail; cmd")
+
+    def test_mismatch(self):
+        self.run.return_value = "%s  -\n%s  -\n" % (SUM1, SUM2)
+        self.assertRaises(utl.ChecksumImageInvalid, utils.run_verified,
+                          "cmd", "file")
+
+    def test_missing(self):
+        self.run.return_value = "%s  -\n" % SUM1
+        self.assertRaises(utl.ChecksumImageInvalid, utils.run_verified,
+                          "cmd", "file")
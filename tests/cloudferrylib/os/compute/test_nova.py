@@ -158,3 +158,100 @@ class NovaComputeTestCase(test.TestCase):
         self.nova_client.delete_flavor('fake_fl_id')
 
         self.mock_client().flavors.delete.assert_called_once_with('fake_fl_id')
+
+
+class NovaComputePagesTestCase(test.TestCase):
+    def setUp(self):
+        super(NovaComputePagesTestCase, self).setUp()
+        self.mock_client = mock.MagicMock()
+        self.useFixture(mockpatch.PatchObject(nova_client, 'Client',
+                                              new=self.mock_client))
+        config = dict(FAKE_CONFIG, backend='iscsi')
+        self.nova_client = nova_compute.NovaCompute({'cloud': config},
+                                                    mock.Mock())
+        self.servers = [mock.Mock(id='id%d' % i) for i in xrange(5)]
+        # osapi_max_limit of nova
+        self.max_limit = 1000
+
+        def list_servers(detailed, search_opts, marker, limit):
+            ids = [server.id for server in self.servers]
+            start = ids.index(marker) + 1 if marker else 0
+            return self.servers[start:start + min(limit, self.max_limit)]
+
+        self.mock_client().servers.list.side_effect = list_servers
+
+    def test_get_instances_pages(self):
+        pages = self.nova_client.get_instances_pages(page_size=2)
+        self.assertEqual([self.servers[:2], self.servers[2:4],
+                          self.servers[4:]], list(pages))
+        self.assertEqual(4, self.mock_client().servers.list.call_count)
+        self.mock_client().servers.list.assert_called_with(
+            detailed=True, search_opts=None, marker='id4', limit=2)
+
+    def test_pages_cut_by_server(self):
+        self.max_limit = 2
+        pages = self.nova_client.get_instances_pages(page_size=3)
+        self.assertEqual([self.servers[:2], self.servers[2:4],
+                          self.servers[4:]], list(pages))
+
+    def test_pages_are_lazy(self):
+        pages = self.nova_client.get_instances_pages(page_size=2)
+        self.assertEqual(self.servers[:2], next(pages))
+        self.assertEqual(1, self.mock_client().servers.list.call_count)
+
+    def test_get_interfaces_by_instances(self):
+        network = mock.Mock()
+        network.get_ports_by_devices.return_value = {
+            'id0': [{'id': 'port0', 'network_id': 'net0'}]}
+        self.nova_client.cloud.resources = {'network': network}
+        self.assertEqual(
+            {'id0': [{'port_id': 'port0', 'net_id': 'net0',
+                      'fixed_ip': None}]},
+            self.nova_client.get_interfaces_by_instances(self.servers[:2]))
+        network.get_ports_by_devices.assert_called_once_with(['id0', 'id1'])
+
+    def test_get_interfaces_without_neutron(self):
+        self.nova_client.cloud.resources = {}
+        self.assertIsNone(
+            self.nova_client.get_interfaces_by_instances(self.servers))
+
+    def test_read_instances_info_prefetched(self):
+        flavor = mock.Mock(id='flavor0', ephemeral=0)
+        self.mock_client().flavors.list.return_value = [flavor]
+        network = mock.Mock()
+        network.get_ports_by_devices.return_value = {
+            'id0': [{'id': 'port0', 'network_id': 'net0'}]}
+        self.nova_client.cloud.resources = {'network': network}
+        for server in self.servers:
+            server.security_groups = []
+            server.flavor = {'id': 'flavor0'}
+            server.image = {'id': 'image0'}
+        self.useFixture(mockpatch.PatchObject(self.nova_client,
+                                              '_get_file_path', create=True))
+
+        info = dict(self.nova_client.read_instances_info(page_size=5))
+
+        self.assertEqual([{'port_id': 'port0', 'net_id': 'net0',
+                           'fixed_ip': None}],
+                         info['id0']['instance']['interfaces'])
+        self.assertEqual([], info['id1']['instance']['interfaces'])
+        self.assertEqual(1, self.mock_client().flavors.list.call_count)
+        network.get_ports_by_devices.assert_called_once_with(
+            ['id%d' % i for i in xrange(5)])
+        self.assertFalse(self.mock_client().flavors.get.called)
+        self.assertFalse(self.mock_client().servers.interface_list.called)
+
+    def test_read_info_by_instance(self):
+        self.useFixture(mockpatch.PatchObject(
+            self.nova_client, 'make_instance_info',
+            new=lambda instance, flavors, interfaces: (instance.id,
+                                                       {'id': instance.id})))
+        self.useFixture(mockpatch.PatchObject(
+            self.nova_client, 'get_interfaces_by_instances'))
+        infos = self.nova_client.read_info_by_instance(page_size=2)
+        self.assertEqual({'id0': {'id': 'id0'}},
+                         next(infos)['compute']['instances'])
+        self.assertEqual(1, self.mock_client().servers.list.call_count)
+        self.assertEqual(['id%d' % i for i in xrange(1, 5)],
+                         [info['compute']['instances'].keys()[0]
+                          for info in infos])
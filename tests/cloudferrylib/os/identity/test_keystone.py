@@ -27,7 +27,9 @@ FAKE_CONFIG = {'cloud': {'user': 'fake_user',
                          'tenant': 'fake_tenant',
                          'host': '1.1.1.1'},
                'migrate': {'keep_user_passwords': False,
-                           'overwrite_user_passwords': False},
+                           'overwrite_user_passwords': False,
+                           'identity_api_workers': 2,
+                           'identity_api_rate': 0},
                'mail': None}
 
 
@@ -39,7 +41,11 @@ class KeystoneIdentityTestCase(test.TestCase):
                                               new=self.mock_client)
         self.useFixture(self.kc_patch)
         self.fake_cloud = mock.Mock()
-        self.fake_cloud.mysql_connector = mock.Mock()
+        self.mysql_connector = mock.Mock()
+        self.db_connector_cls = mock.Mock(return_value=self.mysql_connector)
+        self.useFixture(mockpatch.PatchObject(
+            keystone.mysql_connector, 'MysqlConnector',
+            new=self.db_connector_cls))
 
         self.keystone_client = keystone.KeystoneIdentity(FAKE_CONFIG, self.fake_cloud)
 
@@ -92,6 +98,17 @@ class KeystoneIdentityTestCase(test.TestCase):
         self.mock_client.assert_has_calls(mock_calls)
         self.assertEqual(self.mock_client(), client)
 
+    def test_get_db_connector(self):
+        self.db_connector_cls.assert_called_once_with({}, 'keystone')
+        mysql = {'connection': 'mysql', 'host': 'cinder_db', 'user': 'root',
+                 'password': 'secret'}
+        config = dict(FAKE_CONFIG, mysql=mysql,
+                      identity={'db_host': 'keystone_db', 'db_user': '',
+                                'db_name': 'identity'})
+        keystone.KeystoneIdentity(config, self.fake_cloud)
+        self.db_connector_cls.assert_called_with(
+            dict(mysql, host='keystone_db'), 'identity')
+
     def test_get_tenants_list(self):
         fake_tenants_list = [self.fake_tenant_0, self.fake_tenant_1]
         self.mock_client().tenants.list.return_value = fake_tenants_list
@@ -271,11 +288,57 @@ class KeystoneIdentityTestCase(test.TestCase):
         self.mock_client().roles.list.return_value = fake_roles_list
         self.mock_client().roles.roles_for_user.return_value = [
             self.fake_role_0]
+        self.mysql_connector.execute.side_effect = Exception()
 
         info = self.keystone_client.read_info()
 
         self.assertEquals(fake_info, info)
 
+    def test_get_user_tenants_roles_from_db(self):
+        self.mock_client().tenants.list.return_value = [self.fake_tenant_0,
+                                                        self.fake_tenant_1]
+        self.mock_client().users.list.return_value = [self.fake_user_0,
+                                                      self.fake_user_1]
+        self.mock_client().roles.list.return_value = [self.fake_role_0,
+                                                      self.fake_role_1]
+        self.mysql_connector.execute.return_value = [
+            ('user_id_0', 'tenant_id_1', self.fake_role_0.id),
+            ('user_id_0', 'tenant_id_1', self.fake_role_1.id),
+            ('user_id_1', 'tenant_id_0', self.fake_role_1.id),
+            ('user_id_1', 'domain_id', self.fake_role_1.id)]
+
+        self.assertEqual(
+            {'user_name_0': {'tenant_name_1': [
+                {'role': {'name': self.fake_role_0.name,
+                          'id': self.fake_role_0.id}},
+                {'role': {'name': self.fake_role_1.name,
+                          'id': self.fake_role_1.id}}]},
+             'user_name_1': {'tenant_name_0': [
+                 {'role': {'name': self.fake_role_1.name,
+                           'id': self.fake_role_1.id}}]}},
+            self.keystone_client._get_user_tenants_roles())
+        self.assertFalse(self.mock_client().roles.roles_for_user.called)
+
+    def test_get_user_tenants_roles_from_api(self):
+        self.mock_client().tenants.list.return_value = [self.fake_tenant_0,
+                                                        self.fake_tenant_1]
+        self.mock_client().users.list.return_value = [self.fake_user_0,
+                                                      self.fake_user_1]
+        self.mock_client().roles.list.return_value = [self.fake_role_0]
+        self.mysql_connector.execute.side_effect = Exception()
+        self.mock_client().roles.roles_for_user.side_effect = (
+            lambda user_id, tenant_id:
+            [self.fake_role_0] if tenant_id == 'tenant_id_0' else [])
+
+        self.assertEqual(
+            {user: {'tenant_name_0': [{'role': {
+                'name': self.fake_role_0.name,
+                'id': self.fake_role_0.id}}]}
+             for user in ('user_name_0', 'user_name_1')},
+            self.keystone_client._get_user_tenants_roles())
+        self.assertEqual(4,
+                         self.mock_client().roles.roles_for_user.call_count)
+
     def test_deploy(self):
         fake_tenants_list = [self.fake_tenant_0, self.fake_tenant_1]
         fake_users_list = [self.fake_user_0, self.fake_user_1]
@@ -307,6 +370,8 @@ class KeystoneIdentityTestCase(test.TestCase):
         self.mock_client().tenants.create = tenant_create
         self.mock_client().users.create = user_create
         self.mock_client().roles.create = roles_create
+        # created before deploy, so API threads don't race creating it
+        add_user_role = self.mock_client().roles.add_user_role
 
         self.keystone_client.deploy(fake_info)
 
@@ -316,8 +381,30 @@ class KeystoneIdentityTestCase(test.TestCase):
                 mock_calls.append(
                     mock.call(user.id, fake_roles_list[0].id, tenant.id))
 
-        self.assertEquals(mock_calls,
-                          self.mock_client().roles.add_user_role.mock_calls)
+        self.assertEquals(
+            sorted(mock_calls),
+            sorted(add_user_role.mock_calls))
+
+    def test_upload_user_tenant_roles(self):
+        self.mock_client().roles.list.return_value = [self.fake_role_0,
+                                                      self.fake_role_1]
+        self.mysql_connector.execute.return_value = [
+            ('new_user_0', 'new_tenant_0', self.fake_role_0.id)]
+        users = [{'user': {'name': 'user_name_0'},
+                  'meta': {'new_id': 'new_user_0'}}]
+        tenants = [{'tenant': {'name': 'tenant_name_%d' % i},
+                    'meta': {'new_id': 'new_tenant_%d' % i}}
+                   for i in range(2)]
+        role = {'role': {'name': self.fake_role_0.name}}
+
+        self.keystone_client._upload_user_tenant_roles(
+            {'user_name_0': {'tenant_name_0': [role],
+                             'tenant_name_1': [role]}}, users, tenants)
+
+        self.assertEqual(
+            [mock.call('new_user_0', self.fake_role_0.id, 'new_tenant_1')],
+            self.mock_client().roles.add_user_role.mock_calls)
+        self.assertFalse(self.mock_client().roles.roles_for_user.called)
 
     @staticmethod
     def _get_fake_info(fake_tenants_list, fake_users_list, fake_roles_list):
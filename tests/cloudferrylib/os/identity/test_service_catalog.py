@@ -0,0 +1,79 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from oslotest import mockpatch
+
+from cloudferrylib.os.identity import service_catalog
+from tests import test
+
+
+class ServiceCatalogTestCase(test.TestCase):
+    def setUp(self):
+        super(ServiceCatalogTestCase, self).setUp()
+        self.useFixture(mockpatch.PatchObject(service_catalog, '_catalogs',
+                                              new={}))
+        self.client = mock.Mock(auth_token='token')
+        glance = mock.Mock(id='glance_id', type='image')
+        glance.name = 'glance'
+        self.client.services.list.return_value = [glance]
+        self.client.endpoints.list.return_value = [
+            mock.Mock(service_id='glance_id', publicurl='http://glance',
+                      region='RegionOne')]
+        self.catalog = service_catalog.get_catalog(self.client)
+
+    def test_lookup(self):
+        self.assertEqual('glance',
+                         self.catalog.get_service_by_type('image').name)
+        self.assertEqual('http://glance',
+                         self.catalog.get_endpoint_by_name('glance'))
+        self.assertIsNone(self.catalog.get_endpoint_by_name('swift'))
+        self.assertEqual(1, self.client.services.list.call_count)
+        self.assertEqual(1, self.client.endpoints.list.call_count)
+
+    def test_shared_by_client(self):
+        self.assertIs(self.catalog, service_catalog.get_catalog(self.client))
+
+    def test_shared_by_cloud(self):
+        catalog = service_catalog.get_catalog(self.client, 'http://keystone/')
+        catalog.get_service_by_name('glance')
+        other = mock.Mock(auth_token='other_token')
+        self.assertIs(catalog, service_catalog.get_catalog(
+            other, 'http://keystone'))
+        catalog.get_service_by_name('glance')
+        self.assertEqual(1, self.client.services.list.call_count)
+        self.assertFalse(other.services.list.called)
+        self.assertIsNot(catalog, service_catalog.get_catalog(
+            other, 'http://keystone/', 'RegionTwo'))
+
+    def test_region(self):
+        catalog = service_catalog.get_catalog(self.client, 'http://keystone/',
+                                              'RegionTwo')
+        self.assertIsNone(catalog.get_endpoint_by_name('glance'))
+
+    def test_endpoint_by_type(self):
+        self.client.endpoints.list.return_value = [
+            mock.Mock(service_id='glance_id',
+                      publicurl='http://glance/$(tenant_id)s')]
+        self.assertEqual('http://glance/tenant_id',
+                         self.catalog.get_endpoint_by_type(
+                             'image', tenant_id='tenant_id'))
+        self.assertIsNone(self.catalog.get_endpoint_by_type('volume'))
+
+    def test_refresh_on_new_token(self):
+        self.catalog.get_service_by_name('glance')
+        self.client.auth_token = 'new_token'
+        self.catalog.get_service_by_name('glance')
+        self.assertEqual(2, self.client.services.list.call_count)
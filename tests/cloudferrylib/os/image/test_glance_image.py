@@ -15,6 +15,7 @@
 import copy
 import mock
 
+from glanceclient import exc as glance_exc
 from glanceclient.v1 import client as glance_client
 from oslotest import mockpatch
 
@@ -29,7 +30,9 @@ FAKE_CONFIG = utils.ext_dict(cloud=utils.ext_dict({'user': 'fake_user',
                                                    'tenant': 'fake_tenant',
                                                    'host': '1.1.1.1',
                                                    }),
-                             migrate=utils.ext_dict({'speed_limit': '10MB'}))
+                             migrate=utils.ext_dict({'speed_limit': '10MB',
+                                                     'image_copy_streams': 2,
+                                                     'image_staging': ''}))
 
 
 class GlanceImageTestCase(test.TestCase):
@@ -120,11 +123,18 @@ class GlanceImageTestCase(test.TestCase):
             fake_image_id)
 
     def test_get_image_by_id(self):
-        fake_images = [self.fake_image_1, self.fake_image_2]
-        self.glance_mock_client().images.list.return_value = fake_images
+        self.glance_mock_client().images.get.return_value = self.fake_image_1
 
         self.assertEquals(self.fake_image_1,
                           self.glance_image.get_image_by_id('fake_image_id_1'))
+        self.glance_mock_client().images.get.assert_called_once_with(
+            'fake_image_id_1')
+
+    def test_get_image_by_id_not_found(self):
+        self.glance_mock_client().images.get.side_effect = (
+            glance_exc.HTTPNotFound())
+
+        self.assertIsNone(self.glance_image.get_image_by_id('fake_image_id'))
 
     def test_get_image_by_name(self):
         fake_images = [self.fake_image_1, self.fake_image_2]
@@ -144,10 +154,43 @@ class GlanceImageTestCase(test.TestCase):
         self.assertEquals(self.fake_image_2,
                           self.glance_image.get_image('fake_image_name_2'))
 
-    def test_get_image_status(self):
+    def test_get_image_by_checksum(self):
         fake_images = [self.fake_image_1, self.fake_image_2]
         self.glance_mock_client().images.list.return_value = fake_images
 
+        self.assertEquals(
+            self.fake_image_1,
+            self.glance_image.get_image_by_checksum('fake_shecksum_1'))
+
+    def test_index_lists_once(self):
+        fake_images = [self.fake_image_1, self.fake_image_2]
+        self.glance_mock_client().images.list.return_value = fake_images
+
+        info = self.glance_image.read_info(
+            images_list=['fake_image_name_1', 'fake_image_id_1',
+                         'fake_image_name_2'])
+
+        self.assertEqual(set(['fake_image_id_1', self.fake_image_2.id]),
+                         set(info['image']['images']))
+        self.glance_mock_client().images.list.assert_called_once_with()
+
+    def test_index_create_delete(self):
+        self.glance_mock_client().images.list.return_value = [
+            self.fake_image_2]
+        self.glance_mock_client().images.create.return_value = (
+            self.fake_image_1)
+
+        self.assertIsNone(self.glance_image.get_image('fake_image_name_1'))
+        self.glance_image.create_image(name='fake_image_name_1')
+        self.assertEquals(self.fake_image_1,
+                          self.glance_image.get_image('fake_image_name_1'))
+        self.glance_image.delete_image('fake_image_id_1')
+        self.assertIsNone(self.glance_image.get_image('fake_image_id_1'))
+        self.glance_mock_client().images.list.assert_called_once_with()
+
+    def test_get_image_status(self):
+        self.glance_mock_client().images.get.return_value = self.fake_image_1
+
         self.assertEquals(self.fake_image_1.status,
                           self.glance_image.get_image_status(
                               'fake_image_id_1'))
@@ -160,8 +203,7 @@ class GlanceImageTestCase(test.TestCase):
                           self.glance_image.get_ref_image('fake_image_id_1'))
 
     def test_get_image_checksum(self):
-        fake_images = [self.fake_image_1, self.fake_image_2]
-        self.glance_mock_client().images.list.return_value = fake_images
+        self.glance_mock_client().images.get.return_value = self.fake_image_1
 
         self.assertEquals(self.fake_image_1.checksum,
                           self.glance_image.get_image_checksum(
@@ -180,8 +222,7 @@ class GlanceImageTestCase(test.TestCase):
         self.assertEqual(self.fake_input_info, info)
 
     def test_read_info_id(self):
-        fake_images = [self.fake_image_1, self.fake_image_2]
-        self.glance_mock_client().images.list.return_value = fake_images
+        self.glance_mock_client().images.get.return_value = self.fake_image_1
 
         info = self.glance_image.read_info(image_id='fake_image_id_1')
         self.assertEqual(self.fake_result_info, info)
@@ -213,11 +254,8 @@ class GlanceImageTestCase(test.TestCase):
         self.glance_mock_client().images.create.return_value = (
             self.fake_image_1)
 
-        fake_images1 = [self.fake_image_2, mock.Mock()]
-        fake_images2 = [self.fake_image_1, self.fake_image_2]
-
-        self.glance_mock_client().images.list.side_effect = (fake_images1,
-                                                             fake_images2)
+        self.glance_mock_client().images.list.return_value = [
+            self.fake_image_2, mock.Mock()]
 
         new_info = self.glance_image.deploy(info)
 
@@ -225,4 +263,40 @@ class GlanceImageTestCase(test.TestCase):
         mock_proxy.assert_called_once_with(
             info['image']['images']['fake_image_id_1']['image'],
             FileLikeProxy.callback_print_progress,
-            '10MB')
+            '10MB',
+            limiter=mock.ANY)
+
+    @mock.patch('migrationlib.os.utils.FileLikeProxy.FileLikeProxy')
+    def test_deploy_lists_once(self, mock_proxy):
+        info = {'image': {'resource': mock.Mock(), 'images': {}}}
+        for i in range(10):
+            image_info = copy.deepcopy(
+                self.fake_result_info['image']['images']['fake_image_id_1'])
+            image_info['image'].update(id='id%d' % i,
+                                       checksum='sum%d' % (i % 5))
+            info['image']['images']['id%d' % i] = image_info
+        self.fake_image_2.checksum = 'sum0'
+        self.glance_mock_client().images.list.return_value = [
+            self.fake_image_2]
+
+        # uploaded data is source image info
+        mock_proxy.side_effect = lambda image, *args, **kwargs: image
+
+        def create(**kwargs):
+            checksum = kwargs['data']['checksum']
+            new_image = mock.Mock(id='new_' + checksum, checksum=checksum)
+            new_image.name = kwargs['name']
+            return new_image
+        self.glance_mock_client().images.create.side_effect = create
+        new_info = self.glance_image.deploy(info)
+
+        # sum0 exists on destination, others are uploaded once
+        self.assertEqual(4, self.glance_mock_client().images.create.call_count)
+        # every image is created from its own data whatever upload finishes
+        # first
+        self.assertEqual(
+            set('sum%d' % i for i in range(1, 5)),
+            set(call[1]['data']['checksum'] for call in
+                self.glance_mock_client().images.create.call_args_list))
+        self.assertEqual(4, len(new_info['image']['images']))
+        self.glance_mock_client().images.list.assert_called_once_with()
@@ -135,6 +135,21 @@ class NeutronTestCase(test.TestCase):
         )
         self.assertEqual(self.neutron_mock_client(), client)
 
+    def test_get_ports_by_devices(self):
+        port_1 = {'id': 'fake_port_id_1', 'device_id': 'fake_vm_id_1'}
+        port_2 = {'id': 'fake_port_id_2', 'device_id': 'fake_vm_id_1'}
+        port_3 = {'id': 'fake_port_id_3', 'device_id': 'fake_vm_id_3'}
+        self.neutron_mock_client().list_ports.side_effect = [
+            {'ports': [port_1, port_2]}, {'ports': [port_3]}]
+
+        ports = self.neutron_network_client.get_ports_by_devices(
+            ['fake_vm_id_1', 'fake_vm_id_2', 'fake_vm_id_3'], chunk_size=2)
+
+        self.assertEqual({'fake_vm_id_1': [port_1, port_2],
+                          'fake_vm_id_3': [port_3]}, ports)
+        self.neutron_mock_client().list_ports.assert_called_with(
+            device_id=['fake_vm_id_3'])
+
     def test_get_networks(self):
 
         fake_networks_list = {'networks': [{'status': 'ACTIVE',
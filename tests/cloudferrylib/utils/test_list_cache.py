@@ -0,0 +1,99 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from oslotest import mockpatch
+
+from cloudferrylib.utils import list_cache
+from tests import test
+
+
+class FlavorManager(object):
+    def __init__(self):
+        self.list = mock.Mock(side_effect=lambda **kwargs: iter(['flavor']))
+
+
+class ImageManager(FlavorManager):
+    pass
+
+
+FLAVORS = '%s.FlavorManager' % __name__
+
+
+class ListCacheTestCase(test.TestCase):
+    def setUp(self):
+        super(ListCacheTestCase, self).setUp()
+        self.time = mock.Mock(return_value=1000)
+        self.useFixture(mockpatch.PatchObject(list_cache.time, 'time',
+                                              new=self.time))
+        self.cache = list_cache.ListCache(ttl=60)
+        self.manager = FlavorManager()
+
+    def test_hit(self):
+        self.assertEqual(['flavor'], self.cache.list(self.manager))
+        self.assertEqual(['flavor'], self.cache.list(self.manager))
+        self.manager.list.assert_called_once_with()
+        self.assertEqual({FLAVORS: {'hits': 1, 'misses': 1,
+                                    'invalidations': 0}},
+                         self.cache.summary())
+
+    def test_arguments(self):
+        self.cache.list(self.manager, is_public=None)
+        self.cache.list(self.manager)
+        self.cache.list(self.manager, is_public=None)
+        self.assertEqual([mock.call(is_public=None), mock.call()],
+                         self.manager.list.mock_calls)
+
+    def test_copy(self):
+        self.cache.list(self.manager).append('other')
+        self.assertEqual(['flavor'], self.cache.list(self.manager))
+
+    def test_ttl(self):
+        self.cache.list(self.manager)
+        self.time.return_value = 1061
+        self.cache.list(self.manager)
+        self.assertEqual(2, self.manager.list.call_count)
+
+    def test_invalidate(self):
+        other_client = FlavorManager()
+        other_type = ImageManager()
+        self.cache.list(self.manager)
+        self.cache.list(other_client)
+        self.cache.list(other_type)
+        self.cache.invalidate(self.manager)
+        self.cache.list(self.manager)
+        self.cache.list(other_client)
+        self.cache.list(other_type)
+        self.assertEqual(2, self.manager.list.call_count)
+        self.assertEqual(2, other_client.list.call_count)
+        self.assertEqual(1, other_type.list.call_count)
+        self.assertEqual(1, self.cache.summary()[FLAVORS]['invalidations'])
+
+    def test_same_class_name(self):
+        # e.g. ImageManager of novaclient and glanceclient
+        other_module = type('FlavorManager', (FlavorManager,),
+                            {'__module__': 'otherclient.v1.flavors'})()
+        self.cache.list(self.manager)
+        self.cache.list(other_module)
+        self.cache.invalidate(self.manager)
+        self.cache.list(other_module)
+        self.assertEqual(1, other_module.list.call_count)
+
+    def test_not_initialized(self):
+        self.useFixture(mockpatch.PatchObject(list_cache, 'CACHE', new=None))
+        list_cache.cached_list(self.manager)
+        list_cache.cached_list(self.manager)
+        self.assertEqual(2, self.manager.list.call_count)
+        self.assertEqual({}, list_cache.stats())
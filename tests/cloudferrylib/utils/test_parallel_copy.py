@@ -0,0 +1,90 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+import mock
+from oslotest import mockpatch
+
+from cloudferrylib.utils import parallel_copy
+from cloudferrylib.utils import rate_limit
+from tests import test
+
+
+class ParallelCopyTestCase(test.TestCase):
+    def test_largest_first(self):
+        copied = []
+
+        def copy(name):
+            return lambda limiter: copied.append(name) or name.upper()
+
+        jobs = [parallel_copy.CopyJob(name, size, copy(name))
+                for name, size in (('small', 1), ('big', 100),
+                                   ('medium', 10))]
+        results = parallel_copy.ParallelCopy(streams=1).run(jobs)
+
+        self.assertEqual(['big', 'medium', 'small'], copied)
+        self.assertEqual(['SMALL', 'BIG', 'MEDIUM'], results)
+
+    def test_streams(self):
+        started = []
+        both_started = threading.Event()
+
+        def copy(limiter):
+            # both jobs must be running at once
+            started.append(limiter)
+            if len(started) == 2:
+                both_started.set()
+            return both_started.wait(5), limiter
+
+        copier = parallel_copy.ParallelCopy(streams=2, speed_limit=1024)
+        results = copier.run([parallel_copy.CopyJob(str(i), 1, copy)
+                              for i in range(2)])
+
+        self.assertEqual([True, True], [ok for ok, _ in results])
+        self.assertIs(results[0][1], results[1][1])
+        self.assertEqual(1024, results[0][1].rate)
+
+    def test_error(self):
+        copied = []
+
+        def fail(limiter):
+            raise RuntimeError()
+
+        jobs = [parallel_copy.CopyJob('fail', 2, fail),
+                parallel_copy.CopyJob('ok', 1,
+                                      lambda limiter: copied.append('ok'))]
+
+        self.assertRaises(RuntimeError,
+                          parallel_copy.ParallelCopy(streams=1).run, jobs)
+        self.assertEqual(['ok'], copied)
+
+    def test_shared_budget(self):
+        sleep = mock.Mock()
+        self.useFixture(mockpatch.PatchObject(
+            rate_limit.time, 'time', new=mock.Mock(return_value=100.0)))
+        self.useFixture(mockpatch.PatchObject(rate_limit.time, 'sleep',
+                                              new=sleep))
+
+        def copy(limiter):
+            limiter.consume(1024)
+
+        copier = parallel_copy.ParallelCopy(streams=2, speed_limit=1024)
+        copier.run([parallel_copy.CopyJob(str(i), 1, copy)
+                    for i in range(3)])
+
+        # the first KB is the burst, the others wait for 1KB and 2KB of debt
+        # whichever stream takes tokens
+        self.assertEqual(3.0, sum(call[1][0] for call in sleep.mock_calls))
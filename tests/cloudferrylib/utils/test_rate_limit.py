@@ -0,0 +1,59 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from oslotest import mockpatch
+
+from cloudferrylib.utils import rate_limit
+from tests import test
+
+
+class TokenBucketTestCase(test.TestCase):
+    def setUp(self):
+        super(TokenBucketTestCase, self).setUp()
+        self.time = mock.Mock(return_value=100.0)
+        self.sleep = mock.Mock()
+        self.useFixture(mockpatch.PatchObject(rate_limit.time, 'time',
+                                              new=self.time))
+        self.useFixture(mockpatch.PatchObject(rate_limit.time, 'sleep',
+                                              new=self.sleep))
+
+    def test_shared_budget(self):
+        limiter = rate_limit.TokenBucket(1024)
+        limiter.consume(1024)
+        limiter.consume(2048)
+        limiter.consume(1024)
+        self.assertEqual([mock.call(2.0), mock.call(3.0)],
+                         self.sleep.mock_calls)
+
+    def test_refill(self):
+        limiter = rate_limit.TokenBucket(1024)
+        limiter.consume(1024)
+        self.time.return_value = 100.5
+        limiter.consume(1024)
+        self.time.return_value = 110.0
+        # bucket doesn't grow over capacity while idle
+        limiter.consume(2048)
+        self.assertEqual([mock.call(0.5), mock.call(1.0)],
+                         self.sleep.mock_calls)
+
+    def test_unlimited(self):
+        rate_limit.TokenBucket(0).consume(1024)
+        self.assertFalse(self.sleep.called)
+
+    def test_parse_speed_limit(self):
+        self.assertEqual(10 * 1024 * 1024,
+                         rate_limit.parse_speed_limit('10MB'))
+        self.assertEqual(0, rate_limit.parse_speed_limit('-'))
@@ -0,0 +1,107 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import StringIO
+
+import fixtures
+
+from cloudferrylib.utils import resumable_transfer
+from tests import test
+
+DATA = ''.join(chr(i % 256) for i in range(100))
+
+
+class FailingStream(object):
+    """Stream of DATA from offset, fails after `fail_at` bytes."""
+
+    def __init__(self, offset, fail_at=None):
+        self.stream = StringIO.StringIO(DATA[offset:])
+        self.left = fail_at
+
+    def read(self, size):
+        if self.left is not None:
+            if self.left <= 0:
+                raise IOError("connection reset")
+            size = min(size, self.left)
+            self.left -= size
+        return self.stream.read(size)
+
+
+class ChunkSpoolTestCase(test.TestCase):
+    def setUp(self):
+        super(ChunkSpoolTestCase, self).setUp()
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'image')
+        self.offsets = []
+
+    def spool(self):
+        return resumable_transfer.ChunkSpool(self.path, 'checksum',
+                                             chunk_size=30)
+
+    def open_stream(self, fail_at=None):
+        def open_stream(offset):
+            self.offsets.append(offset)
+            return FailingStream(offset, fail_at if len(self.offsets) == 1
+                                 else None)
+        return open_stream
+
+    def read_all(self, spool):
+        reader = spool.reader()
+        data = ''
+        while True:
+            chunk = reader.read(7)
+            if not chunk:
+                return data
+            data += chunk
+
+    def test_resume_after_error(self):
+        spool = self.spool()
+        spool.download(self.open_stream(fail_at=70))
+
+        # the first two chunks are kept, the third one is downloaded again
+        self.assertEqual([0, 60], self.offsets)
+        self.assertEqual(DATA, self.read_all(spool))
+
+    def test_resume_next_run(self):
+        self.assertRaises(IOError, self.spool().download,
+                          self.open_stream(fail_at=40), retries=0)
+
+        spool = self.spool()
+        self.assertEqual(30, spool.offset())
+        spool.download(self.open_stream())
+        self.assertEqual([0, 30], self.offsets)
+        self.assertEqual(DATA, self.read_all(spool))
+
+    def test_complete_spool_reused(self):
+        self.spool().download(self.open_stream())
+        self.spool().download(self.open_stream())
+        self.assertEqual([0], self.offsets)
+
+    def test_other_source(self):
+        self.spool().download(self.open_stream())
+        spool = resumable_transfer.ChunkSpool(self.path, 'other',
+                                              chunk_size=30)
+        self.assertEqual(0, spool.offset())
+        self.assertFalse(spool.complete)
+
+    def test_corrupted_chunk(self):
+        spool = self.spool()
+        spool.download(self.open_stream())
+        with open(spool.chunk_path(1), 'r+b') as chunk_file:
+            chunk_file.write('x')
+
+        self.assertRaises(resumable_transfer.ChecksumError,
+                          self.read_all, spool)
@@ -0,0 +1,128 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+
+import mock
+
+from cloudferrylib.utils import status_poller
+from tests import test
+
+
+class StatusPollerTestCase(test.TestCase):
+    def setUp(self):
+        super(StatusPollerTestCase, self).setUp()
+        self.statuses = {}
+        self.requests = []
+        self.poller = status_poller.StatusPoller(self.list_statuses,
+                                                 interval=0.01,
+                                                 max_interval=0.04)
+
+    def list_statuses(self, ids):
+        self.requests.append(set(ids))
+        statuses = dict((id_res, self.statuses[id_res].pop(0))
+                        for id_res in ids)
+        for id_res in ids:
+            if not self.statuses[id_res]:
+                self.statuses[id_res].append(statuses[id_res])
+        return statuses
+
+    def test_batch(self):
+        self.statuses = {'vol1': ['creating', 'available'],
+                         'vol2': ['creating', 'creating', 'available']}
+        self.poller.wait_for_statuses(['vol1', 'vol2'], 'available')
+        self.assertEqual(set(['vol1', 'vol2']), self.requests[0])
+        self.assertEqual(set(['vol2']), self.requests[-1])
+        self.assertEqual(3, len(self.requests))
+
+    def test_error_status(self):
+        self.statuses = {'vol1': ['creating', 'error']}
+        self.assertRaises(status_poller.StatusError,
+                          self.poller.wait_for_status, 'vol1', 'available')
+
+    def test_timeout(self):
+        self.statuses = {'vol1': ['creating']}
+        self.assertRaises(status_poller.StatusTimeout,
+                          self.poller.wait_for_status, 'vol1', 'available',
+                          timeout=0.05)
+
+    def test_default_timeout(self):
+        self.statuses = {'vol1': ['creating']}
+        self.addCleanup(status_poller.init_poller)
+        status_poller.init_poller(0.05)
+        self.assertRaises(status_poller.StatusTimeout,
+                          self.poller.wait_for_status, 'vol1', 'available')
+
+    def test_get_poller_by_list_kwargs(self):
+        manager = mock.Mock()
+        poller = status_poller.get_poller(manager,
+                                          search_opts={'all_tenants': 1})
+        self.assertIs(poller, status_poller.get_poller(
+            manager, search_opts={'all_tenants': 1}))
+        self.assertIsNot(poller, status_poller.get_poller(manager))
+
+    def test_get_poller_after_fork(self):
+        manager = mock.Mock()
+        poller = status_poller.get_poller(manager)
+        pid = os.fork()
+        if not pid:
+            # child exits with 0 only if it gets its own poller
+            os._exit(int(status_poller.get_poller(manager) is poller))
+        self.assertEqual(0, os.waitpid(pid, 0)[1])
+        self.assertIs(poller, status_poller.get_poller(manager))
+
+    def test_callback(self):
+        self.statuses = {'vol1': ['available']}
+        callback = mock.Mock()
+        waiter = self.poller.watch('vol1', 'available', callback)
+        waiter.wait()
+        callback.assert_called_once_with(waiter)
+
+    def test_manager_statuses(self):
+        manager = mock.Mock()
+        manager.get.return_value.status = 'available'
+        manager.list.return_value = [mock.Mock(id='vol1', status='creating'),
+                                     mock.Mock(id='vol3', status='creating')]
+        statuses = status_poller.manager_statuses(manager, list_threshold=1,
+                                                  search_opts={})
+        self.assertEqual({'vol1': 'available'}, statuses(set(['vol1'])))
+        manager.get.reset_mock()
+        self.assertEqual({'vol1': 'creating', 'vol2': 'available'},
+                         statuses(set(['vol1', 'vol2'])))
+        manager.list.assert_called_once_with(search_opts={})
+        manager.get.assert_called_once_with('vol2')
+
+    def test_manager_statuses_by_get(self):
+        manager = mock.Mock()
+        manager.get.return_value.status = 'available'
+        statuses = status_poller.manager_statuses(manager)
+        self.assertEqual({'vol1': 'available', 'vol2': 'available'},
+                         statuses(set(['vol1', 'vol2'])))
+        self.assertFalse(manager.list.called)
+
+    def test_failure_of_one_object(self):
+        manager = mock.Mock()
+
+        def get(id_res):
+            if id_res == 'vol2':
+                raise ValueError('not found')
+            return mock.Mock(status='available')
+
+        manager.get.side_effect = get
+        poller = status_poller.StatusPoller(
+            status_poller.manager_statuses(manager), interval=0.01)
+        waiters = poller.watch_all(['vol1', 'vol2'], 'available')
+        waiters[0].wait()
+        self.assertRaises(ValueError, waiters[1].wait)
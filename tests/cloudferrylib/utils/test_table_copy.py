@@ -0,0 +1,86 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from cloudferrylib.utils import table_copy
+from tests import test
+
+COLUMNS = ['id', 'project_id', 'status', 'instance_uuid']
+ROWS = [(1, 'tenant1', 'in-use', 'vm1'),
+        (2, 'tenant2', 'available', None),
+        (3, 'other', 'in-use', 'vm2')]
+
+
+class FakeResult(list):
+    def keys(self):
+        return COLUMNS
+
+
+class FakeSource(object):
+    def __init__(self, rows):
+        self.rows = rows
+        self.commands = []
+
+    def execute(self, command, last=None):
+        self.commands.append((command, last))
+        limit = int(command.rsplit(' ', 1)[1])
+        return FakeResult([row for row in self.rows
+                           if last is None or row[0] > last][:limit])
+
+
+class FakeDestination(object):
+    def __init__(self):
+        self.inserted = []
+
+    def execute_many(self, command, rows, chunk_size):
+        self.command = command
+        self.inserted.extend(rows)
+
+
+class TableCopyTestCase(test.TestCase):
+    def setUp(self):
+        super(TableCopyTestCase, self).setUp()
+        self.src = FakeSource(ROWS)
+        self.dst = FakeDestination()
+
+    def test_copy(self):
+        copier = table_copy.TableCopy(
+            self.src, self.dst, 'volumes', chunk_size=2,
+            mappings={'project_id': {'tenant1': 'new1', 'tenant2': 'new2'},
+                      'status': {'in-use': 'available'}},
+            values={'instance_uuid': None})
+
+        self.assertEqual(3, copier.run())
+        self.assertEqual(
+            "INSERT INTO `volumes` (`id`, `project_id`, `status`, "
+            "`instance_uuid`) VALUES (:id, :project_id, :status, "
+            ":instance_uuid)", self.dst.command)
+        self.assertEqual(
+            [{'id': 1, 'project_id': 'new1', 'status': 'available',
+              'instance_uuid': None},
+             {'id': 2, 'project_id': 'new2', 'status': 'available',
+              'instance_uuid': None},
+             {'id': 3, 'project_id': 'other', 'status': 'available',
+              'instance_uuid': None}],
+            self.dst.inserted)
+        self.assertEqual([None, 2], [last for _, last in self.src.commands])
+
+    def test_empty(self):
+        self.dst.execute_many = mock.Mock()
+        copier = table_copy.TableCopy(FakeSource([]), self.dst, 'volumes')
+
+        self.assertEqual(0, copier.run())
+        self.assertFalse(self.dst.execute_many.called)
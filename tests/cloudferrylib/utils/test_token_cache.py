@@ -0,0 +1,138 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+import os
+
+import fixtures
+import mock
+from keystoneclient import access
+from oslotest import mockpatch
+
+from cloudferrylib.os.identity import service_catalog
+from cloudferrylib.utils import token_cache
+from tests import test
+
+AUTH_URL = 'http://1.1.1.1:35357/v2.0/'
+
+
+def make_auth_ref(token_id, lifetime):
+    expires = datetime.datetime.utcnow() + datetime.timedelta(
+        seconds=lifetime)
+    return access.AccessInfo.factory(body={'access': {
+        'token': {'id': token_id,
+                  'expires': expires.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                  'tenant': {'id': 'tenant_id'}},
+        'user': {'id': 'user_id'},
+        'serviceCatalog': [{'type': 'compute',
+                            'endpoints': [{'publicURL': 'http://nova/'}]}]}})
+
+
+class TokenCacheTestCase(test.TestCase):
+    def setUp(self):
+        super(TokenCacheTestCase, self).setUp()
+        self.authenticate = mock.Mock(
+            side_effect=lambda *args: make_auth_ref('token%d' % len(
+                self.authenticate.mock_calls), 3600))
+        self.useFixture(mockpatch.PatchObject(token_cache, 'authenticate',
+                                              new=self.authenticate))
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'tokens')
+        self.cache = token_cache.TokenCache(self.path)
+        self.useFixture(mockpatch.PatchObject(service_catalog, '_catalogs',
+                                              new={}))
+        self.catalog_client = mock.Mock()
+        self.catalog_client.services.list.return_value = []
+        self.catalog_client.endpoints.list.return_value = []
+        self.useFixture(mockpatch.PatchObject(
+            token_cache, 'catalog_client',
+            new=mock.Mock(return_value=self.catalog_client)))
+
+    def test_shared_token(self):
+        first = self.cache.get_auth_ref('admin', 'pass', 'admin', AUTH_URL)
+        second = self.cache.get_auth_ref('admin', 'pass', 'admin', AUTH_URL)
+        self.assertEqual('token1', first.auth_token)
+        self.assertIs(first, second)
+        other = self.cache.get_auth_ref('admin', 'pass', 'demo', AUTH_URL)
+        self.assertEqual('token2', other.auth_token)
+
+    def test_expired_token(self):
+        key = self.cache.key('admin', 'admin', AUTH_URL)
+        self.cache.auth_refs[key] = make_auth_ref('old', 60)
+        auth_ref = self.cache.get_auth_ref('admin', 'pass', 'admin', AUTH_URL)
+        self.assertEqual('token1', auth_ref.auth_token)
+
+    def test_token_only_client(self):
+        key = self.cache.key('admin', 'admin', AUTH_URL)
+        self.cache.auth_refs[key] = make_auth_ref('old', 1000)
+        self.assertEqual('old', self.cache.get_auth_ref(
+            'admin', 'pass', 'admin', AUTH_URL).auth_token)
+        # client without password needs token valid for most of its run
+        self.assertEqual('token1', self.cache.get_auth_ref(
+            'admin', 'pass', 'admin', AUTH_URL, token_only=True).auth_token)
+        self.assertEqual('token1', self.cache.get_auth_ref(
+            'admin', 'pass', 'admin', AUTH_URL, token_only=True).auth_token)
+
+    def test_persistence(self):
+        self.cache.get_auth_ref('admin', 'pass', 'admin', AUTH_URL)
+        self.assertEqual(0600, os.stat(self.path).st_mode & 0777)
+        cache = token_cache.TokenCache(self.path)
+        self.assertEqual(('token1', 'http://nova/'),
+                         cache.get_token_and_endpoint('admin', 'pass',
+                                                      'admin', AUTH_URL,
+                                                      'compute'))
+        self.assertEqual(1, self.authenticate.call_count)
+
+    def test_concurrent_workers(self):
+        other = token_cache.TokenCache(self.path)
+
+        def authenticate(user, password, tenant, url):
+            if tenant == 'demo':
+                # other worker saves its token while we authenticate
+                other.get_auth_ref('admin', 'pass', 'admin', AUTH_URL)
+            return make_auth_ref(tenant, 3600)
+
+        self.authenticate.side_effect = authenticate
+        self.cache.get_auth_ref('admin', 'pass', 'demo', AUTH_URL)
+        cache = token_cache.TokenCache(self.path)
+        cache.load()
+        self.assertEqual(['admin', 'demo'],
+                         sorted(auth_ref.auth_token
+                                for auth_ref in cache.auth_refs.values()))
+
+    def test_unknown_service(self):
+        self.assertEqual(('token1', None),
+                         self.cache.get_token_and_endpoint('admin', 'pass',
+                                                           'admin', AUTH_URL,
+                                                           'volume'))
+
+    def test_shared_catalog(self):
+        cinder = mock.Mock(id='cinder_id', type='volume')
+        self.catalog_client.services.list.return_value = [cinder]
+        self.catalog_client.endpoints.list.return_value = [
+            mock.Mock(service_id='cinder_id',
+                      publicurl='http://cinder/$(tenant_id)s')]
+        self.assertEqual(('token1', 'http://cinder/tenant_id'),
+                         self.cache.get_token_and_endpoint('admin', 'pass',
+                                                           'admin', AUTH_URL,
+                                                           'volume'))
+        self.cache.get_token_and_endpoint('admin', 'pass', 'demo', AUTH_URL,
+                                          'volume')
+        self.assertEqual(1, self.catalog_client.services.list.call_count)
+
+    def test_no_cache(self):
+        self.assertEqual((None, None),
+                         token_cache.get_token_and_endpoint(
+                             'admin', 'pass', 'admin', AUTH_URL, 'compute'))
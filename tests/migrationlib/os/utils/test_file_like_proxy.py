@@ -0,0 +1,88 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import hashlib
+import StringIO
+
+import mock
+
+from migrationlib.os.utils import FileLikeProxy
+from tests import test
+from utils import ChecksumImageInvalid
+
+
+class RingBufferTestCase(test.TestCase):
+    def test_wrap(self):
+        buf = FileLikeProxy.RingBuffer(8)
+        self.assertEqual(6, buf.write('abcdef'))
+        self.assertEqual('abcd', buf.read(4))
+        self.assertEqual(6, buf.write('ghijklmn'))
+        self.assertEqual(0, buf.free())
+        self.assertEqual('efghijkl', buf.read(10))
+        self.assertEqual(0, buf.size)
+
+    def test_empty_restarts(self):
+        buf = FileLikeProxy.RingBuffer(8)
+        buf.write('abc')
+        buf.read(3)
+        self.assertEqual(0, buf.start)
+        self.assertEqual(8, buf.write('abcdefgh'))
+
+
+class FileLikeProxyTestCase(test.TestCase):
+    def setUp(self):
+        super(FileLikeProxyTestCase, self).setUp()
+        self.resp = mock.Mock(length=10)
+        stream = StringIO.StringIO('abcdefghij')
+        # response returns at most 4 bytes at once
+        self.resp.read.side_effect = lambda size: stream.read(min(size, 4))
+        source = mock.Mock()
+        source.get_ref_image.return_value = self.resp
+        self.transfer_object = {'resource_src': source, 'id': 'id',
+                                'name': 'name', 'size': 10}
+        self.limiter = mock.Mock(rate=1024)
+
+    def test_limited_read(self):
+        proxy = FileLikeProxy.FileLikeProxy(self.transfer_object, mock.Mock(),
+                                            limiter=self.limiter)
+        self.assertEqual('abcdef', proxy.read(6))
+        self.assertEqual('ghij', proxy.read(6))
+        self.assertEqual('', proxy.read(6))
+        self.assertEqual([mock.call(6), mock.call(4), mock.call(0)],
+                         self.limiter.consume.mock_calls)
+
+    def read_all(self, proxy):
+        data = ''
+        while True:
+            chunk = proxy.read(6)
+            if not chunk:
+                return data
+            data += chunk
+
+    def test_checksum(self):
+        self.transfer_object['checksum'] = hashlib.md5(
+            'abcdefghij').hexdigest()
+        proxy = FileLikeProxy.FileLikeProxy(self.transfer_object, mock.Mock(),
+                                            limiter=self.limiter)
+        self.assertEqual('abcdefghij', self.read_all(proxy))
+        self.assertTrue(proxy.verified)
+
+    def test_checksum_mismatch(self):
+        self.transfer_object['checksum'] = hashlib.md5('other').hexdigest()
+        proxy = FileLikeProxy.FileLikeProxy(self.transfer_object, mock.Mock(),
+                                            limiter=self.limiter)
+        self.assertEqual('abcdef', proxy.read(6))
+        # mismatch is raised with the last byte, before end of upload
+        self.assertRaises(ChecksumImageInvalid, proxy.read, 6)
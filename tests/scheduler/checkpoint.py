@@ -0,0 +1,179 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import cPickle as pickle
+import os
+import threading
+
+import fixtures
+
+from cloudferrylib.scheduler import checkpoint
+from cloudferrylib.scheduler import scheduler
+from cloudferrylib.scheduler import task
+from cloudferrylib.scheduler import thread_tasks
+from cloudferrylib.scheduler.namespace import Namespace
+from tests import test
+
+
+class CopyDisk(task.Task):
+    def __init__(self, name, fail=False):
+        self.name = name
+        self.fail = fail
+        self.calls = 0
+        super(CopyDisk, self).__init__()
+
+    def run(self, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError('copy failed')
+        return {self.name: kwargs.get('disks', 0) + 1}
+
+
+class IndependentCopyDisk(CopyDisk):
+    requires = ()
+
+    def __init__(self, name, fail=False):
+        super(IndependentCopyDisk, self).__init__(name, fail)
+        self.provides = (name,)
+
+
+class LogRun(task.Task):
+    """Task of forked child, logs its runs to file."""
+
+    def __init__(self, log, name, fail=False):
+        self.log = log
+        self.name = name
+        self.fail = fail
+        super(LogRun, self).__init__()
+
+    def run(self, **kwargs):
+        with open(self.log, 'a') as log:
+            log.write(self.name + '\n')
+        if self.fail and not os.path.exists(self.log + '.fixed'):
+            raise RuntimeError('copy failed')
+        return {self.name: True}
+
+
+class GetClient(task.Task):
+    def run(self, **kwargs):
+        return {'client': threading.Lock()}
+
+
+class CheckpointStoreTestCase(test.TestCase):
+    def setUp(self):
+        super(CheckpointStoreTestCase, self).setUp()
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'checkpoint')
+
+    def run_scheduler(self, tasks, resume=False,
+                      scheduler_cls=scheduler.Scheduler):
+        store = checkpoint.CheckpointStore(self.path, resume)
+        namespace = Namespace({})
+        s = scheduler_cls(namespace=namespace, cursor=tasks)
+        s.addCheckpoint(store)
+        s.start()
+        store.close()
+        return namespace
+
+    def test_resume_after_failure(self):
+        tasks = [CopyDisk('disk_1'), CopyDisk('disk_2'),
+                 CopyDisk('disk_3', fail=True)]
+        self.run_scheduler(tasks)
+
+        tasks[2].fail = False
+        namespace = self.run_scheduler(tasks, resume=True)
+        self.assertEqual([1, 1, 2], [t.calls for t in tasks])
+        self.assertEqual(1, namespace.vars['disk_1'])
+        self.assertEqual(1, namespace.vars['disk_3'])
+
+        namespace = self.run_scheduler(tasks, resume=True)
+        self.assertEqual([1, 1, 2], [t.calls for t in tasks])
+        self.assertEqual(1, namespace.vars['disk_3'])
+
+    def test_unpicklable_value_stops_resume(self):
+        tasks = [CopyDisk('disk_1'), GetClient(), CopyDisk('disk_2')]
+        self.run_scheduler(tasks)
+        self.run_scheduler(tasks, resume=True)
+        self.assertEqual([1, 2], [tasks[0].calls, tasks[2].calls])
+
+    def test_changed_plan(self):
+        self.run_scheduler([CopyDisk('disk_1'), CopyDisk('disk_2')])
+        tasks = [CopyDisk('disk_1'), GetClient(), CopyDisk('disk_2')]
+        self.run_scheduler(tasks, resume=True)
+        self.assertEqual([0, 1], [tasks[0].calls, tasks[2].calls])
+        completed, records = checkpoint.CheckpointStore.load(self.path)
+        self.assertEqual(['BaseTask|CopyDisk'],
+                         [record['task'] for record in completed])
+        self.assertEqual([0, 1, 2], [record['position'] for record in records])
+
+    def test_save_snapshot(self):
+        store = checkpoint.CheckpointStore(self.path)
+        namespace = Namespace({'disks': [1]})
+        store.save(0, CopyDisk('disk_1'), namespace, {})
+        namespace.vars['disks'].append(2)
+        store.close()
+        completed, _ = checkpoint.CheckpointStore.load(self.path)
+        self.assertEqual([1], pickle.loads(completed[0]['delta']['disks']))
+
+    def test_outstanding_forks(self):
+        store = checkpoint.CheckpointStore(self.path)
+        namespace = Namespace({})
+        fork_1 = thread_tasks.WrapThreadTask()
+        fork_2 = thread_tasks.WrapThreadTask()
+        for position, t in enumerate([
+                fork_1, fork_2, thread_tasks.WaitThreadTask(fork_1),
+                CopyDisk('disk_1')]):
+            store.save(position, t, namespace, {})
+        store.flush()
+        completed, _ = checkpoint.CheckpointStore.load(self.path)
+        self.assertEqual([], completed)
+
+        store.save(4, thread_tasks.WaitThreadTask(fork_2), namespace, {})
+        store.close()
+        completed, _ = checkpoint.CheckpointStore.load(self.path)
+        self.assertEqual(5, len(completed))
+
+    def check_concurrent_resume(self, scheduler_cls):
+        tasks = [IndependentCopyDisk('disk_1'), IndependentCopyDisk('disk_2'),
+                 IndependentCopyDisk('disk_3', fail=True)]
+        self.run_scheduler(tasks, scheduler_cls=scheduler_cls)
+
+        tasks[2].fail = False
+        namespace = self.run_scheduler(tasks, resume=True,
+                                       scheduler_cls=scheduler_cls)
+        self.assertEqual([1, 1, 2], [t.calls for t in tasks])
+        self.assertEqual([1, 1, 1], [namespace.vars['disk_%d' % i]
+                                     for i in range(1, 4)])
+
+    def test_resume_dag(self):
+        self.check_concurrent_resume(scheduler.SchedulerDag)
+
+    def test_resume_async(self):
+        self.check_concurrent_resume(scheduler.AsyncScheduler)
+
+    def test_resume_forked_child(self):
+        log = self.path + '.log'
+        net = LogRun(log, 'disk_1')
+        net >> LogRun(log, 'disk_2', fail=True)
+        tasks = [thread_tasks.WrapThreadTask(net),
+                 thread_tasks.WaitThreadAllTask()]
+        self.run_scheduler(tasks)
+        self.assertTrue(os.path.exists(self.path + '.0'))
+
+        open(log + '.fixed', 'w').close()
+        namespace = self.run_scheduler(tasks, resume=True)
+        with open(log) as runs:
+            self.assertEqual(['disk_1', 'disk_2', 'disk_2'],
+                             runs.read().split())
+        self.assertTrue(namespace.vars['disk_2'])
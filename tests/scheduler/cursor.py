@@ -75,3 +75,16 @@ class CursorTestCase(test.TestCase):
         for c in cur:
             self.assertEqual(expected_result.pop(), c)
 
+    def test_compiled_plan(self):
+        plan = cursor.Plan(self.elements[5])
+        e = self.elements
+        self.assertEqual([e[0], e[1], e[4], e[2], e[3], e[5]], plan.elements)
+        self.assertEqual([[1], [2, 3, 4], [5], [2], [2], []], plan.branches)
+        self.assertEqual([e[6]], plan.threads[2])
+
+    def test_to_start(self):
+        cur = cursor.Cursor(self.elements[0])
+        self.assertEqual(5, len(list(cur)))
+        self.assertRaises(StopIteration, cur.next)
+        cur.to_start()
+        self.assertEqual(5, len(list(cur)))
@@ -0,0 +1,142 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import threading
+
+import mock
+
+from cloudferrylib.os.actions import detach_used_volumes
+from cloudferrylib.os.actions import get_info_images
+from cloudferrylib.os.actions import get_info_volumes
+from cloudferrylib.scheduler import dag
+from cloudferrylib.scheduler import scheduler
+from cloudferrylib.scheduler import task
+from cloudferrylib.scheduler import thread_tasks
+from cloudferrylib.scheduler.namespace import Namespace
+from tests import test
+
+
+class ReadImages(task.Task):
+    requires = ()
+
+    def run(self, **kwargs):
+        return {'images': ['image']}
+
+
+class ReadFlavors(task.Task):
+    requires = ()
+
+    def run(self, **kwargs):
+        if not kwargs:
+            return None
+        return {'flavors': ['flavor']}
+
+
+class Deploy(task.Task):
+    requires = ('images', 'flavors')
+
+    def run(self, images=None, flavors=None, **kwargs):
+        return {'deployed': images + flavors}
+
+
+class Dynamic(task.Task):
+    def run(self, **kwargs):
+        return dict(kwargs)
+
+
+class Inferred(task.Task):
+    def run(self, images=None):
+        return {'deployed': images}
+
+
+class SideEffect(task.Task):
+    requires = ()
+
+    def run(self, **kwargs):
+        pass
+
+
+class TaskGraphTestCase(test.TestCase):
+    def test_returned_keys(self):
+        self.assertEqual(set(['images']), dag.get_provides(ReadImages()))
+        self.assertEqual(set(['flavors']), dag.get_provides(ReadFlavors()))
+        self.assertIsNone(dag.get_provides(Dynamic()))
+
+        self.assertIsNone(dag.get_provides(SideEffect()))
+
+    def test_requires(self):
+        self.assertEqual(set(['images', 'flavors']),
+                         dag.get_requires(Deploy()))
+        self.assertEqual(set(['images']), dag.get_requires(Inferred()))
+        self.assertIsNone(dag.get_requires(Dynamic()))
+
+    def test_independent_tasks(self):
+        graph = dag.TaskGraph([ReadImages(), ReadFlavors(), Deploy()])
+        self.assertEqual([0, 1], [node.index for node in graph.roots()])
+        self.assertEqual(set([0, 1]), graph.nodes[2].deps)
+        self.assertEqual(2, graph.critical_path())
+
+    def test_write_after_read(self):
+        graph = dag.TaskGraph([ReadImages(), Deploy(), ReadImages()])
+        self.assertEqual(set([0, 1]), graph.nodes[2].deps)
+
+    def test_barrier(self):
+        graph = dag.TaskGraph([ReadImages(), Dynamic(), ReadFlavors(),
+                               thread_tasks.WaitThreadAllTask()])
+        self.assertTrue(graph.nodes[1].barrier)
+        self.assertEqual(set([0]), graph.nodes[1].deps)
+        self.assertEqual(set([1]), graph.nodes[2].deps)
+        self.assertTrue(graph.nodes[3].barrier)
+        self.assertEqual(set([1, 2]), graph.nodes[3].deps)
+
+    def test_side_effect_barrier(self):
+        graph = dag.TaskGraph([ReadImages(), SideEffect(), ReadFlavors()])
+        self.assertTrue(graph.nodes[1].barrier)
+        self.assertEqual(set([1]), graph.nodes[2].deps)
+
+
+class SchedulerDagTestCase(test.TestCase):
+    def test_start(self):
+        namespace = Namespace({})
+        s = scheduler.SchedulerDag(namespace=namespace,
+                                   cursor=[ReadImages(), ReadFlavors(),
+                                           Deploy()])
+        s.start()
+        self.assertEqual(scheduler.NO_ERROR, s.status_error)
+        self.assertEqual(['image', 'flavor'], namespace.vars['deployed'])
+
+    def test_actions(self):
+        images_read = threading.Event()
+        storage = mock.Mock()
+        # volumes are read only if images are read at the same time
+        storage.read_info.side_effect = \
+            lambda **kwargs: images_read.wait(5) and {'storage': {}}
+        image = mock.Mock()
+        image.read_info.side_effect = \
+            lambda **kwargs: images_read.set() or {'image': {}}
+        cloud = mock.Mock(resources={'storage': storage, 'image': image})
+        actions = [get_info_volumes.GetInfoVolumes(cloud),
+                   get_info_images.GetInfoImages(cloud),
+                   detach_used_volumes.DetachVolumes(cloud)]
+        namespace = Namespace({'volumes_info': {'storage': {'volumes': {}}}})
+
+        graph = dag.TaskGraph(actions)
+        self.assertEqual([False] * 3, [node.barrier for node in graph.nodes])
+        self.assertEqual([0, 1, 2], [node.index for node in graph.roots()])
+
+        s = scheduler.SchedulerDag(namespace=namespace, cursor=actions)
+        s.start()
+        self.assertEqual(scheduler.NO_ERROR, s.status_error)
+        self.assertEqual({'storage': {}}, namespace.vars['storage_info'])
+        self.assertEqual({'image': {}}, namespace.vars['image_data'])
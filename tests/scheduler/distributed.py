@@ -0,0 +1,124 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import os
+import socket
+import threading
+
+import fixtures
+
+from cloudferrylib.scheduler import distributed
+from cloudferrylib.scheduler import task
+from tests import test
+
+
+class MigrateInstance(task.Task):
+    def run(self, instance_id=None, **kwargs):
+        if instance_id == 'broken':
+            raise RuntimeError(instance_id)
+        return {'migrated': instance_id, 'lock': threading.Lock()}
+
+
+def instance_plan(instance_id=None):
+    return MigrateInstance()
+
+
+PLAN = 'tests.scheduler.distributed.instance_plan'
+
+
+class DistributedTestCase(test.TestCase):
+    def setUp(self):
+        super(DistributedTestCase, self).setUp()
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'queue.db')
+        self.queue = distributed.SqliteQueue(path)
+        self.coordinator = distributed.Coordinator(self.queue)
+
+    def test_take_in_order(self):
+        first = self.coordinator.submit(PLAN, instance_id='vm1')
+        self.coordinator.submit(PLAN, instance_id='vm2')
+        job = self.queue.take('worker1')
+        self.assertEqual(first, job.id)
+        self.assertEqual({'instance_id': 'vm1'}, job.kwargs)
+        self.assertEqual('vm2', self.queue.take('worker2').kwargs[
+            'instance_id'])
+        self.assertIsNone(self.queue.take('worker1'))
+
+    def test_requeue(self):
+        job_id = self.coordinator.submit(PLAN, instance_id='vm1')
+        self.queue.take('worker1')
+        self.assertEqual(0, self.queue.requeue(60))
+        self.assertEqual(1, self.queue.requeue(-1))
+        self.assertEqual(job_id, self.queue.take('worker2').id)
+
+    def test_heartbeat(self):
+        self.coordinator.submit(PLAN, instance_id='vm1')
+        job = self.queue.take('worker1')
+        self.assertTrue(self.queue.heartbeat(job.id, 'worker1'))
+        self.assertEqual(1, self.queue.requeue(-1))
+        self.assertFalse(self.queue.heartbeat(job.id, 'worker1'))
+
+    def test_lost_lease(self):
+        job_id = self.coordinator.submit(PLAN, instance_id='vm1')
+        self.queue.take('worker1')
+        self.queue.requeue(-1)
+        self.queue.take('worker2')
+        self.assertRaises(distributed.LeaseLost, self.queue.complete,
+                          job_id, 'worker1', {'migrated': 'stale'})
+        self.queue.complete(job_id, 'worker2', {'migrated': 'vm1'})
+        self.assertRaises(distributed.LeaseLost, self.queue.fail,
+                          job_id, 'worker1', 'error')
+        job = self.queue.get([job_id])[job_id]
+        self.assertEqual(distributed.DONE, job.state)
+        self.assertEqual({'migrated': 'vm1'}, job.result)
+
+    def test_workers(self):
+        job_ids = [self.coordinator.submit(PLAN, instance_id=instance_id)
+                   for instance_id in ('vm1', 'broken', 'vm2')]
+        workers = [distributed.Worker(self.queue, 'worker%d' % i)
+                   for i in xrange(2)]
+        threads = [threading.Thread(target=worker.run) for worker in workers]
+        for thread in threads:
+            thread.start()
+        jobs = self.coordinator.wait(job_ids, poll_interval=0.01)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(distributed.DONE, jobs[job_ids[0]].state)
+        # values which can't be pickled aren't reported
+        self.assertEqual({'migrated': 'vm1'}, jobs[job_ids[0]].result)
+        self.assertEqual(distributed.FAILED, jobs[job_ids[1]].state)
+        self.assertIn('broken', jobs[job_ids[1]].error)
+        self.assertEqual({'migrated': 'vm2'}, jobs[job_ids[2]].result)
+
+    def test_default_worker_name(self):
+        first = distributed.Worker(self.queue)
+        second = distributed.Worker(self.queue)
+        self.assertNotEqual(first.name, second.name)
+        self.assertTrue(first.name.startswith('%s:%d:' % (
+            socket.gethostname(), os.getpid())))
+
+    def test_coordinator_run(self):
+        worker = threading.Thread(target=distributed.Worker(self.queue).run)
+
+        def jobs_kwargs():
+            yield {'instance_id': 'vm1'}
+            # job is queued before the next one is listed
+            self.assertEqual(1, len(self.queue.get([1])))
+            yield {'instance_id': 'vm2'}
+            worker.start()
+
+        jobs = self.coordinator.run(PLAN, jobs_kwargs(), poll_interval=0.01)
+        worker.join()
+        self.assertEqual(['vm1', 'vm2'], [jobs[job_id].result['migrated']
+                                          for job_id in sorted(jobs)])
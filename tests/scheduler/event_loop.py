@@ -0,0 +1,102 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import threading
+import time
+
+from cloudferrylib.scheduler import event_loop
+from cloudferrylib.scheduler import scheduler
+from cloudferrylib.scheduler import task
+from cloudferrylib.scheduler.event_loop import Return
+from cloudferrylib.scheduler.namespace import Namespace
+from tests import test
+
+
+def wait_status(statuses, res_id):
+    while statuses[res_id] != 'available':
+        statuses[res_id] = 'available'
+        yield event_loop.sleep(0.05)
+    raise Return(res_id)
+
+
+def fail():
+    raise ValueError('fake error')
+
+
+class WaitVolumes(task.Task):
+    requires = ('volumes',)
+
+    def run(self, volumes=None, **kwargs):
+        statuses = dict((vol, 'creating') for vol in volumes)
+        ready = yield [wait_status(statuses, vol) for vol in volumes]
+        raise Return({'ready': ready})
+
+
+class GetVolumes(task.Task):
+    requires = ()
+
+    def run(self, **kwargs):
+        return {'volumes': range(1000)}
+
+
+class EventLoopTestCase(test.TestCase):
+    def setUp(self):
+        super(EventLoopTestCase, self).setUp()
+        self.loop = event_loop.EventLoop(executor_size=2)
+        self.addCleanup(self.loop.close)
+
+    def test_many_waits_in_one_thread(self):
+        statuses = dict((i, 'creating') for i in xrange(1000))
+        start = time.time()
+        result = self.loop.run_until_complete(
+            [wait_status(statuses, i) for i in xrange(1000)])
+        self.assertEqual(range(1000), result)
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual([], self.loop.workers)
+
+    def test_blocking(self):
+        def coroutine():
+            value = yield event_loop.blocking(sum, [1, 2, 3])
+            raise Return(value * 2)
+
+        self.assertEqual(12, self.loop.run_until_complete(coroutine()))
+        self.assertEqual(1, len(self.loop.workers))
+
+    def test_blocking_exception(self):
+        def coroutine():
+            try:
+                yield event_loop.blocking(fail)
+            except ValueError:
+                raise Return('handled')
+
+        self.assertEqual('handled', self.loop.run_until_complete(coroutine()))
+        self.assertRaises(ValueError, self.loop.run_until_complete,
+                          event_loop.blocking(fail))
+
+    def test_external_future(self):
+        future, set_result = self.loop.external_future()
+        timer = threading.Timer(0.05, set_result, ['done'])
+        timer.start()
+        self.assertEqual('done', self.loop.run_until_complete(future))
+        timer.join()
+
+
+class AsyncSchedulerTestCase(test.TestCase):
+    def test_start(self):
+        namespace = Namespace({})
+        s = scheduler.AsyncScheduler(namespace=namespace,
+                                     cursor=[GetVolumes(), WaitVolumes()])
+        s.start()
+        self.assertEqual(scheduler.NO_ERROR, s.status_error)
+        self.assertEqual(range(1000), namespace.vars['ready'])
@@ -0,0 +1,188 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import os
+import threading
+import time
+
+import fixtures
+
+from cloudferrylib.scheduler import limits
+from cloudferrylib.scheduler import scheduler
+from cloudferrylib.scheduler import task
+from cloudferrylib.scheduler import thread_tasks
+from cloudferrylib.scheduler.namespace import Namespace
+from tests import test
+
+
+class CopyImage(task.Task):
+    requires = ()
+    provides = ()
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+
+    def __init__(self, host):
+        super(CopyImage, self).__init__()
+        self.resources = ['compute:%s' % host]
+
+    def run(self, **kwargs):
+        with self.lock:
+            CopyImage.running += 1
+            CopyImage.max_running = max(CopyImage.running,
+                                        CopyImage.max_running)
+        time.sleep(0.01)
+        with self.lock:
+            CopyImage.running -= 1
+
+
+class LogCopyImage(task.Task):
+    """Logs start and end of copy to file, runs in forked process."""
+
+    def __init__(self, log, host):
+        super(LogCopyImage, self).__init__()
+        self.log = log
+        self.resources = ['compute:%s' % host]
+
+    def write(self, event):
+        with open(self.log, 'a') as log:
+            log.write('%s %d\n' % (event, os.getpid()))
+
+    def run(self, **kwargs):
+        self.write('start')
+        time.sleep(0.05)
+        self.write('end')
+
+
+class ResourceLimitsTestCase(test.TestCase):
+    def setUp(self):
+        super(ResourceLimitsTestCase, self).setUp()
+        self.limits = limits.ResourceLimits({'compute': 1,
+                                             'glance:src': 2})
+        self.granted = []
+
+    def grant(self, name):
+        return lambda: self.granted.append(name)
+
+    def test_limit_by_kind(self):
+        self.assertEqual(1, self.limits.limit('compute:host1'))
+        self.assertEqual(2, self.limits.limit('glance:src'))
+        self.assertEqual(limits.UNLIMITED, self.limits.limit('glance:dst'))
+
+    def test_waiting_in_order(self):
+        self.limits.acquire(['compute:host1'], self.grant('a'))
+        self.limits.acquire(['compute:host1', 'compute:host2'],
+                            self.grant('b'))
+        self.limits.acquire(['compute:host2'], self.grant('c'))
+        self.limits.acquire(['compute:host3'], self.grant('d'))
+        self.assertEqual(['a', 'd'], self.granted)
+        self.assertFalse(self.limits.try_acquire(['compute:host2']))
+        self.limits.release(['compute:host1'])
+        self.assertEqual(['a', 'd', 'b'], self.granted)
+        self.limits.release(['compute:host1', 'compute:host2'])
+        self.assertEqual(['a', 'd', 'b', 'c'], self.granted)
+
+    def test_try_acquire(self):
+        self.assertTrue(self.limits.try_acquire(['glance:src']))
+        self.assertFalse(self.limits.try_acquire(['glance:src'],
+                                                 ['glance:src']))
+        self.assertTrue(self.limits.try_acquire(['glance:src']))
+        self.assertFalse(self.limits.try_acquire(['glance:src']))
+        self.limits.release(['glance:src'])
+        self.assertTrue(self.limits.try_acquire(['glance:src']))
+
+    def test_share_between_processes(self):
+        self.limits.share()
+        self.assertTrue(self.limits.try_acquire(['compute:host1']))
+        pid = os.fork()
+        if not pid:
+            # child exits with 0 only if parent's label is seen
+            os._exit(int(self.limits.try_acquire(['compute:host1'])))
+        self.assertEqual(0, os.waitpid(pid, 0)[1])
+        released = threading.Timer(0.1, self.limits.release,
+                                   [['compute:host1']])
+        released.start()
+        pid = os.fork()
+        if not pid:
+            # label released by parent process is granted to child
+            self.limits.acquire(['compute:host1'])
+            self.limits.release(['compute:host1'])
+            os._exit(0)
+        self.assertEqual(0, os.waitpid(pid, 0)[1])
+        released.join()
+        self.assertFalse(self.limits.used)
+
+    def test_get_resources(self):
+        copy = task.Task()
+        self.assertEqual(frozenset(), limits.get_resources(copy, Namespace()))
+        copy.resources = lambda host=None, **kwargs: ['compute:%s' % host]
+        self.assertEqual(frozenset(['compute:host1']),
+                         limits.get_resources(copy,
+                                              Namespace({'host': 'host1'})))
+
+
+class SchedulerLimitsTestCase(test.TestCase):
+    def setUp(self):
+        super(SchedulerLimitsTestCase, self).setUp()
+        CopyImage.max_running = 0
+
+    def run_scheduler(self, scheduler_cls):
+        s = scheduler_cls(namespace=Namespace({}),
+                          cursor=[CopyImage('host1') for _ in xrange(4)])
+        s.addLimits(limits.ResourceLimits({'compute': 1}))
+        s.start()
+        self.assertEqual(scheduler.NO_ERROR, s.status_error)
+        self.assertFalse(s.limits.used)
+
+    def test_scheduler_dag(self):
+        self.run_scheduler(scheduler.SchedulerDag)
+        self.assertEqual(1, CopyImage.max_running)
+
+    def test_async_scheduler(self):
+        self.run_scheduler(scheduler.AsyncScheduler)
+        self.assertEqual(1, CopyImage.max_running)
+
+    def test_async_scheduler_label_held_outside(self):
+        s = scheduler.AsyncScheduler(namespace=Namespace({}),
+                                     cursor=[CopyImage('host1')])
+        s.addLimits(limits.ResourceLimits({'compute': 1}))
+        s.limits.acquire(['compute:host1'])
+        # label is released and granted to loop by other thread
+        release = threading.Timer(0.1, s.limits.release,
+                                  [['compute:host1']])
+        release.start()
+        s.start()
+        release.join()
+        self.assertEqual(scheduler.NO_ERROR, s.status_error)
+        self.assertEqual(1, CopyImage.max_running)
+        self.assertFalse(s.limits.used)
+
+
+    def test_forked_tasks(self):
+        log = os.path.join(self.useFixture(fixtures.TempDir()).path, 'log')
+        tasks = [thread_tasks.WrapThreadTask(LogCopyImage(log, 'host1'))
+                 for _ in xrange(3)]
+        s = scheduler.Scheduler(namespace=Namespace({}),
+                                cursor=tasks + [
+                                    thread_tasks.WaitThreadAllTask()])
+        s.addLimits(limits.ResourceLimits({'compute': 1}))
+        s.start()
+        self.assertEqual(scheduler.NO_ERROR, s.status_error)
+        with open(log) as events:
+            events = [line.split() for line in events]
+        self.assertEqual(3, len(set(pid for _, pid in events)))
+        # copies of processes don't overlap
+        self.assertEqual(['start', 'end'] * 3,
+                         [event for event, _ in events])
+        self.assertFalse(s.limits.used)
@@ -0,0 +1,73 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import threading
+
+from oslotest import mockpatch
+
+from cloudferrylib.scheduler import pool
+from cloudferrylib.scheduler import scheduler
+from cloudferrylib.scheduler import thread_tasks
+from tests import test
+
+
+class WorkerPoolTestCase(test.TestCase):
+    def setUp(self):
+        super(WorkerPoolTestCase, self).setUp()
+        self.order = []
+        self.gate = threading.Event()
+
+    def make_target(self, name):
+        def target():
+            self.gate.wait()
+            self.order.append(name)
+        return target
+
+    def test_init_pool(self):
+        self.useFixture(mockpatch.PatchObject(pool, 'POOL_SIZE',
+                                              new=pool.POOL_SIZE))
+        pool.init_pool(1)
+        self.assertEqual(1, pool.WorkerPool().size)
+        self.assertEqual(3, pool.WorkerPool(3).size)
+        self.assertEqual(1, scheduler.Scheduler().pool.size)
+
+    def test_pool_size_limits_running_workers(self):
+        p = pool.WorkerPool(2, worker_cls=threading.Thread)
+        handles = [p.submit(self.make_target(i)) for i in xrange(5)]
+        self.assertEqual(2, len(p.running))
+        self.assertEqual(3, len(p.queue))
+        self.gate.set()
+        p.wait_all()
+        self.assertTrue(all(not h.is_alive() for h in handles))
+        self.assertEqual(5, len(self.order))
+
+    def test_priority_order(self):
+        p = pool.WorkerPool(1, worker_cls=threading.Thread)
+        p.submit(self.make_target('first'))
+        p.submit(self.make_target('low'), thread_tasks.LOW)
+        p.submit(self.make_target('normal'))
+        p.submit(self.make_target('high'), thread_tasks.HIGH)
+        self.gate.set()
+        p.wait_all()
+        self.assertEqual(['first', 'high', 'normal', 'low'], self.order)
+
+    def test_join_handle(self):
+        p = pool.WorkerPool(1, worker_cls=threading.Thread)
+        p.submit(self.make_target('a'))
+        handle = p.submit(self.make_target('b'))
+        self.assertIsNone(handle.worker)
+        self.gate.set()
+        handle.join()
+        self.assertFalse(handle.is_alive())
+        self.assertEqual(['a', 'b'], self.order)
@@ -0,0 +1,131 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import threading
+from multiprocessing import Pipe
+
+import mock
+
+from cloudferrylib.scheduler import scheduler
+from cloudferrylib.scheduler import task
+from cloudferrylib.scheduler import thread_tasks
+from cloudferrylib.scheduler.namespace import Namespace, CHILDREN
+from tests import test
+
+
+class SetValue(task.Task):
+    def __init__(self, key, value):
+        super(SetValue, self).__init__()
+        self.key = key
+        self.value = value
+
+    def run(self, **kwargs):
+        return {self.key: self.value}
+
+
+class AppendImage(task.Task):
+    def run(self, images=None, **kwargs):
+        images.append('image_2')
+
+
+class ThreadTasksTestCase(test.TestCase):
+    def setUp(self):
+        super(ThreadTasksTestCase, self).setUp()
+        self.receiver, self.sender = Pipe(duplex=False)
+        self.process = mock.Mock()
+        self.process.is_alive.return_value = True
+        self.child = {'process': self.process, 'result': self.receiver}
+
+    def test_namespace_delta(self):
+        shared = ['shared']
+        namespace = Namespace({'a': shared, 'b': 1}).fork()
+        namespace.vars.update({'b': 2, 'c': 3})
+        self.assertEqual({'b': 2, 'c': 3}, namespace.delta())
+        self.assertNotIn(CHILDREN, namespace.delta())
+
+    def test_namespace_fork_children(self):
+        parent = Namespace({CHILDREN: {0: {'task': 'tt'}}, 'a': 1})
+        namespace = parent.fork()
+        self.assertEqual({}, namespace.vars[CHILDREN])
+        self.assertEqual(1, namespace.vars['a'])
+        self.assertEqual({0: {'task': 'tt'}}, parent.vars[CHILDREN])
+
+    def test_namespace_delta_in_place(self):
+        namespace = Namespace({'images': ['image_1'], 'lock': threading.Lock(),
+                               'flavors': {}}).fork()
+        namespace.vars['images'].append('image_2')
+        self.assertEqual({'images': ['image_1', 'image_2']},
+                         namespace.delta())
+
+    def test_join_child(self):
+        thread = threading.Thread(
+            target=thread_tasks.send_result,
+            args=(self.sender, {'images': ['image_1'],
+                                'lock': threading.Lock()}))
+        thread.start()
+        result = thread_tasks.join_child(self.child)
+        thread.join()
+        self.assertEqual({'images': ['image_1']}, result)
+        self.process.join.assert_called_once_with()
+
+    def test_join_child_without_result(self):
+        self.process.is_alive.return_value = False
+        self.sender.close()
+        self.assertRaises(thread_tasks.ChildError,
+                          thread_tasks.join_child, self.child)
+        self.process.join.assert_called_once_with()
+
+    def test_wait_thread_all_task(self):
+        thread_tasks.send_result(self.sender, {'v1': 1})
+        namespace = Namespace({CHILDREN: {'tt': self.child}})
+        thread_tasks.WaitThreadAllTask()(namespace)
+        self.assertEqual(1, namespace.vars['v1'])
+
+    def test_fork_children(self):
+        parent = scheduler.SchedulerThread(namespace=Namespace({}))
+        thread_tasks_list = [thread_tasks.WrapThreadTask(SetValue('v%d' % i,
+                                                                  i))
+                             for i in range(3)]
+        for thread_task in thread_tasks_list:
+            parent.fork(thread_task).start()
+        wait_first = thread_tasks.WaitThreadTask(thread_tasks_list[0])
+
+        wait_first(parent.namespace)
+        self.assertEqual(0, parent.namespace.vars['v0'])
+        thread_tasks.WaitThreadAllTask()(parent.namespace)
+
+        self.assertEqual(1, parent.namespace.vars['v1'])
+        self.assertEqual(2, parent.namespace.vars['v2'])
+        self.assertEqual(3, len(parent.namespace.vars[CHILDREN]))
+
+    def test_fork_children_through_pool(self):
+        parent = scheduler.Scheduler(namespace=Namespace({}))
+        parent.pool.size = 1
+        for i in range(3):
+            thread_task = thread_tasks.WrapThreadTask(SetValue('v%d' % i, i))
+            parent.fork(thread_task).start()
+        self.assertEqual(1, len(parent.pool.running))
+
+        thread_tasks.WaitThreadAllTask()(parent.namespace)
+
+        self.assertEqual([0, 1, 2],
+                         [parent.namespace.vars['v%d' % i] for i in range(3)])
+
+    def test_fork_child_changing_in_place(self):
+        parent = scheduler.SchedulerThread(
+            namespace=Namespace({'images': ['image_1']}))
+        parent.fork(thread_tasks.WrapThreadTask(AppendImage())).start()
+        thread_tasks.WaitThreadAllTask()(parent.namespace)
+        self.assertEqual(['image_1', 'image_2'],
+                         parent.namespace.vars['images'])
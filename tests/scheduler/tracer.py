@@ -0,0 +1,77 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import json
+import os
+import time
+
+import fixtures
+
+from cloudferrylib.scheduler import scheduler
+from cloudferrylib.scheduler import task
+from cloudferrylib.scheduler import thread_tasks
+from cloudferrylib.scheduler import tracer
+from cloudferrylib.scheduler.namespace import Namespace
+from tests import test
+
+
+class GetImages(task.Task):
+    def run(self, **kwargs):
+        return {'images': [1, 2, 3], 'cloud': object()}
+
+
+class SlowTask(task.Task):
+    def run(self, **kwargs):
+        time.sleep(0.2)
+
+
+class TracerTestCase(test.TestCase):
+    def setUp(self):
+        super(TracerTestCase, self).setUp()
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'trace.json')
+
+    def test_trace_scheduler(self):
+        s = scheduler.Scheduler(namespace=Namespace({}),
+                                cursor=[GetImages(), GetImages()])
+        s.addTracer(tracer.Tracer(self.path))
+        s.start()
+
+        with open(self.path) as trace_file:
+            events = json.load(trace_file)['traceEvents']
+        self.assertEqual(['M', 'X', 'X'], [e['ph'] for e in events])
+        self.assertEqual('main', events[0]['args']['name'])
+        task_event = events[2]
+        self.assertEqual('GetImages', task_event['name'])
+        self.assertEqual(os.getpid(), task_event['pid'])
+        self.assertEqual({'images': 3, 'cloud': None},
+                         task_event['args']['namespace'])
+        self.assertFalse(os.path.exists('%s.%s' % (self.path, os.getpid())))
+
+    def test_trace_children(self):
+        stale_part = '%s.%s.%s' % (self.path, 'old', 1)
+        with open(stale_part, 'w') as part:
+            part.write(json.dumps({'name': 'Stale', 'ph': 'X'}) + '\n')
+        child = thread_tasks.WrapThreadTask(SlowTask())
+        s = scheduler.SchedulerThread(namespace=Namespace({}),
+                                      cursor=[GetImages(), child])
+        s.addTracer(tracer.Tracer(self.path))
+        # nothing waits for child, trace is dumped when it finishes
+        s.start()
+
+        with open(self.path) as trace_file:
+            events = json.load(trace_file)['traceEvents']
+        self.assertEqual(['GetImages', 'SlowTask', 'WrapThreadTask'],
+                         sorted(e['name'] for e in events if e['ph'] == 'X'))
+        self.assertTrue(os.path.exists(stale_part))
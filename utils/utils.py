@@ -133,7 +133,7 @@ class GeneratorPassword:
         return self.__generate_password()
 
     def __generate_password(self):
-        random.seed = (os.urandom(1024))
+        random.seed(os.urandom(1024))
         return ''.join(random.choice(self.chars) for i in range(self.length))
 
 